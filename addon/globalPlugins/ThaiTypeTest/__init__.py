@@ -3,120 +3,148 @@
 import os
 import sys
 import wx
-import re
-import random
 import addonHandler
+import config
 import globalPluginHandler
 import gui
 import speech
+from speech.commands import CallbackCommand
 import tones
 from scriptHandler import script
 from itertools import zip_longest
-import string
-import difflib
+import threading
+import time
 
 # Set up the library path first
 lib_path = os.path.join(os.path.dirname(__file__), "lib")
 if lib_path not in sys.path:
     sys.path.insert(0, lib_path)
 
-# Import external and standard libraries
-from pythainlp.tokenize import word_tokenize
-import requests
-from bs4 import BeautifulSoup
+from .compiled import open_compiled_corpus
+from .corpus import CorpusCache, CACHE_FILE_NAME, split_dataset_lines, vocabulary
+from . import adaptive
+from . import history
+from . import keylog
+from . import pipeline
+from . import prompts
+from . import results
+from . import scoring
+from .scoring import filter_scored_words
+from . import store
+from . import watcher
+from .tokenizer import DEFAULT_ENGINE, MAXIMAL_ENGINE, NEWMM_ENGINE, default_tokenizer, word_tokenize
+from .sampler import SampledDataset, new_seed
+from .timing import TestClock
+from .lyrics import (
+    CONTENT_PREFIX, CREDIT_PREFIX, extract_urls, fetch_lyrics_batch, import_index, record_import, song_hash
+)
+
+# Serializes loader threads so only one of them reads and writes the corpus cache at a time.
+corpus_cache_lock = threading.Lock()
+# Serializes building the maximal-matching dictionary between the loader and the warm-up thread.
+tokenizer_dictionary_lock = threading.Lock()
+
+# The add-on's section of NVDA's configuration.
+CONFIG_SECTION = "thaiTypeTest"
+CONFSPEC = {
+    "tokenizerEngine": f'option("{NEWMM_ENGINE}", "{MAXIMAL_ENGINE}", default="{DEFAULT_ENGINE}")',
+}
+# The tokenizer choice: each engine with its name in the dialog.
+TOKENIZER_CHOICES = (
+    (NEWMM_ENGINE, "PyThaiNLP (newmm)"),
+    (MAXIMAL_ENGINE, "คลังคำของ Add-on (เริ่มเร็ว ไม่โหลดพจนานุกรม PyThaiNLP)"),
+)
 
 # Initialize add-on translations
 addonHandler.initTranslation()
 
+# PyThaiNLP, requests and BeautifulSoup are heavy to import, so they are only
+# imported when the dialog or a lyrics import actually needs them.
+# This long after NVDA starts they are warmed up on a background thread,
+# whether or not NVDA is busy at the time.
+WARM_UP_DELAY_MS = 60000
+
+# How many upcoming sentences have their reference words and spoken chunks prepared in advance.
+REFERENCE_LOOKAHEAD = 5
+# How many recent sessions the history view shows at first.
+DEFAULT_HISTORY_SESSIONS = 20
+# The history view is queried this long after the last change to its filters, not on every keystroke.
+HISTORY_REFRESH_DELAY_MS = 300
+# How many of the most error-prone characters an adaptive test's report names.
+WEAK_CHARS_REPORTED = 5
+# The difficulty choice: every item, then the pipeline's EASY, MEDIUM and HARD bands in order.
+DIFFICULTY_CHOICES = ["ทุกระดับ", "ง่าย", "ปานกลาง", "ยาก"]
+
+
+def prepare_tokenizer():
+    """Gives the maximal-matching engine its dictionary before it tokenizes anything.
+
+    The words come from the bundled corpora's compiled vocabularies (or their
+    corpus cache entries), so PyThaiNLP's dictionary is never loaded for it.
+    """
+    with tokenizer_dictionary_lock:
+        if default_tokenizer.engine == MAXIMAL_ENGINE and default_tokenizer.trie_tokenizer is None:
+            file_paths = [corpus_path(mode_info["file"]) for mode_info in default_modes().values() if "file" in mode_info]
+            default_tokenizer.set_dictionary(vocabulary(file_paths, os.path.join(lib_path, CACHE_FILE_NAME)))
 
-def clean_text(text):
-    """Cleans text by removing blank lines, special characters, and BOM."""
-    text = text.split("\n")
-    text = [line.strip() for line in text]
-    text = [line for line in text if line]
-    text = "\n".join(text)
-    text = text.replace(u'\ufeff', '') # Remove BOM
-    # Use Python's 're' module to remove special characters
-    return re.sub(r"[{}[\]()\*#<>]", "", text)
 
-def fetch_lyrics(url):
-    """Fetches and parses lyrics from Kapook, Siamzone, or Meemodel."""
+def warm_up_imports():
+    """Imports the heavy libraries and loads the tokenizer dictionary ahead of use."""
     try:
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36'}
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        raw_text = None
-        if "kapook.com" in url:
-            # Method 1: Find the styled separator divs (for modern layouts).
-            separator_divs = soup.select("div[align='center'][style*='font-size:16px']")
-            if len(separator_divs) >= 2:
-                lyrics_parts = []
-                start_node = separator_divs[0]
-                end_node = separator_divs[1]
-                for sibling in start_node.find_next_siblings():
-                    if sibling == end_node:
-                        break
-                    text = sibling.get_text(separator='\n').strip()
-                    if text:
-                        lyrics_parts.append(text)
-                if lyrics_parts:
-                    raw_text = "\n".join(lyrics_parts)
-
-            # Method 2 (Fallback for old table-based layouts): If Method 1 fails.
-            if not raw_text:
-                header_cell = soup.select_one("td.lyrics")
-                if header_cell:
-                    # The lyrics are in the <td> of the next <tr> sibling
-                    header_row = header_cell.find_parent("tr")
-                    if header_row:
-                        lyrics_row = header_row.find_next_sibling("tr")
-                        if lyrics_row:
-                            lyrics_cell = lyrics_row.select_one("td")
-                            if lyrics_cell:
-                                raw_text = lyrics_cell.get_text(separator='\n').strip()
-
-            # Method 3 (Final fallback): If both above methods fail.
-            if not raw_text:
-                lyrics_div = soup.select_one(".lyric p, .lyric")
-                if lyrics_div:
-                    raw_text = lyrics_div.get_text(separator='\n').strip()
-        
-        elif "siamzone.com" in url:
-            # Logic for Siamzone
-            lyrics_div = soup.select_one("div.has-text-centered-mobile.is-size-5-desktop")
-            if lyrics_div:
-                lyrics_parts = []
-                found_karaoke_marker = False
-                for element in lyrics_div.children:
-                    text_content = ""
-                    if isinstance(element, str):
-                        text_content = element.strip()
-                    else:
-                        text_content = element.get_text(separator='\n').strip()
-                    if "คาราโอเกะ" in text_content.lower() or "karaoke" in text_content.lower():
-                        found_karaoke_marker = True
-                        break
-                    if not found_karaoke_marker and text_content:
-                        lyrics_parts.append(text_content)
-                raw_text = "\n".join(lyrics_parts).strip()
-
-        elif "เพลง.meemodel.com" in url or "xn--72c9bva0i.meemodel.com" in url:
-            # Logic for Meemodel
-            lyrics_div = soup.select_one("div#lyric-lyric")
-            if lyrics_div:
-                raw_text = lyrics_div.get_text(separator='\n').strip()
-
-        if raw_text:
-            return clean_text(raw_text)
-        return None
-
-    except Exception as e:
+        prepare_tokenizer()
+        word_tokenize("ทดสอบพิมพ์ภาษาไทย")
+        import requests
+        from bs4 import BeautifulSoup
+    except Exception:
         import logHandler
-        logHandler.log.error(f"Failed to fetch lyrics from {url}", exc_info=True)
-        return None
-        
+        logHandler.log.debugWarning("Thai Type Test: warming up imports failed", exc_info=True)
+
+
+def default_modes():
+    """Returns a fresh table of the test modes; each dialog fills in its own datasets."""
+    return {
+        "พิมพ์คำ (ทั่วไป)": {"is_sentence": False, "source_files": ["sentence_th.txt", "lyrics_th.txt"]},
+        "พิมพ์คำ (ยาก)": {"is_sentence": False, "source_files": ["literature_th.txt"]},
+        "พิมพ์คำ (ฝึกจุดอ่อน)": {
+            "is_sentence": False,
+            "adaptive": True,
+            "source_files": ["sentence_th.txt", "lyrics_th.txt", "literature_th.txt"],
+        },
+        "พิมพ์ประโยค": {"file": "sentence_th.txt", "is_sentence": True},
+        "พิมพ์เนื้อเพลง": {"file": "lyrics_th.txt", "is_sentence": True},
+        "พิมพ์วรรณกรรม": {"file": "literature_th.txt", "is_sentence": True},
+    }
+
+
+def user_mode_name(file_path):
+    return f"ชุดข้อมูลของฉัน: {os.path.splitext(os.path.basename(file_path))[0]}"
+
+
+def corpus_path(file_name):
+    """Returns the path of a mode's corpus file.
+
+    Bundled corpora are named relative to lib; user corpora are named by their absolute path.
+    """
+    return os.path.join(lib_path, file_name)
+
+
+class ResultsListCtrl(wx.ListCtrl):
+    """The mistakes of a test in a virtual list; a row's text is only made when the row is shown."""
+    def __init__(self, parent, model):
+        super(ResultsListCtrl, self).__init__(parent, style=wx.LC_REPORT | wx.LC_VIRTUAL | wx.LC_SINGLE_SEL, size=(-1, 200))
+        self.model = model
+        for index, (column, heading) in enumerate(results.COLUMNS):
+            self.InsertColumn(index, heading)
+
+    def refresh_rows(self):
+        """Shows the model's rows after they, the filter or the order changed."""
+        self.SetItemCount(len(self.model))
+        self.Refresh()
+
+    def OnGetItemText(self, item, column):
+        return self.model.cell(item, column)
+
+
 class TestDialog(wx.Dialog):
     """The main dialog for the Thai Type Test add-on."""
     def __init__(self, parent):
@@ -125,26 +153,34 @@ class TestDialog(wx.Dialog):
         
         self.word_bank_general = []
         self.word_bank_hard = []
-        self.MODES = {
-            "พิมพ์คำ (ทั่วไป)": {"is_sentence": False, "source_files": ["sentence_th.txt", "lyrics_th.txt"]},
-            "พิมพ์คำ (ยาก)": {"is_sentence": False, "source_files": ["literature_th.txt"]},
-            "พิมพ์ประโยค": {"file": "sentence_th.txt", "is_sentence": True},
-            "พิมพ์เนื้อเพลง": {"file": "lyrics_th.txt", "is_sentence": True},
-            "พิมพ์วรรณกรรม": {"file": "literature_th.txt", "is_sentence": True},
-        }
-        self.load_all_data()
+        self.MODES = default_modes()
+        self.user_corpus_dir = watcher.user_corpus_dir()
+        for file_path in watcher.list_user_corpora(self.user_corpus_dir):
+            self.MODES[user_mode_name(file_path)] = {"file": file_path, "is_sentence": True, "user": True}
+        self.corpus_watcher = watcher.CorpusWatcher()
+        # Corpora and word banks outlive the dialog in the shared store; the dialog only holds references.
+        self.corpus_store = store.default_store()
+        self.corpus_store.acquire()
+        self.corpora = {}
+        self.word_difficulty = self.corpus_store.word_difficulty
+        self.test_seed = None
+        self.replay_seed = None
+        self.isLoading = False
+        self.load_generation = 0
 
-        if not self.word_bank_general and not self.word_bank_hard:
-            wx.CallAfter(self.Destroy)
-            return
-
-        self.incorrect_pairs = []
+        self.session_score = scoring.SessionScore()
+        self.results_model = results.ResultsModel()
+        self.keylog = keylog.KeystrokeLog()
+        self.item_timings = []
+        self.is_adaptive_test = False
         self.isRunning = False
         self.testDurationMinutes = 1
-        self.elapsedTime = 0
+        self.test_clock = TestClock()
         self.current_item_index = 0
-        self.total_correct_words = 0
-        self.total_incorrect_words = 0
+        # Chunks of upcoming items by position, or None when items are spoken whole.
+        self.prompt_chunks = None
+        self.chunk_index = 0
+        self.speech_timings = prompts.SpeechTimings()
         
         self.panel = wx.Panel(self)
         self.mainSizer = wx.BoxSizer(wx.VERTICAL)
@@ -160,40 +196,184 @@ class TestDialog(wx.Dialog):
 
         self.timer = wx.Timer(self)
         self.Bind(wx.EVT_TIMER, self.on_timer, self.timer)
+        self.watchTimer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.on_watch_timer, self.watchTimer)
         self.Bind(wx.EVT_CLOSE, self.on_close)
 
-    def load_all_data(self):
-        """Loads all datasets and creates word banks."""
-        temp_word_bank_general = set()
-        temp_word_bank_hard = set()
+        self.start_loading(announce=True)
+        self.watchTimer.Start(watcher.POLL_INTERVAL_MS)
+
+    def start_loading(self, announce=False, file_names=None):
+        """Starts loading the given datasets, or every dataset, on a worker thread."""
+        self.load_generation += 1
+        self.isLoading = True
+        self.announce_when_loaded = announce
+        self.update_ui_state()
+        if file_names is None:
+            file_names = [mode_info["file"] for mode_info in self.MODES.values() if "file" in mode_info]
+            self.corpus_watcher.reset(self.watched_files())
+        worker = threading.Thread(
+            target=self.load_all_data,
+            args=(self.load_generation, file_names),
+            name="ThaiTypeTestLoader",
+            daemon=True
+        )
+        worker.start()
+
+    def load_all_data(self, generation, file_names):
+        """Loads and tokenizes the datasets. Runs on a worker thread.
 
-        for mode_name, mode_info in self.MODES.items():
-            if "file" in mode_info:
+        Corpora still in the shared store and unchanged on disk are taken from
+        it without reading anything. Each corpus is handed back to the GUI
+        thread with wx.CallAfter as soon as it is ready, together with the
+        word banks it completes, which are decoded and sorted here.
+        """
+        prepare_tokenizer()
+        engine = default_tokenizer.active_engine()
+        word_bank_sources = {
+            tuple(mode_info["source_files"]) for mode_info in default_modes().values() if "source_files" in mode_info
+        }
+        with corpus_cache_lock:
+            cache = None
+            for file_name in file_names:
+                file_path = corpus_path(file_name)
                 try:
-                    file_path = os.path.join(os.path.dirname(__file__), "lib", mode_info["file"])
-                    with open(file_path, "r", encoding="utf-8") as f:
-                        data = [line.strip() for line in f if line.strip() and not line.strip().startswith("#")]
-                    mode_info["dataset"] = data
-                except FileNotFoundError:
-                    mode_info["dataset"] = []
-        
-        for mode_name, mode_info in self.MODES.items():
-            if mode_info.get("is_sentence") and mode_info.get("dataset"):
-                tokenized_data = [word_tokenize(s, engine="newmm") for s in mode_info["dataset"]]
-                flat_list = [word for sublist in tokenized_data for word in sublist]
-                if mode_name == "พิมพ์วรรณกรรม":
-                    temp_word_bank_hard.update(flat_list)
-                else:
-                    temp_word_bank_general.update(flat_list)
+                    corpus = self.corpus_store.lookup(file_name, file_path, engine)
+                except KeyError:
+                    # Taken before reading, so a change made while the file is read is seen next time.
+                    stamp = watcher.file_stamp(file_path)
+                    try:
+                        # An up-to-date compiled corpus is memory-mapped instead of read and tokenized.
+                        corpus = open_compiled_corpus(file_path)
+                        if corpus is not None and corpus.engine != engine:
+                            corpus.tokens = None
+                        if corpus is None:
+                            if cache is None:
+                                cache = CorpusCache(os.path.join(lib_path, CACHE_FILE_NAME), word_tokenize, engine)
+                            corpus = cache.get(file_path)
+                        self.corpus_store.put(file_name, stamp, engine, corpus)
+                    except FileNotFoundError:
+                        corpus = self.corpus_store.put(file_name, stamp, engine, None)
+                    except Exception:
+                        import logHandler
+                        logHandler.log.error(f"Failed to load dataset {file_name}", exc_info=True)
+                        corpus = None
+                word_banks = {}
+                for source_files in word_bank_sources:
+                    if file_name in source_files:
+                        word_bank = self.corpus_store.word_bank(source_files)
+                        if word_bank is not None:
+                            word_banks[source_files] = word_bank
+                wx.CallAfter(self.on_corpus_loaded, generation, file_name, corpus, word_banks)
+            if cache is not None:
+                cache.save()
+        # Load the weakness statistics here rather than on the GUI thread when a test starts.
+        adaptive.default_stats()
+        wx.CallAfter(self.on_loading_finished, generation)
+
+    def on_corpus_loaded(self, generation, file_name, corpus, word_banks):
+        """Installs one loaded corpus and the word banks built with it, and marks the modes that depend on them as ready."""
+        if not self or generation != self.load_generation:
+            return
+        self.corpora[file_name] = corpus
+        for mode_info in self.MODES.values():
+            if mode_info.get("file") == file_name:
+                mode_info["dataset"] = store.ReadOnlyView(corpus.lines) if corpus else []
+                mode_info["tokens"] = store.ReadOnlyView(corpus.tokens) if corpus and corpus.tokens is not None else []
+                mode_info["bands"] = {}
+                mode_info["ready"] = True
+        self.install_word_banks(word_banks)
+        self.update_ui_state()
 
-        self.word_bank_general = list(temp_word_bank_general)
-        self.word_bank_hard = list(temp_word_bank_hard)
+    def watched_files(self):
+        """Returns the corpus files to poll, by name: the bundled ones plus every .txt in the user corpus directory."""
+        files = {
+            mode_info["file"]: corpus_path(mode_info["file"])
+            for mode_info in self.MODES.values()
+            if "file" in mode_info and not mode_info.get("user")
+        }
+        for file_path in watcher.list_user_corpora(self.user_corpus_dir):
+            files[file_path] = file_path
+        return files
 
-        if self.word_bank_general:
-            self.MODES["พิมพ์คำ (ทั่วไป)"]["dataset"] = self.word_bank_general
-        if self.word_bank_hard:
-            self.MODES["พิมพ์คำ (ยาก)"]["dataset"] = self.word_bank_hard
+    def on_watch_timer(self, event):
+        # Datasets are never swapped during a test, and a load in flight will be followed by the next poll.
+        if not self.isRunning and not self.isLoading:
+            self.reload_changed_corpora()
 
+    def reload_changed_corpora(self):
+        """Adds and removes user modes for new and deleted files and reloads only the files that changed."""
+        changed, removed = self.corpus_watcher.poll(self.watched_files())
+        if not changed and not removed:
+            return
+        modes_changed = False
+        for file_name in removed:
+            for mode_name, mode_info in list(self.MODES.items()):
+                if mode_info.get("user") and mode_info["file"] == file_name:
+                    del self.MODES[mode_name]
+                    modes_changed = True
+            self.corpora.pop(file_name, None)
+            self.corpus_store.discard(file_name)
+        known_files = {mode_info.get("file") for mode_info in self.MODES.values()}
+        for file_name in changed:
+            if file_name not in known_files:
+                self.MODES[user_mode_name(file_name)] = {"file": file_name, "is_sentence": True, "user": True}
+                modes_changed = True
+        if modes_changed:
+            self.refresh_mode_choice()
+        if changed:
+            self.start_loading(file_names=changed)
+
+    def refresh_mode_choice(self):
+        """Lists the current modes in the mode choice, keeping the selection if that mode still exists."""
+        selected_mode = self.modeChoice.GetStringSelection()
+        self.modeChoice.Set(list(self.MODES.keys()))
+        if selected_mode in self.MODES:
+            self.modeChoice.SetStringSelection(selected_mode)
+        else:
+            self.modeChoice.SetSelection(0)
+        self.on_mode_change(None)
+
+    def install_word_banks(self, word_banks):
+        """Gives the word modes the word banks built by the loader, by source files, once their corpora are all loaded."""
+        for mode_info in self.MODES.values():
+            source_files = mode_info.get("source_files")
+            if not source_files or not all(file_name in self.corpora for file_name in source_files):
+                continue
+            word_bank = word_banks.get(tuple(source_files))
+            if word_bank is None:
+                continue
+            mode_info["dataset"] = word_bank
+            mode_info["bands"] = {}
+            mode_info["ready"] = True
+        self.word_bank_general = self.MODES["พิมพ์คำ (ทั่วไป)"].get("dataset", [])
+        self.word_bank_hard = self.MODES["พิมพ์คำ (ยาก)"].get("dataset", [])
+
+    def merge_new_lines(self, file_name, lines, tokens):
+        """Merges lines appended to a corpus file into its modes without reloading anything."""
+        # A load in flight may have read the file before the append; let it reload instead.
+        new_words = None
+        if not self.isLoading:
+            new_words = self.corpus_store.merge(file_name, watcher.file_stamp(corpus_path(file_name)), lines, tokens)
+        if new_words is None:
+            self.start_loading()
+            return
+        for mode_info in self.MODES.values():
+            if mode_info.get("file") == file_name or file_name in mode_info.get("source_files", ()):
+                mode_info["bands"] = {}
+
+    def on_loading_finished(self, generation):
+        if not self or generation != self.load_generation:
+            return
+        self.isLoading = False
+        if self.announce_when_loaded and not self.word_bank_general and not self.word_bank_hard:
+            gui.messageBox("ไม่พบชุดข้อมูลสำหรับการทดสอบ", "ข้อผิดพลาด", wx.OK | wx.ICON_ERROR)
+            # Close rather than Destroy, so on_close stops the timers and releases the corpus store.
+            wx.CallAfter(self.Close)
+            return
+        self.update_ui_state()
+        if self.announce_when_loaded:
+            speech.speakMessage("โหลดชุดข้อมูลเรียบร้อยแล้ว พร้อมเริ่มการทดสอบ")
 
     def initialize_ui(self):
         setupSizer = wx.BoxSizer(wx.HORIZONTAL)
@@ -212,16 +392,63 @@ class TestDialog(wx.Dialog):
         setupSizer.AddSpacer(20)
         setupSizer.Add(timeLabel, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
         setupSizer.Add(self.timeSpinCtrl, 1, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+
+        profileSizer = wx.BoxSizer(wx.HORIZONTAL)
+        profileLabel = wx.StaticText(self.panel, label="ชื่อผู้ทดสอบ:")
+        history_store = history.default_store()
+        try:
+            profiles = history_store.profiles()
+            latest_profile = history_store.latest_profile() or ""
+        except Exception:
+            import logHandler
+            logHandler.log.error("Failed to read the Thai Type Test history", exc_info=True)
+            profiles, latest_profile = [], ""
+        self.profileComboBox = wx.ComboBox(self.panel, choices=profiles, value=latest_profile)
+        difficultyLabel = wx.StaticText(self.panel, label="ระดับความยาก:")
+        self.difficultyChoice = wx.Choice(self.panel, choices=DIFFICULTY_CHOICES)
+        self.difficultyChoice.SetSelection(0)
+        profileSizer.Add(profileLabel, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+        profileSizer.Add(self.profileComboBox, 1, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+        profileSizer.AddSpacer(20)
+        profileSizer.Add(difficultyLabel, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+        profileSizer.Add(self.difficultyChoice, 1, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+
+        optionsSizer = wx.BoxSizer(wx.HORIZONTAL)
+        engineLabel = wx.StaticText(self.panel, label="ตัวตัดคำ:")
+        self.engineChoice = wx.Choice(self.panel, choices=[name for engine, name in TOKENIZER_CHOICES])
+        self.engineChoice.SetSelection([engine for engine, name in TOKENIZER_CHOICES].index(default_tokenizer.engine))
+        self.chunkedPromptCheckBox = wx.CheckBox(self.panel, label="อ่านประโยคยาวทีละช่วง (&P)")
+        optionsSizer.Add(engineLabel, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+        optionsSizer.Add(self.engineChoice, 1, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+        optionsSizer.AddSpacer(20)
+        optionsSizer.Add(self.chunkedPromptCheckBox, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
         
         start_button_label = "เริ่ม (&S)"
         self.startButton = wx.Button(self.panel, label=start_button_label)
         self.startButton.SetDefault()
 
+        self.loadingText = wx.StaticText(self.panel, label="กำลังโหลดชุดข้อมูล กรุณารอสักครู่...")
+
         self.typingTextCtrl = wx.TextCtrl(self.panel, style=wx.TE_PROCESS_ENTER, size=(-1, 40))
         
         self.resultsTextCtrl = wx.TextCtrl(self.panel, style=wx.TE_MULTILINE | wx.TE_READONLY | wx.TE_WORDWRAP)
         self.resultsTextCtrl.Hide()
-        
+
+        self.errorsSizer = wx.BoxSizer(wx.HORIZONTAL)
+        errorKindLabel = wx.StaticText(self.panel, label="แสดงข้อผิดพลาด:")
+        self.errorKindChoice = wx.Choice(self.panel, choices=["ทุกประเภท"] + [name for kind, name in results.ERROR_KIND_NAMES])
+        self.errorKindChoice.SetSelection(0)
+        errorSortLabel = wx.StaticText(self.panel, label="เรียงตาม:")
+        self.errorSortChoice = wx.Choice(self.panel, choices=[heading for column, heading in results.COLUMNS])
+        self.errorSortChoice.SetSelection(0)
+        self.errorsSizer.Add(errorKindLabel, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+        self.errorsSizer.Add(self.errorKindChoice, 1, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+        self.errorsSizer.AddSpacer(20)
+        self.errorsSizer.Add(errorSortLabel, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+        self.errorsSizer.Add(self.errorSortChoice, 1, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+        self.errorsListCtrl = ResultsListCtrl(self.panel, self.results_model)
+        self.errorsListCtrl.Hide()
+
         self.dynamicButtonSizer = wx.BoxSizer(wx.HORIZONTAL)
         self.addLyricsButton = wx.Button(self.panel, label="เพิ่มเนื้อเพลงจาก URL")
         self.editDataButton = wx.Button(self.panel, label="แก้ไขชุดข้อมูล")
@@ -231,28 +458,79 @@ class TestDialog(wx.Dialog):
         actionSizer = wx.BoxSizer(wx.HORIZONTAL)
         close_button_label = "ปิด (&C)"
         self.closeButton = wx.Button(self.panel, id=wx.ID_CANCEL, label=close_button_label)
+        self.replayButton = wx.Button(self.panel, label="ทดสอบซ้ำลำดับเดิม (&R)")
+        self.replayButton.Hide()
+        self.exportTimingButton = wx.Button(self.panel, label="ส่งออกข้อมูลจังหวะการพิมพ์ (&E)")
+        self.exportTimingButton.Hide()
+        self.historyButton = wx.Button(self.panel, label="ประวัติการทดสอบ (&H)")
+        self.userCorpusButton = wx.Button(self.panel, label="โฟลเดอร์ชุดข้อมูลของฉัน (&F)")
         actionSizer.AddStretchSpacer()
+        actionSizer.Add(self.historyButton, 0, wx.ALL, 5)
+        actionSizer.Add(self.userCorpusButton, 0, wx.ALL, 5)
+        actionSizer.Add(self.replayButton, 0, wx.ALL, 5)
+        actionSizer.Add(self.exportTimingButton, 0, wx.ALL, 5)
         actionSizer.Add(self.closeButton, 0, wx.ALL, 5)
         actionSizer.AddStretchSpacer()
         
         self.mainSizer.Add(setupSizer, 0, wx.EXPAND | wx.ALL, 10)
+        self.mainSizer.Add(profileSizer, 0, wx.EXPAND | wx.LEFT | wx.RIGHT, 10)
+        self.mainSizer.Add(optionsSizer, 0, wx.EXPAND | wx.LEFT | wx.RIGHT, 10)
         self.mainSizer.Add(self.dynamicButtonSizer, 0, wx.EXPAND | wx.LEFT | wx.RIGHT, 5)
         self.mainSizer.Add(self.startButton, 0, wx.EXPAND | wx.ALL, 10)
+        self.mainSizer.Add(self.loadingText, 0, wx.LEFT | wx.RIGHT, 10)
         self.mainSizer.Add(self.typingTextCtrl, 1, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
         self.mainSizer.Add(self.resultsTextCtrl, 1, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
+        self.mainSizer.Add(self.errorsSizer, 0, wx.EXPAND | wx.LEFT | wx.RIGHT, 5)
+        self.mainSizer.Add(self.errorsListCtrl, 1, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
+        self.mainSizer.Show(self.errorsSizer, False)
         self.mainSizer.Add(actionSizer, 0, wx.EXPAND | wx.LEFT | wx.RIGHT, 5)
         
         # Bind events
         self.modeChoice.Bind(wx.EVT_CHOICE, self.on_mode_change)
         self.timeSpinCtrl.Bind(wx.EVT_KEY_DOWN, self.on_key_down_on_setup_controls)
+        self.difficultyChoice.Bind(wx.EVT_KEY_DOWN, self.on_key_down_on_setup_controls)
+        self.engineChoice.Bind(wx.EVT_CHOICE, self.on_engine_change)
+        self.engineChoice.Bind(wx.EVT_KEY_DOWN, self.on_key_down_on_setup_controls)
+        self.chunkedPromptCheckBox.Bind(wx.EVT_KEY_DOWN, self.on_key_down_on_setup_controls)
         self.startButton.Bind(wx.EVT_BUTTON, self.on_start)
         self.typingTextCtrl.Bind(wx.EVT_TEXT_ENTER, self.on_enter_press)
+        self.typingTextCtrl.Bind(wx.EVT_KEY_DOWN, self.on_typing_key_down)
         self.typingTextCtrl.Bind(wx.EVT_TEXT_PASTE, self.on_paste)
+        self.typingTextCtrl.Bind(wx.EVT_CHAR, self.on_typing_char)
+        self.typingTextCtrl.Bind(wx.EVT_TEXT, self.on_typing_text)
         self.addLyricsButton.Bind(wx.EVT_BUTTON, self.on_add_lyrics)
+        self.replayButton.Bind(wx.EVT_BUTTON, self.on_replay)
+        self.exportTimingButton.Bind(wx.EVT_BUTTON, self.on_export_timing)
+        self.historyButton.Bind(wx.EVT_BUTTON, self.on_show_history)
+        self.userCorpusButton.Bind(wx.EVT_BUTTON, self.on_open_user_corpus_dir)
+        self.errorKindChoice.Bind(wx.EVT_CHOICE, self.on_error_filter_change)
+        self.errorSortChoice.Bind(wx.EVT_CHOICE, self.on_error_sort_change)
+        self.errorsListCtrl.Bind(wx.EVT_LIST_COL_CLICK, self.on_error_column_click)
         
         # CRITICAL FIX: The missing line is added here.
         self.editDataButton.Bind(wx.EVT_BUTTON, self.on_edit_dataset)
 
+    def on_error_filter_change(self, event):
+        selection = self.errorKindChoice.GetSelection()
+        self.results_model.set_filter(results.ERROR_KIND_NAMES[selection - 1][0] if selection > 0 else None)
+        self.errorsListCtrl.refresh_rows()
+
+    def on_error_sort_change(self, event):
+        self.results_model.sort_by(results.COLUMNS[self.errorSortChoice.GetSelection()][0])
+        self.errorsListCtrl.refresh_rows()
+
+    def on_error_column_click(self, event):
+        """Sorts by the clicked column; clicking the sorted column again reverses the order."""
+        column = results.COLUMNS[event.GetColumn()][0]
+        model = self.results_model
+        model.sort_by(column, descending=model.sort_column == column and not model.descending)
+        self.errorSortChoice.SetSelection(event.GetColumn())
+        self.errorsListCtrl.refresh_rows()
+
+    def show_errors(self, show):
+        self.mainSizer.Show(self.errorsSizer, show)
+        self.errorsListCtrl.Show(show)
+
     def on_key_down_on_setup_controls(self, event):
         if event.GetKeyCode() in (wx.WXK_RETURN, wx.WXK_NUMPAD_ENTER):
             if self.startButton.IsEnabled():
@@ -264,16 +542,93 @@ class TestDialog(wx.Dialog):
         tones.beep(200, 50)
         return
 
+    def on_typing_char(self, event):
+        # Skip only marks the key for the text control, which gets it after this handler returns;
+        # recording is a few array stores, so it does not delay NVDA's echo.
+        event.Skip()
+        if self.isRunning and event.GetKeyCode() not in (wx.WXK_RETURN, wx.WXK_NUMPAD_ENTER):
+            self.keylog.record(keylog.KEY_EVENT, self.current_item_index, event.GetUnicodeKey())
+
+    def on_typing_key_down(self, event):
+        """F2 speaks the next chunk of the current item and Shift+F2 the current chunk again."""
+        if event.GetKeyCode() != wx.WXK_F2:
+            event.Skip()
+            return
+        # Nothing to speak during the warning before the test starts.
+        if not self.isRunning or self.test_clock.started_at is None or self.test_clock.stopped_at is not None:
+            return
+        chunks = self.current_prompt_chunks()
+        if not event.ShiftDown():
+            self.chunk_index += 1
+            if self.chunk_index >= len(chunks):
+                # After the last chunk, start again from the first.
+                self.chunk_index = 0
+                if len(chunks) > 1:
+                    tones.beep(440, 50)
+        self.update_title()
+        speech.speakMessage(chunks[self.chunk_index])
+
+    def on_typing_text(self, event):
+        event.Skip()
+        if self.isRunning:
+            self.keylog.record(keylog.TEXT_EVENT, self.current_item_index, self.typingTextCtrl.GetLastPosition())
+
     def on_mode_change(self, event):
         self.update_title()
         selected_mode = self.modeChoice.GetStringSelection()
         is_lyrics_mode = (selected_mode == "พิมพ์เนื้อเพลง")
-        is_editable_mode = selected_mode in ["พิมพ์ประโยค", "พิมพ์เนื้อเพลง", "พิมพ์วรรณกรรม"]
+        is_editable_mode = "file" in self.MODES[selected_mode]
         self.addLyricsButton.Show(is_lyrics_mode)
         self.editDataButton.Show(is_editable_mode)
         self.dynamicButtonSizer.Show(is_lyrics_mode or is_editable_mode)
+        self.startButton.Enable(not self.isRunning and self.is_mode_ready(selected_mode))
         self.panel.Layout()
 
+    def on_engine_change(self, event):
+        """Switches the tokenizer engine, saves the choice and reloads every dataset with it."""
+        engine = TOKENIZER_CHOICES[self.engineChoice.GetSelection()][0]
+        if engine == default_tokenizer.engine:
+            return
+        default_tokenizer.set_engine(engine)
+        config.conf[CONFIG_SECTION]["tokenizerEngine"] = engine
+        # Tokens of the old engine must not be scored against the new one's.
+        for mode_info in self.MODES.values():
+            if "file" in mode_info or "source_files" in mode_info:
+                mode_info["ready"] = False
+        self.start_loading(announce=True)
+
+    def is_mode_ready(self, mode_name):
+        """Returns True once the dataset of the given mode has been loaded."""
+        return self.MODES[mode_name].get("ready", False)
+
+    def selected_band(self):
+        """Returns the selected difficulty band, or None for every item."""
+        selection = self.difficultyChoice.GetSelection()
+        return selection - 1 if selection > 0 else None
+
+    def band_indices(self, mode_info, band):
+        """Returns the positions of a mode's items in a difficulty band.
+
+        The scores come from the stored difficulty index, so a band is one
+        pass over a list of numbers; it is kept until the dataset changes.
+        """
+        bands = mode_info.setdefault("bands", {})
+        if band not in bands:
+            dataset = mode_info.get("dataset", [])
+            if mode_info.get("is_sentence"):
+                corpus = self.corpora.get(mode_info["file"])
+                scores = corpus.line_difficulty if corpus else []
+                limits = corpus.band_limits if corpus else (0, 0)
+            else:
+                word_difficulty = self.word_difficulty
+                scores = [
+                    word_difficulty[word] if word in word_difficulty else pipeline.difficulty(word)
+                    for word in dataset
+                ]
+                limits = pipeline.WORD_BAND_LIMITS
+            bands[band] = [index for index, score in enumerate(scores) if pipeline.band_of(score, limits) == band]
+        return bands[band]
+
     def on_add_lyrics(self, event):
         clipboard = wx.TheClipboard
         if clipboard.Open():
@@ -281,26 +636,102 @@ class TestDialog(wx.Dialog):
             success = clipboard.GetData(data)
             clipboard.Close()
             if success:
-                url = data.GetText()
-                if "kapook.com" in url or "siamzone.com" in url or "เพลง.meemodel.com" in url or "xn--72c9bva0i.meemodel.com" in url:
-                    speech.speakMessage("กำลังดึงข้อมูลเนื้อเพลง กรุณารอสักครู่")
-                    lyrics = fetch_lyrics(url)
-                    if lyrics:
-                        file_path = os.path.join(os.path.dirname(__file__), "lib", "lyrics_th.txt")
-                        try:
-                            with open(file_path, "a", encoding="utf-8") as f:
-                                f.write(f"\n#credit: {url}\n")
-                                f.write(lyrics)
-                            gui.messageBox("เพิ่มเนื้อเพลงเรียบร้อยแล้ว", "สำเร็จ", wx.OK | wx.ICON_INFORMATION)
-                            self.load_all_data()
-                        except Exception as e:
-                             gui.messageBox(f"ไม่สามารถบันทึกไฟล์เนื้อเพลงได้: {e}", "ข้อผิดพลาด", wx.OK | wx.ICON_ERROR)
+                urls = extract_urls(data.GetText())
+                if urls:
+                    if len(urls) == 1:
+                        speech.speakMessage("กำลังดึงข้อมูลเนื้อเพลง กรุณารอสักครู่")
                     else:
-                        gui.messageBox("ไม่สามารถดึงเนื้อเพลงจาก URL ที่ให้มาได้", "ล้มเหลว", wx.OK | wx.ICON_ERROR)
+                        speech.speakMessage(f"กำลังดึงข้อมูลเนื้อเพลง {len(urls)} รายการ กรุณารอสักครู่")
+                    self.addLyricsButton.Disable()
+                    threading.Thread(target=self.fetch_lyrics_in_background, args=(urls,), name="ThaiTypeTestLyrics", daemon=True).start()
                 else:
                     self.ask_to_open_file("URL ไม่ถูกต้องหรือไม่รองรับ", "lyrics_th.txt")
             else:
                 self.ask_to_open_file("ไม่พบ URL ใน Clipboard", "lyrics_th.txt")
+
+    def fetch_lyrics_in_background(self, urls):
+        """Downloads the lyrics on a worker thread and reports back through wx.CallAfter."""
+        def on_result(url, lyrics, done_count, total):
+            if total > 1:
+                wx.CallAfter(self.on_lyrics_progress, lyrics is not None, done_count, total)
+        # URLs imported before are skipped without any request.
+        index = import_index(corpus_path("lyrics_th.txt"))
+        duplicates = [url for url in urls if index.has_url(url)]
+        results = fetch_lyrics_batch([url for url in urls if not index.has_url(url)], on_result)
+        # Normalize and deduplicate the new songs against the corpus and each other, then tokenize
+        # only what is left here, so the GUI thread just has to write and merge it. The corpus's
+        # index lives in the store and only takes the lines once they are merged.
+        corpus_lines = self.corpus_store.deduplicator("lyrics_th.txt") or pipeline.Deduplicator()
+        deduplicator = pipeline.Deduplicator()
+        batch_hashes = set()
+        imported = []
+        new_lines = []
+        for url, lyrics in results:
+            if not lyrics:
+                continue
+            lines = split_dataset_lines(lyrics)
+            content_hash = song_hash(lines)
+            if index.has_song(content_hash) or content_hash in batch_hashes:
+                # The same song, imported before or in this batch from another URL.
+                duplicates.append(url)
+                continue
+            batch_hashes.add(content_hash)
+            song_lines = []
+            for line in lines:
+                line = pipeline.normalize_line(line)
+                if line and not corpus_lines.contains(line) and deduplicator.add(line):
+                    song_lines.append(line)
+            if song_lines:
+                imported.append((url, content_hash, song_lines))
+                new_lines.extend(song_lines)
+            else:
+                duplicates.append(url)
+        new_tokens = [word_tokenize(line) for line in new_lines]
+        wx.CallAfter(self.on_lyrics_fetched, results, imported, duplicates, new_lines, new_tokens)
+
+    def on_lyrics_progress(self, succeeded, done_count, total):
+        if not self:
+            return
+        status = "สำเร็จ" if succeeded else "ล้มเหลว"
+        speech.speakMessage(f"เพลงที่ {done_count} จาก {total} {status}")
+
+    def on_lyrics_fetched(self, results, imported, duplicates, new_lines, new_tokens):
+        """Appends the new lines of the downloaded lyrics to lyrics_th.txt and reports the outcome."""
+        if not self:
+            return
+        self.addLyricsButton.Enable()
+        failed = [url for url, lyrics in results if not lyrics]
+        total = len(imported) + len(failed) + len(duplicates)
+        if not imported:
+            if duplicates:
+                gui.messageBox("เนื้อเพลงจาก URL ที่ให้มามีอยู่ในชุดข้อมูลแล้ว จึงไม่ได้เพิ่มซ้ำ", "ไม่มีเนื้อเพลงใหม่", wx.OK | wx.ICON_INFORMATION)
+            else:
+                gui.messageBox("ไม่สามารถดึงเนื้อเพลงจาก URL ที่ให้มาได้", "ล้มเหลว", wx.OK | wx.ICON_ERROR)
+            return
+        file_path = corpus_path("lyrics_th.txt")
+        try:
+            with open(file_path, "a", encoding="utf-8") as f:
+                for url, content_hash, song_lines in imported:
+                    f.write(f"\n{CREDIT_PREFIX} {url}\n{CONTENT_PREFIX} {content_hash}\n")
+                    f.write("\n".join(song_lines))
+        except Exception as e:
+            gui.messageBox(f"ไม่สามารถบันทึกไฟล์เนื้อเพลงได้: {e}", "ข้อผิดพลาด", wx.OK | wx.ICON_ERROR)
+            return
+        record_import(file_path, [(url, content_hash) for url, content_hash, song_lines in imported])
+        if not failed and not duplicates:
+            gui.messageBox("เพิ่มเนื้อเพลงเรียบร้อยแล้ว", "สำเร็จ", wx.OK | wx.ICON_INFORMATION)
+        else:
+            message = f"เพิ่มเนื้อเพลงสำเร็จ {len(imported)} จาก {total} รายการ"
+            if failed:
+                failed_list = "\n".join(failed)
+                message += f"\n\nดึงข้อมูลไม่สำเร็จ:\n{failed_list}"
+            if duplicates:
+                duplicate_list = "\n".join(duplicates)
+                message += f"\n\nมีอยู่ในชุดข้อมูลแล้ว:\n{duplicate_list}"
+            gui.messageBox(message, "สำเร็จบางส่วน", wx.OK | wx.ICON_WARNING)
+        self.merge_new_lines("lyrics_th.txt", new_lines, new_tokens)
+        # The append is already merged; the next poll must not reload the file for it.
+        self.corpus_watcher.update({"lyrics_th.txt": file_path})
     
     def ask_to_open_file(self, message, filename):
         dialog = wx.MessageDialog(self, f"{message}\n\nคุณต้องการเปิดไฟล์ {filename} เพื่อแก้ไขด้วยตนเองหรือไม่?", "แจ้งเตือน", wx.YES_NO | wx.ICON_QUESTION)
@@ -316,28 +747,47 @@ class TestDialog(wx.Dialog):
 
     def open_data_file(self, filename):
         try:
-            file_path = os.path.join(os.path.dirname(__file__), "lib", filename)
+            file_path = corpus_path(filename)
             if not os.path.exists(file_path):
                 open(file_path, 'a').close()
             os.startfile(file_path)
         except Exception as e:
             gui.messageBox(f"ไม่สามารถเปิดไฟล์ได้: {e}", "ข้อผิดพลาด", wx.OK | wx.ICON_ERROR)
 
+    def on_open_user_corpus_dir(self, event):
+        """Opens the user corpus directory, where every .txt file becomes a mode."""
+        try:
+            os.makedirs(self.user_corpus_dir, exist_ok=True)
+            os.startfile(self.user_corpus_dir)
+        except Exception as e:
+            gui.messageBox(f"ไม่สามารถเปิดโฟลเดอร์ได้: {e}", "ข้อผิดพลาด", wx.OK | wx.ICON_ERROR)
+
     def update_title(self, event=None):
         base_title = "ทดสอบพิมพ์ภาษาไทย"
         if self.isRunning and hasattr(self, 'current_dataset') and self.current_item_index < len(self.current_dataset):
-            current_item = self.current_dataset[self.current_item_index]
-            self.SetTitle(current_item)
+            # In chunked mode the title is the chunk being spoken, not the whole item.
+            self.SetTitle(self.current_prompt_chunks()[self.chunk_index])
         else:
             mode_text = self.modeChoice.GetStringSelection()
             new_title = f"{base_title} - [{mode_text}]"
+            if not self.is_mode_ready(mode_text):
+                new_title += " (กำลังโหลดชุดข้อมูล...)"
             self.SetTitle(new_title)
 
     def update_ui_state(self):
         is_setting_up = not self.isRunning
         self.modeChoice.Enable(is_setting_up)
         self.timeSpinCtrl.Enable(is_setting_up)
+        self.profileComboBox.Enable(is_setting_up)
+        self.difficultyChoice.Enable(is_setting_up)
+        self.engineChoice.Enable(is_setting_up and not self.isLoading)
+        self.chunkedPromptCheckBox.Enable(is_setting_up)
+        self.historyButton.Show(is_setting_up)
+        self.userCorpusButton.Show(is_setting_up)
         self.startButton.Enable(is_setting_up)
+        self.loadingText.Show(is_setting_up and self.isLoading)
+        self.replayButton.Show(is_setting_up and self.test_seed is not None)
+        self.exportTimingButton.Show(is_setting_up and bool(self.item_timings))
         self.typingTextCtrl.Show(self.isRunning)
         self.typingTextCtrl.Enable(self.isRunning)
         if not self.isRunning:
@@ -345,17 +795,27 @@ class TestDialog(wx.Dialog):
             self.on_mode_change(None)
         if self.isRunning:
             self.resultsTextCtrl.Hide()
+            self.show_errors(False)
             self.addLyricsButton.Hide()
             self.editDataButton.Hide()
             self.dynamicButtonSizer.Show(False)
         self.panel.Layout()
     
     def on_start(self, event):
-        self.load_all_data()
+        # Pick up edits to the dataset files while the warning is spoken; only changed files are reloaded.
+        if not self.isLoading:
+            self.reload_changed_corpora()
         selected_mode = self.modeChoice.GetStringSelection()
+        if not self.is_mode_ready(selected_mode):
+            speech.speakMessage("ชุดข้อมูลของโหมดนี้ยังโหลดไม่เสร็จ กรุณารอสักครู่")
+            return
         if not self.MODES[selected_mode].get("dataset"):
             gui.messageBox(f"ไม่พบชุดข้อมูลสำหรับโหมด '{selected_mode}'\nกรุณาเพิ่มข้อมูลในไฟล์ .txt หรือเลือกโหมดอื่น", "ข้อผิดพลาด", wx.OK | wx.ICON_ERROR)
             return
+        band = self.selected_band()
+        if band is not None and not self.band_indices(self.MODES[selected_mode], band):
+            gui.messageBox(f"ไม่มีข้อมูลระดับ '{DIFFICULTY_CHOICES[band + 1]}' ในโหมด '{selected_mode}'\nกรุณาเลือกระดับความยากอื่น", "ข้อผิดพลาด", wx.OK | wx.ICON_ERROR)
+            return
         self.isRunning = True
         self.update_ui_state()
         self.typingTextCtrl.SetFocus()
@@ -364,181 +824,471 @@ class TestDialog(wx.Dialog):
         speech.speakMessage(warning_message)
         wx.CallLater(5000, self.begin_test_logic)
     
+    def on_replay(self, event):
+        """Starts a new test with the same mode and the same order of items as the last one."""
+        self.replay_seed = self.test_seed
+        self.on_start(event)
+        if not self.isRunning:
+            self.replay_seed = None
+
     def begin_test_logic(self):
         if not self.IsShown(): return
-        self.elapsedTime = 0
         self.current_item_index = 0
-        self.total_correct_words = 0
-        self.total_incorrect_words = 0
-        self.incorrect_pairs = []
+        self.session_score = scoring.SessionScore()
         self.testDurationMinutes = self.timeSpinCtrl.GetValue()
+        self.test_started_at = time.time()
+        self.enter_latencies = []
+        self.enter_pressed_at = None
+        self.keylog.clear()
+        self.item_timings = []
         selected_mode = self.modeChoice.GetStringSelection()
-        self.current_dataset = list(self.MODES[selected_mode].get("dataset", []))
-        if not self.current_dataset:
+        mode_info = self.MODES[selected_mode]
+        dataset = mode_info.get("dataset", [])
+        tokens = mode_info.get("tokens")
+        band = self.selected_band()
+        if band is not None:
+            # Only the items in the band, looked up through the difficulty index without copying.
+            indices = self.band_indices(mode_info, band)
+            dataset = pipeline.IndexedView(dataset, indices)
+            tokens = pipeline.IndexedView(tokens, indices) if tokens else None
+        if not dataset:
             self.isRunning = False
             self.update_ui_state()
             return
-        random.shuffle(self.current_dataset)
+        self.weakness = adaptive.default_stats()
+        self.is_adaptive_test = mode_info.get("adaptive", False)
+        if self.is_adaptive_test:
+            # Adaptive draws follow the statistics as they change, so the order cannot be replayed.
+            self.test_seed = None
+            self.current_dataset = adaptive.AdaptiveDataset(dataset, self.weakness, new_seed())
+        else:
+            # Items are drawn lazily in a seeded random order instead of copying and shuffling the dataset.
+            self.test_seed = self.replay_seed if self.replay_seed is not None else new_seed()
+            self.current_dataset = SampledDataset(dataset, self.test_seed)
+        self.replay_seed = None
+        # Cached tokens are looked up through the same order so sentences need not be re-tokenized.
+        self.current_tokens = tokens if mode_info.get("is_sentence") and tokens else None
+        self.reference_words = {}
+        # Words are short enough to be spoken whole.
+        self.prompt_chunks = {} if self.chunkedPromptCheckBox.GetValue() and mode_info.get("is_sentence") else None
+        self.speech_timings.clear()
+        self.prefetch_reference_words()
         self.typingTextCtrl.Clear()
         tones.beep(1000, 100)
-        self.timer.Start(1000)
+        self.test_clock.start(self.testDurationMinutes * 60)
+        self.schedule_timer()
         self.speak_current_item()
 
+    def prefetch_reference_words(self):
+        """Prepares the scored reference words and spoken chunks of the current and next few sentences."""
+        if self.current_tokens is None and not self.MODES[self.modeChoice.GetStringSelection()].get("is_sentence"):
+            return
+        end = min(self.current_item_index + REFERENCE_LOOKAHEAD, len(self.current_dataset))
+        missing = [i for i in range(self.current_item_index, end) if i not in self.reference_words]
+        if not missing:
+            return
+        if self.current_tokens is not None:
+            for i in missing:
+                tokens = self.current_tokens[self.current_dataset.source_index(i)]
+                self.reference_words[i] = filter_scored_words(tokens)
+                if self.prompt_chunks is not None:
+                    self.prompt_chunks[i] = prompts.chunk_prompt(self.current_dataset[i], tokens)
+        else:
+            # No cached tokens for this dataset; tokenize ahead on a worker thread.
+            items = [(i, self.current_dataset[i]) for i in missing]
+            threading.Thread(
+                target=self.tokenize_reference_words, args=(self.reference_words, self.prompt_chunks, items), daemon=True
+            ).start()
+
+    def tokenize_reference_words(self, reference_words, prompt_chunks, items):
+        for i, item in items:
+            tokens = word_tokenize(item)
+            if prompt_chunks is not None:
+                prompt_chunks[i] = prompts.chunk_prompt(item, tokens)
+            reference_words[i] = filter_scored_words(tokens)
+
+    def current_prompt_chunks(self):
+        """Returns the chunks the current item is spoken in; it is one chunk unless prompts are chunked."""
+        item = self.current_dataset[self.current_item_index]
+        if self.prompt_chunks is None:
+            return [item]
+        chunks = self.prompt_chunks.get(self.current_item_index)
+        if chunks is None:
+            # The worker thread has not got to this item yet.
+            chunks = self.prompt_chunks[self.current_item_index] = prompts.chunk_prompt(item, word_tokenize(item))
+        return chunks
+
     def on_enter_press(self, event):
         if not self.isRunning: return
         typed_item = self.typingTextCtrl.GetValue().strip()
         if not typed_item:
             self.speak_current_item()
             return
+        self.enter_pressed_at = time.perf_counter()
         correct_item = self.current_dataset[self.current_item_index]
         is_sentence_mode = self.MODES[self.modeChoice.GetStringSelection()].get("is_sentence", False)
-        if not is_sentence_mode:
-            if typed_item == correct_item:
-                self.total_correct_words += 1
-            else:
-                self.total_incorrect_words += 1
-                self.incorrect_pairs.append((correct_item, typed_item))
-        else:
-            punctuation_to_ignore = string.punctuation + "ๆฯ“”"
-            correct_tokens = word_tokenize(correct_item, engine="newmm")
-            typed_tokens = word_tokenize(typed_item, engine="newmm")
-            correct_words_filtered = [word for word in correct_tokens if word not in punctuation_to_ignore and not word.isspace()]
-            typed_words_filtered = [word for word in typed_tokens if word not in punctuation_to_ignore and not word.isspace()]
-            matcher = difflib.SequenceMatcher(None, correct_words_filtered, typed_words_filtered)
-            sentence_correct, sentence_incorrect = 0, 0
-            for tag, i1, i2, j1, j2 in matcher.get_opcodes():
-                if tag == 'equal':
-                    sentence_correct += (i2 - i1)
-                else:
-                    num_correct_in_chunk = i2 - i1
-                    num_typed_in_chunk = j2 - j1
-                    sentence_incorrect += max(num_correct_in_chunk, num_typed_in_chunk)
-            self.total_correct_words += sentence_correct
-            self.total_incorrect_words += sentence_incorrect
-            if sentence_incorrect > 0:
-                self.incorrect_pairs.append((correct_item, typed_item))
+        item_score, correct_words_filtered = scoring.score_item(
+            correct_item,
+            typed_item,
+            is_sentence_mode,
+            self.reference_words.pop(self.current_item_index, None) if is_sentence_mode else None,
+            word_tokenize
+        )
+        self.keylog.record(keylog.ITEM_SUBMITTED, self.current_item_index, item_score.correct + item_score.incorrect)
+        self.session_score.add(correct_item, typed_item, item_score)
+        changed_words, changed_chars = self.weakness.record(correct_words_filtered, item_score.errors)
+        if self.is_adaptive_test:
+            self.current_dataset.update(changed_words, changed_chars)
         self.typingTextCtrl.Clear()
+        if self.prompt_chunks is not None:
+            self.prompt_chunks.pop(self.current_item_index, None)
         self.current_item_index += 1
         if self.current_item_index < len(self.current_dataset):
             self.speak_current_item()
+            self.prefetch_reference_words()
         else:
             self.end_test()
 
+    def schedule_timer(self):
+        """Wakes the timer at the next beep or at the end of the test, whichever is first."""
+        self.timer.StartOnce(int(self.test_clock.seconds_to_next_deadline() * 1000) + 1)
+
     def on_timer(self, event):
         try:
             if not self.IsShown():
-                event.GetTimer().Stop()
                 return
         except wx.wxAssertionError:
-            event.GetTimer().Stop()
             return
-        self.elapsedTime += 1
-        total_duration = self.testDurationMinutes * 60
-        time_remaining = total_duration - self.elapsedTime
-        if time_remaining == 4: tones.beep(440, 70)
-        elif time_remaining == 3: tones.beep(550, 70)
-        elif time_remaining == 2: tones.beep(660, 70)
-        elif time_remaining == 1: tones.beep(770, 70)
-        if self.elapsedTime > 0 and self.elapsedTime % 60 == 0:
-            tones.beep(440, 50)
-        if self.elapsedTime >= total_duration:
+        if not self.isRunning:
+            return
+        # Beeps and the end of the test follow the clock, however late this tick is.
+        for pitch, length in self.test_clock.due_beeps():
+            tones.beep(pitch, length)
+        if self.test_clock.is_over():
             self.end_test()
+        else:
+            self.schedule_timer()
 
     def on_close(self, event):
         self.timer.Stop()
+        self.watchTimer.Stop()
+        self.corpus_store.release()
+        wx.CallLater(store.IDLE_EVICT_SECONDS * 1000, store.evict_idle)
         self.Destroy()
 
     def speak_current_item(self):
+        """Speaks the current item, or its first chunk in chunked mode, timing how soon speech starts."""
         if self.isRunning and self.current_item_index < len(self.current_dataset):
+            self.chunk_index = 0
             self.update_title()
-            speech.speakMessage(self.current_dataset[self.current_item_index])
+            prompt = self.current_prompt_chunks()[0]
+            on_first_audio, on_spoken = self.speech_timings.callbacks(
+                self.current_item_index, len(prompt), self.prompt_chunks is not None
+            )
+            speech.speak([CallbackCommand(on_first_audio), prompt, CallbackCommand(on_spoken)])
+            self.keylog.record(keylog.ITEM_SHOWN, self.current_item_index)
+            if self.enter_pressed_at is not None:
+                self.enter_latencies.append(time.perf_counter() - self.enter_pressed_at)
+                self.enter_pressed_at = None
+
+    def log_enter_latency(self):
+        """Logs how long it took from Enter to handing the next prompt to speech."""
+        if not self.enter_latencies:
+            return
+        latencies = sorted(self.enter_latencies)
+        mean_ms = sum(latencies) / len(latencies) * 1000
+        p95_ms = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000
+        import logHandler
+        logHandler.log.info(
+            f"Thai Type Test: Enter-to-speech latency over {len(latencies)} items: "
+            f"mean {mean_ms:.1f} ms, p95 {p95_ms:.1f} ms, max {latencies[-1] * 1000:.1f} ms"
+        )
+
+    def log_speech_timings(self):
+        """Logs how soon speech started on the test's prompts, for comparing chunked and whole-line delivery."""
+        summary = self.speech_timings.summary(self.prompt_chunks is not None)
+        if summary:
+            import logHandler
+            logHandler.log.info(summary)
+
+    def format_weak_chars(self):
+        """Returns the report line naming the characters typed wrong most often, across all sessions."""
+        weak_chars = self.weakness.weakest_chars(WEAK_CHARS_REPORTED)
+        if not weak_chars:
+            return ""
+        category_names = {
+            adaptive.CONSONANT: "พยัญชนะ",
+            adaptive.VOWEL: "สระ",
+            adaptive.TONE_MARK: "วรรณยุกต์",
+            adaptive.OTHER: "เครื่องหมาย",
+        }
+        # Combining marks are shown on a dotted circle so that they can be read on their own.
+        chars = ", ".join(
+            f"{'◌' + char if char in scoring.THAI_COMBINING_MARKS else char} "
+            f"({category_names[adaptive.char_category(char)]}) {rate * 100:.0f}%"
+            for char, rate in weak_chars
+        )
+        return f"- ตัวอักษรที่พิมพ์ผิดบ่อย: {chars}\n"
+
+    def format_keystroke_timing(self):
+        """Returns the report lines about time to first key, per-item speed and inter-key intervals."""
+        if not self.item_timings:
+            return ""
+        stats = keylog.timing_summary(self.item_timings)
+        lines = ""
+        if stats["first_key_mean"] is not None:
+            lines += f"- เวลาเฉลี่ยก่อนเริ่มพิมพ์แต่ละข้อ: {stats['first_key_mean']:.1f} วินาที\n"
+        if stats["wpm_median"] is not None:
+            lines += (
+                f"- ความเร็วรายข้อ: มัธยฐาน {stats['wpm_median']:.1f}, "
+                f"ช้าสุด {stats['wpm_min']:.1f}, เร็วสุด {stats['wpm_max']:.1f} คำต่อนาที\n"
+            )
+        histogram = keylog.interval_histogram(self.item_timings)
+        if any(count for bound, count in histogram):
+            bins = []
+            lower = 0
+            for bound, count in histogram:
+                if count:
+                    if bound is None:
+                        bins.append(f"{lower} ขึ้นไป: {count}")
+                    elif lower == 0:
+                        bins.append(f"ต่ำกว่า {bound}: {count}")
+                    else:
+                        bins.append(f"{lower}-{bound}: {count}")
+                lower = bound
+            lines += f"- ช่วงห่างระหว่างการกดแป้น (มิลลิวินาที): {', '.join(bins)}\n"
+        if self.keylog.dropped:
+            import logHandler
+            logHandler.log.info(f"Thai Type Test: keystroke log overflowed, {self.keylog.dropped} oldest events dropped")
+        return lines
+
+    def on_export_timing(self, event):
+        """Saves the raw keystroke events and the per-item timings as two CSV files."""
+        # Adaptive tests have no seed; they are named by when they started.
+        if self.test_seed is not None:
+            name = self.test_seed
+        else:
+            name = time.strftime("%Y%m%d_%H%M%S", time.localtime(self.test_started_at))
+        dialog = wx.FileDialog(
+            self,
+            "ส่งออกข้อมูลจังหวะการพิมพ์",
+            defaultFile=f"thai_type_test_{name}.csv",
+            wildcard="CSV (*.csv)|*.csv",
+            style=wx.FD_SAVE | wx.FD_OVERWRITE_PROMPT
+        )
+        if dialog.ShowModal() != wx.ID_OK:
+            dialog.Destroy()
+            return
+        events_path = dialog.GetPath()
+        dialog.Destroy()
+        items_path = os.path.splitext(events_path)[0] + "_items.csv"
+        items = {timing.item: self.current_dataset[timing.item] for timing in self.item_timings}
+        try:
+            keylog.write_events_csv(events_path, self.keylog)
+            keylog.write_items_csv(items_path, self.item_timings, items)
+        except OSError as e:
+            gui.messageBox(f"ไม่สามารถบันทึกไฟล์ได้: {e}", "ข้อผิดพลาด", wx.OK | wx.ICON_ERROR)
+            return
+        gui.messageBox(
+            f"บันทึกข้อมูลจังหวะการพิมพ์แล้ว\n{events_path}\n{items_path}",
+            "สำเร็จ",
+            wx.OK | wx.ICON_INFORMATION
+        )
+
+    def save_session(self, elapsed_seconds, gross_wpm, net_wpm, cpm, accuracy):
+        """Queues the finished test for the history store; the write happens on its own thread."""
+        session = {
+            "started_at": self.test_started_at,
+            "profile": self.profileComboBox.GetValue().strip(),
+            "mode": self.modeChoice.GetStringSelection(),
+            "duration_seconds": self.testDurationMinutes * 60,
+            "elapsed_seconds": elapsed_seconds,
+            "gross_wpm": gross_wpm,
+            "net_wpm": net_wpm,
+            "cpm": cpm,
+            "accuracy": accuracy,
+            "correct_words": self.session_score.correct_words,
+            "incorrect_words": self.session_score.incorrect_words,
+            "seed": self.test_seed,
+            "error_counts": dict(self.session_score.error_counts),
+            "mistakes": list(self.session_score.incorrect_pairs),
+            "item_timings": [
+                (timing.item, timing.first_key_seconds, timing.duration_seconds, timing.key_count, timing.words)
+                for timing in self.item_timings
+            ],
+        }
+        history.default_store().record(session)
+        if session["profile"] and self.profileComboBox.FindString(session["profile"]) == wx.NOT_FOUND:
+            self.profileComboBox.Append(session["profile"])
+
+    def on_show_history(self, event):
+        dialog = HistoryDialog(self, self.profileComboBox.GetValue().strip(), list(self.MODES.keys()))
+        dialog.ShowModal()
+        dialog.Destroy()
 
     def end_test(self):
+        self.test_clock.stop()
         self.timer.Stop()
         self.isRunning = False
+        self.log_enter_latency()
+        self.log_speech_timings()
+        self.item_timings = keylog.item_timings(self.keylog.events())
         tones.beep(880, 500)
         gui.messageBox("การทดสอบสิ้นสุดแล้ว", "สิ้นสุดการทดสอบ", wx.OK | wx.ICON_INFORMATION)
-        total_words_typed = self.total_correct_words + self.total_incorrect_words
-        accuracy = (self.total_correct_words / total_words_typed) * 100 if total_words_typed > 0 else 0
-        net_wpm = self.total_correct_words / self.testDurationMinutes if self.testDurationMinutes > 0 else 0
-        gross_wpm = total_words_typed / self.testDurationMinutes if self.testDurationMinutes > 0 else 0
+        session_score = self.session_score
+        accuracy = session_score.accuracy()
+        # Speeds use the time that really passed, which is shorter than the test length if the dataset ran out.
+        elapsed_seconds = self.test_clock.elapsed()
+        net_wpm = session_score.net_wpm(elapsed_seconds)
+        gross_wpm = session_score.gross_wpm(elapsed_seconds)
+        cpm = session_score.cpm(elapsed_seconds)
         
-        summary = (
+        # The report is collected in a list and joined once; the mistakes go to the virtual list, not the text.
+        report = [
             f"สรุปผล:\n"
             f"- ความเร็วรวม (Gross WPM): {gross_wpm:.1f} คำต่อนาที\n"
             f"- ความเร็วสุทธิ (Net WPM): {net_wpm:.1f} คำต่อนาที\n"
+            f"- ความเร็วตัวอักษร (CPM): {cpm:.1f} ตัวอักษรต่อนาที\n"
+            f"- เวลาที่ใช้: {elapsed_seconds:.1f} วินาที\n"
             f"- ความแม่นยำ: {accuracy:.1f}%\n"
-            f"- พิมพ์ถูกทั้งหมด: {self.total_correct_words} คำ\n"
-            f"- พิมพ์ผิดทั้งหมด: {self.total_incorrect_words} คำ\n"
-        )
-        
-        details = ""
-        if self.incorrect_pairs:
+            f"- พิมพ์ถูกทั้งหมด: {session_score.correct_words} คำ\n"
+            f"- พิมพ์ผิดทั้งหมด: {session_score.incorrect_words} คำ\n"
+        ]
+        if self.test_seed is not None:
+            report.append(f"- รหัสลำดับข้อทดสอบ: {self.test_seed}\n")
+        if session_score.error_counts:
+            kinds = ", ".join(
+                f"{name} {session_score.error_counts[kind]}" for kind, name in results.ERROR_KIND_NAMES if kind in session_score.error_counts
+            )
+            report.append(f"- ประเภทข้อผิดพลาด: {kinds}\n")
+        report.append(self.format_keystroke_timing())
+        if self.is_adaptive_test:
+            report.append(self.format_weak_chars())
+        self.weakness.save_in_background()
+        self.save_session(elapsed_seconds, gross_wpm, net_wpm, cpm, accuracy)
+
+        if session_score.incorrect_pairs:
             selected_mode = self.modeChoice.GetStringSelection()
             unit = "คำ" if not self.MODES[selected_mode].get("is_sentence") else "ประโยค"
-            details += f"\n----------\n{unit}ที่พิมพ์ผิด:\n"
-            for correct, typed in self.incorrect_pairs:
-                details += f"- ต้นฉบับ: {correct}\n"
-                details += f"- ที่คุณพิมพ์: {typed}\n\n"
-        
-        standard_note = "\nเกณฑ์มาตรฐาน: โดยทั่วไปคะแนน Net WPM ที่น่าเชื่อถือควรมีความแม่นยำตั้งแต่ 95% ขึ้นไป"
-        full_report = summary + details.strip() + standard_note
-        self.resultsTextCtrl.SetValue(full_report)
+            report.append(
+                f"----------\n{unit}ที่พิมพ์ผิด {len(session_score.incorrect_pairs)} {unit} "
+                f"ข้อผิดพลาด {len(session_score.errors)} จุด อยู่ในตารางข้อผิดพลาดถัดจากช่องนี้"
+            )
+        report.append("\nเกณฑ์มาตรฐาน: โดยทั่วไปคะแนน Net WPM ที่น่าเชื่อถือควรมีความแม่นยำตั้งแต่ 95% ขึ้นไป")
+        self.resultsTextCtrl.SetValue("".join(report))
+        self.results_model.set_rows(session_score)
+        self.errorsListCtrl.refresh_rows()
         self.update_ui_state()
         self.resultsTextCtrl.Show()
+        self.show_errors(bool(session_score.errors))
         self.panel.Layout()
         self.Fit()
         self.resultsTextCtrl.SetFocus()
-        
-class GlobalPlugin(globalPluginHandler.GlobalPlugin):
-    def __init__(self):
-        super(GlobalPlugin, self).__init__()
-        self.menu_item = None
-        wx.CallLater(1, self.add_menu_item)
 
-    def add_menu_item(self):
+
+class HistoryDialog(wx.Dialog):
+    """Shows the WPM and accuracy trend over the last sessions of a profile."""
+    def __init__(self, parent, profile, mode_names):
+        super(HistoryDialog, self).__init__(parent, title="ประวัติการทดสอบ")
+        self.store = history.default_store()
+        self.all_modes_label = "ทุกโหมด"
+        self.panel = wx.Panel(self)
+        mainSizer = wx.BoxSizer(wx.VERTICAL)
+
+        filterSizer = wx.BoxSizer(wx.HORIZONTAL)
+        profileLabel = wx.StaticText(self.panel, label="ชื่อผู้ทดสอบ:")
         try:
-            tools_menu = gui.mainFrame.sysTrayIcon.toolsMenu
-            menu_text = "ทดสอบพิมพ์ภาษาไทย..."
-            help_text = "เปิดหน้าต่างเพื่อทดสอบความเร็วในการพิมพ์ภาษาไทย"
-            self.menu_item = tools_menu.Append(wx.ID_ANY, menu_text, help_text)
-            gui.mainFrame.sysTrayIcon.Bind(wx.EVT_MENU, self.on_show_dialog_menu, self.menu_item)
-        except Exception as e:
+            profiles = self.store.profiles()
+        except Exception:
             import logHandler
-            logHandler.log.error("Failed to add Thai Type Test menu item", exc_info=True)
+            logHandler.log.error("Failed to read the Thai Type Test history", exc_info=True)
+            profiles = []
+        self.profileComboBox = wx.ComboBox(self.panel, choices=profiles, value=profile)
+        modeLabel = wx.StaticText(self.panel, label="โหมด:")
+        self.modeChoice = wx.Choice(self.panel, choices=[self.all_modes_label] + mode_names)
+        self.modeChoice.SetSelection(0)
+        countLabel = wx.StaticText(self.panel, label="จำนวนครั้งล่าสุด:")
+        self.countSpinCtrl = wx.SpinCtrl(self.panel, min=1, max=1000, initial=DEFAULT_HISTORY_SESSIONS)
+        for label, control in ((profileLabel, self.profileComboBox), (modeLabel, self.modeChoice), (countLabel, self.countSpinCtrl)):
+            filterSizer.Add(label, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+            filterSizer.Add(control, 1, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
 
-    def show_dialog(self):
-        for child in gui.mainFrame.GetChildren():
-            if isinstance(child, TestDialog):
-                child.Raise()
-                return
-        dialog = TestDialog(gui.mainFrame.prePopup())
-        dialog.Show()
+        self.historyTextCtrl = wx.TextCtrl(self.panel, style=wx.TE_MULTILINE | wx.TE_READONLY | wx.TE_WORDWRAP, size=(500, 300))
+        closeButton = wx.Button(self.panel, id=wx.ID_CANCEL, label="ปิด (&C)")
 
-    def on_show_dialog_menu(self, event):
-        self.show_dialog()
+        mainSizer.Add(filterSizer, 0, wx.EXPAND | wx.ALL, 10)
+        mainSizer.Add(self.historyTextCtrl, 1, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
+        mainSizer.Add(closeButton, 0, wx.ALIGN_CENTER | wx.ALL, 5)
+        self.panel.SetSizer(mainSizer)
+        mainSizer.Fit(self)
 
-    @script(
-        description="เปิดหน้าต่างทดสอบพิมพ์ภาษาไทย",
-        category="Thai Type Test"
-    )
-    def script_showDialog(self, gesture):
-        wx.CallLater(1, self.show_dialog)
+        self.refreshTimer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.on_refresh_timer, self.refreshTimer)
+        self.profileComboBox.Bind(wx.EVT_COMBOBOX, self.on_filter_change)
+        self.profileComboBox.Bind(wx.EVT_TEXT, self.on_filter_change)
+        self.modeChoice.Bind(wx.EVT_CHOICE, self.on_filter_change)
+        self.countSpinCtrl.Bind(wx.EVT_SPINCTRL, self.on_filter_change)
+        self.Bind(wx.EVT_WINDOW_DESTROY, self.on_destroy)
+        self.refresh()
 
-    def terminate(self):
+    def on_filter_change(self, event):
+        # Typing a name changes the filter on every key; query once the typing pauses.
+        self.refreshTimer.StartOnce(HISTORY_REFRESH_DELAY_MS)
+
+    def on_refresh_timer(self, event):
+        self.refresh()
+
+    def on_destroy(self, event):
+        if event.GetEventObject() is self:
+            self.refreshTimer.Stop()
+        event.Skip()
+
+    def refresh(self):
+        # A blank name shows every trainee's sessions.
+        profile = self.profileComboBox.GetValue().strip() or None
+        mode = self.modeChoice.GetStringSelection()
         try:
-            tools_menu = gui.mainFrame.sysTrayIcon.toolsMenu
-            gui.mainFrame.sysTrayIcon.Unbind(wx.EVT_MENU, handler=self.on_show_dialog_menu, source=self.menu_item)
-            tools_menu.Remove(self.menu_item)
-        except Exception:
-            pass
-            
+            sessions = self.store.recent_sessions(
+                self.countSpinCtrl.GetValue(),
+                profile=profile,
+                mode=None if mode == self.all_modes_label else mode
+            )
+        except Exception as e:
+            self.historyTextCtrl.SetValue(f"ไม่สามารถอ่านประวัติการทดสอบได้: {e}")
+            return
+        if not sessions:
+            self.historyTextCtrl.SetValue("ยังไม่มีประวัติการทดสอบ")
+            return
+        lines = [f"{len(sessions)} ครั้งล่าสุด:"]
+        for name, key in (("Net WPM", "net_wpm"), ("ความแม่นยำ", "accuracy")):
+            mean, change = history.trend(sessions, key)
+            line = f"- {name} เฉลี่ย {mean:.1f}"
+            if change is not None:
+                direction = "เพิ่มขึ้น" if change > 0 else "ลดลง"
+                line += f", แนวโน้ม{direction} {abs(change):.2f} ต่อครั้ง"
+            lines.append(line)
+        lines.append("")
+        for session in sessions:
+            started = time.strftime("%d/%m/%Y %H:%M", time.localtime(session["started_at"]))
+            lines.append(
+                f"{started} {session['mode']}: Net WPM {session['net_wpm']:.1f}, "
+                f"Gross WPM {session['gross_wpm']:.1f}, ความแม่นยำ {session['accuracy']:.1f}%"
+            )
+        self.historyTextCtrl.SetValue("\n".join(lines))
+
+
 class GlobalPlugin(globalPluginHandler.GlobalPlugin):
     """The Global Plugin to integrate the add-on into NVDA."""
     def __init__(self):
         super(GlobalPlugin, self).__init__()
+        config.conf.spec[CONFIG_SECTION] = CONFSPEC
+        default_tokenizer.set_engine(config.conf[CONFIG_SECTION]["tokenizerEngine"])
         self.menu_item = None
         wx.CallLater(1, self.add_menu_item)
+        wx.CallLater(WARM_UP_DELAY_MS, self.start_warm_up)
+
+    def start_warm_up(self):
+        threading.Thread(target=warm_up_imports, name="ThaiTypeTestWarmUp", daemon=True).start()
 
     def add_menu_item(self):
         try:
@@ -570,6 +1320,8 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
         wx.CallLater(1, self.show_dialog)
 
     def terminate(self):
+        # Let the history writer finish what end_test queued.
+        history.close_default_store()
         try:
             tools_menu = gui.mainFrame.sysTrayIcon.toolsMenu
             gui.mainFrame.sysTrayIcon.Unbind(wx.EVT_MENU, handler=self.on_show_dialog_menu, source=self.menu_item)
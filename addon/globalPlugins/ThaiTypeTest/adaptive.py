@@ -0,0 +1,266 @@
+# thaiTypeTest/addon/globalPlugins/thaiTypeTest/adaptive.py
+"""Weakness statistics and the adaptive item sampler.
+
+Every scored item updates per-word and per-Thai-character attempt and
+error counts, which persist in NVDA's configuration directory. The
+adaptive sampler draws words in proportion to those weaknesses: part of
+the draws pick a weak character and then a word containing it, part
+pick a word by its own error rate, and the rest are uniform so that new
+words keep coming. Weights live in Fenwick trees, so a draw and a weight
+update each take O(log n) however large the word bank is.
+"""
+
+import json
+import os
+import random
+import threading
+
+from . import scoring
+
+STATS_FILE_NAME = "thaiTypeTest_weakness.json"
+STATS_VERSION = 1
+# Smoothing: an unseen word or character counts as PRIOR_ERRORS errors in PRIOR_ATTEMPTS attempts.
+PRIOR_ERRORS = 1
+PRIOR_ATTEMPTS = 5
+# Share of draws made through a weak character, through a weak word; the rest are uniform.
+CHAR_DRAW_SHARE = 0.4
+WORD_DRAW_SHARE = 0.4
+# Attempts a character needs before it is named in the report.
+MIN_REPORTED_ATTEMPTS = 5
+
+CONSONANT = "consonant"
+VOWEL = "vowel"
+TONE_MARK = "tone"
+OTHER = "other"
+
+
+def is_thai(char):
+    return "\u0e01" <= char <= "\u0e7f"
+
+
+def char_category(char):
+    """Returns whether a Thai character is a consonant, a vowel, a tone mark or something else."""
+    code = ord(char)
+    if 0x0e01 <= code <= 0x0e2e:
+        return CONSONANT
+    if 0x0e48 <= code <= 0x0e4b:
+        return TONE_MARK
+    if 0x0e30 <= code <= 0x0e3a or 0x0e40 <= code <= 0x0e45 or code == 0x0e47:
+        return VOWEL
+    return OTHER
+
+
+class FenwickTree(object):
+    """Non-negative weights with O(log n) update, prefix search and weighted sampling."""
+    def __init__(self, weights):
+        self.size = len(weights)
+        self.weights = list(weights)
+        tree = [0.0] * (self.size + 1)
+        for i, weight in enumerate(self.weights, 1):
+            tree[i] += weight
+            parent = i + (i & -i)
+            if parent <= self.size:
+                tree[parent] += tree[i]
+        self.tree = tree
+        self.top_bit = 1 << (self.size.bit_length() - 1) if self.size else 0
+
+    def __len__(self):
+        return self.size
+
+    def update(self, index, weight):
+        delta = weight - self.weights[index]
+        self.weights[index] = weight
+        i = index + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def total(self):
+        total = 0.0
+        i = self.size
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def find(self, value):
+        """Returns the index whose cumulative weight range contains value."""
+        position = 0
+        bit = self.top_bit
+        while bit:
+            candidate = position + bit
+            if candidate <= self.size and self.tree[candidate] <= value:
+                value -= self.tree[candidate]
+                position = candidate
+            bit >>= 1
+        return min(position, self.size - 1)
+
+    def sample(self, rng):
+        total = self.total()
+        if total <= 0:
+            return rng.randrange(self.size)
+        return self.find(rng.random() * total)
+
+
+def _error_rate(counts):
+    attempts, errors = counts if counts else (0, 0)
+    return min(1.0, (errors + PRIOR_ERRORS) / (attempts + PRIOR_ATTEMPTS))
+
+
+class WeaknessStats(object):
+    """Attempt and error counts per word and per Thai character."""
+    def __init__(self, path=None):
+        self.path = path
+        self.words = {}
+        self.chars = {}
+        self.lock = threading.Lock()
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if isinstance(data, dict) and data.get("version") == STATS_VERSION:
+            self.words = data.get("words", {})
+            self.chars = data.get("chars", {})
+
+    def save_in_background(self):
+        """Writes a snapshot of the counts on a worker thread."""
+        snapshot = {
+            "version": STATS_VERSION,
+            "words": {word: list(counts) for word, counts in self.words.items()},
+            "chars": {char: list(counts) for char, counts in self.chars.items()},
+        }
+        threading.Thread(target=self._write, args=(snapshot,), name="ThaiTypeTestWeakness", daemon=True).start()
+
+    def _write(self, snapshot):
+        with self.lock:
+            tmp_path = self.path + ".tmp"
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(snapshot, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            except OSError:
+                import logHandler
+                logHandler.log.warning(f"Failed to write weakness statistics {self.path}", exc_info=True)
+
+    def record(self, reference_words, errors):
+        """Counts one scored item; returns the words and characters whose weights changed."""
+        changed_words = set(reference_words)
+        changed_chars = set()
+        for word in reference_words:
+            self.words.setdefault(word, [0, 0])[0] += 1
+            for char in word:
+                if is_thai(char):
+                    self.chars.setdefault(char, [0, 0])[0] += 1
+                    changed_chars.add(char)
+        for error in errors:
+            for word in error.reference_words:
+                self.words.setdefault(word, [0, 0])[1] += 1
+                changed_words.add(word)
+            if error.kind == scoring.MARK_ERROR:
+                # The consonants and vowels were right; blame the marks on either side.
+                blamed = {char for char in error.reference + error.typed if char in scoring.THAI_COMBINING_MARKS}
+            else:
+                blamed = set(error.reference)
+            for char in blamed:
+                if is_thai(char):
+                    self.chars.setdefault(char, [0, 0])[1] += 1
+                    changed_chars.add(char)
+        return changed_words, changed_chars
+
+    def word_weight(self, word):
+        return _error_rate(self.words.get(word))
+
+    def char_weight(self, char):
+        return _error_rate(self.chars.get(char))
+
+    def weakest_chars(self, limit):
+        """Returns (char, error rate) of the most error-prone characters with enough attempts."""
+        rated = [
+            (char, min(1.0, errors / attempts))
+            for char, (attempts, errors) in self.chars.items()
+            if attempts >= MIN_REPORTED_ATTEMPTS and errors
+        ]
+        rated.sort(key=lambda pair: pair[1], reverse=True)
+        return rated[:limit]
+
+
+class AdaptiveDataset(object):
+    """A test order whose next item is drawn by weakness when it is first needed.
+
+    It has the same source_index/len/getitem shape as sampler.SampledDataset.
+    """
+    def __init__(self, dataset, stats, seed):
+        self.dataset = dataset
+        self.stats = stats
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.positions = {item: index for index, item in enumerate(dataset)}
+        self.word_tree = FenwickTree([stats.word_weight(item) for item in dataset])
+        self.char_items = {}
+        for index, item in enumerate(dataset):
+            for char in set(item):
+                if is_thai(char):
+                    self.char_items.setdefault(char, []).append(index)
+        self.chars = list(self.char_items)
+        self.char_positions = {char: index for index, char in enumerate(self.chars)}
+        self.char_tree = FenwickTree([stats.char_weight(char) for char in self.chars])
+        self.drawn = []
+
+    def _draw(self):
+        choice = self.rng.random()
+        if choice < CHAR_DRAW_SHARE and self.chars:
+            items = self.char_items[self.chars[self.char_tree.sample(self.rng)]]
+            return items[self.rng.randrange(len(items))]
+        if choice < CHAR_DRAW_SHARE + WORD_DRAW_SHARE:
+            return self.word_tree.sample(self.rng)
+        return self.rng.randrange(len(self.dataset))
+
+    def source_index(self, index):
+        while len(self.drawn) <= index:
+            drawn = self._draw()
+            if self.drawn and drawn == self.drawn[-1] and len(self.dataset) > 1:
+                # Never the same word twice in a row.
+                continue
+            self.drawn.append(drawn)
+        return self.drawn[index]
+
+    def update(self, changed_words, changed_chars):
+        """Re-weights the words and characters whose statistics changed."""
+        for word in changed_words:
+            position = self.positions.get(word)
+            if position is not None:
+                self.word_tree.update(position, self.stats.word_weight(word))
+        for char in changed_chars:
+            position = self.char_positions.get(char)
+            if position is not None:
+                self.char_tree.update(position, self.stats.char_weight(char))
+
+    def __len__(self):
+        return len(self.dataset)
+
+    def __getitem__(self, index):
+        return self.dataset[self.source_index(index)]
+
+
+def default_stats_path():
+    import globalVars
+    return os.path.join(globalVars.appArgs.configPath, STATS_FILE_NAME)
+
+
+_default_stats = None
+_default_stats_lock = threading.Lock()
+
+
+def default_stats():
+    """Returns the weakness statistics shared by all dialogs, loading them on first use."""
+    global _default_stats
+    with _default_stats_lock:
+        if _default_stats is None:
+            stats = WeaknessStats(default_stats_path())
+            stats.load()
+            _default_stats = stats
+        return _default_stats
@@ -0,0 +1,321 @@
+# thaiTypeTest/addon/globalPlugins/thaiTypeTest/compiled.py
+"""Compiled corpus files (.ttc) that are memory-mapped instead of read.
+
+A compiled corpus stores every line as UTF-8 in one blob with an offset
+table, plus an optional vocabulary and per-line arrays of word ids, and
+the difficulty index of the build pipeline (pipeline.py). Opening
+one only maps the file and reads the header, so it costs the same for a
+hundred lines as for a hundred thousand; lines and tokens are decoded when
+they are indexed.
+
+Layout (little-endian, sections aligned to 8 bytes):
+    header            MAGIC, then HEADER_FORMAT fields
+    line offsets      uint64 * (line_count + 1)
+    line blob         UTF-8
+    vocab offsets     uint64 * (vocab_count + 1)
+    vocab blob        UTF-8
+    token offsets     uint64 * (line_count + 1), only if tokenized
+    token ids         uint32 * total tokens, only if tokenized
+    line difficulty   uint32 * line_count
+    vocab difficulty  uint32 * vocab_count
+"""
+
+import array
+import hashlib
+import os
+import struct
+import sys
+
+from . import pipeline
+
+COMPILED_SUFFIX = ".ttc"
+MAGIC = b"TTC1"
+FORMAT_VERSION = 3
+# version, flags, tokenizer engine, SHA-1 of the source, line_count, vocab_count, source_size,
+# the two difficulty band limits, then the file positions of the eight sections.
+HEADER_FORMAT = "<II16s20sQQQIIQQQQQQQQ"
+HEADER_SIZE = len(MAGIC) + struct.calcsize(HEADER_FORMAT)
+FLAG_TOKENIZED = 1
+
+
+def compiled_path_for(file_path):
+    """Returns where the compiled form of a .txt corpus lives."""
+    return os.path.splitext(file_path)[0] + COMPILED_SUFFIX
+
+
+def _pad(f):
+    remainder = f.tell() % 8
+    if remainder:
+        f.write(b"\0" * (8 - remainder))
+
+
+def _write_strings(f, strings):
+    """Writes an offset table and a blob; returns the position of each."""
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = array.array("Q", [0])
+    total = 0
+    for data in encoded:
+        total += len(data)
+        offsets.append(total)
+    if sys.byteorder != "little":
+        offsets.byteswap()
+    _pad(f)
+    offsets_pos = f.tell()
+    f.write(offsets.tobytes())
+    blob_pos = f.tell()
+    f.write(b"".join(encoded))
+    return offsets_pos, blob_pos
+
+
+def _write_uint32s(f, values):
+    data = array.array("I", values)
+    if sys.byteorder != "little":
+        data.byteswap()
+    _pad(f)
+    position = f.tell()
+    f.write(data.tobytes())
+    return position
+
+
+def write_compiled_corpus(dest_path, lines, tokens=None, engine="", source_size=0, source_sha1=""):
+    """Writes lines (and optionally their tokens and the engine that made them) as a compiled corpus.
+
+    The lines should already have been through pipeline.dedupe_lines; their difficulty is computed here.
+    """
+    vocab = []
+    token_offsets = array.array("Q", [0])
+    token_ids = array.array("I")
+    if tokens is not None:
+        word_ids = {}
+        for line_tokens in tokens:
+            for word in line_tokens:
+                word_id = word_ids.get(word)
+                if word_id is None:
+                    word_id = word_ids[word] = len(vocab)
+                    vocab.append(word)
+                token_ids.append(word_id)
+            token_offsets.append(len(token_ids))
+    tmp_path = dest_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(b"\0" * HEADER_SIZE)
+        line_offsets_pos, line_blob_pos = _write_strings(f, lines)
+        vocab_offsets_pos, vocab_blob_pos = _write_strings(f, vocab)
+        token_offsets_pos = token_ids_pos = 0
+        if tokens is not None:
+            if sys.byteorder != "little":
+                token_offsets.byteswap()
+                token_ids.byteswap()
+            _pad(f)
+            token_offsets_pos = f.tell()
+            f.write(token_offsets.tobytes())
+            token_ids_pos = f.tell()
+            f.write(token_ids.tobytes())
+        line_difficulty = [pipeline.difficulty(line) for line in lines]
+        band_limits = pipeline.tercile_limits(line_difficulty)
+        line_difficulty_pos = _write_uint32s(f, line_difficulty)
+        vocab_difficulty_pos = _write_uint32s(f, (pipeline.difficulty(word) for word in vocab))
+        f.seek(0)
+        f.write(MAGIC)
+        f.write(struct.pack(
+            HEADER_FORMAT,
+            FORMAT_VERSION,
+            FLAG_TOKENIZED if tokens is not None else 0,
+            engine.encode("ascii"),
+            bytes.fromhex(source_sha1),
+            len(lines),
+            len(vocab),
+            source_size,
+            band_limits[0],
+            band_limits[1],
+            line_offsets_pos,
+            line_blob_pos,
+            vocab_offsets_pos,
+            vocab_blob_pos,
+            token_offsets_pos,
+            token_ids_pos,
+            line_difficulty_pos,
+            vocab_difficulty_pos,
+        ))
+    os.replace(tmp_path, dest_path)
+
+
+class _StringTable(object):
+    """A read-only sequence of strings decoded from an offset table and blob on demand."""
+    def __init__(self, buffer, count, offsets_pos, blob_pos):
+        self.count = count
+        self.offsets = buffer[offsets_pos:offsets_pos + 8 * (count + 1)].cast("Q")
+        self.blob = buffer[blob_pos:blob_pos + self.offsets[count]]
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("compiled corpus index out of range")
+        return str(self.blob[self.offsets[index]:self.offsets[index + 1]], "utf-8")
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self[index]
+
+
+class _TokenTable(object):
+    """A read-only sequence of per-line token lists resolved through the vocabulary."""
+    def __init__(self, buffer, count, offsets_pos, ids_pos, vocab):
+        self.count = count
+        self.vocab = vocab
+        self.offsets = buffer[offsets_pos:offsets_pos + 8 * (count + 1)].cast("Q")
+        total = self.offsets[count]
+        self.ids = buffer[ids_pos:ids_pos + 4 * total].cast("I")
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("compiled corpus index out of range")
+        vocab = self.vocab
+        return [vocab[word_id] for word_id in self.ids[self.offsets[index]:self.offsets[index + 1]]]
+
+
+class _Appendable(object):
+    """A read-only mapped sequence followed by the items appended to it in memory."""
+    def __init__(self, mapped):
+        self.mapped = mapped
+        self.appended = []
+
+    def __len__(self):
+        return len(self.mapped) + len(self.appended)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if index < 0:
+            raise IndexError("compiled corpus index out of range")
+        mapped_count = len(self.mapped)
+        if index < mapped_count:
+            return self.mapped[index]
+        return self.appended[index - mapped_count]
+
+    def __iter__(self):
+        yield from self.mapped
+        yield from self.appended
+
+    def extend(self, items):
+        self.appended.extend(items)
+
+
+class CompiledCorpus(object):
+    """A memory-mapped compiled corpus with the same shape as corpus.Corpus.
+
+    Lines appended to the text file after it was compiled can be added with
+    append; they are kept in memory after the mapped ones, so an imported
+    song does not mean decoding the whole corpus into a Corpus.
+    """
+    def __init__(self, path):
+        import mmap
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self._mmap)
+        if bytes(buffer[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"{path} is not a compiled corpus")
+        version = struct.unpack_from("<I", buffer, len(MAGIC))[0]
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{path} has unsupported compiled corpus version {version}")
+        (version, flags, engine, source_sha1, line_count, vocab_count, self.source_size, band_low, band_high,
+            line_offsets_pos, line_blob_pos, vocab_offsets_pos, vocab_blob_pos,
+            token_offsets_pos, token_ids_pos, line_difficulty_pos, vocab_difficulty_pos
+        ) = struct.unpack_from(HEADER_FORMAT, buffer, len(MAGIC))
+        self.engine = engine.rstrip(b"\0").decode("ascii")
+        # Empty if the writer was not given the source's hash.
+        self.source_sha1 = source_sha1.hex() if source_sha1.strip(b"\0") else ""
+        self.lines = _Appendable(_StringTable(buffer, line_count, line_offsets_pos, line_blob_pos))
+        self.vocab = _StringTable(buffer, vocab_count, vocab_offsets_pos, vocab_blob_pos)
+        if flags & FLAG_TOKENIZED:
+            self.tokens = _Appendable(_TokenTable(buffer, line_count, token_offsets_pos, token_ids_pos, self.vocab))
+        else:
+            self.tokens = None
+        self.line_difficulty = _Appendable(buffer[line_difficulty_pos:line_difficulty_pos + 4 * line_count].cast("I"))
+        self.band_limits = (band_low, band_high)
+        self._vocab_difficulty = buffer[vocab_difficulty_pos:vocab_difficulty_pos + 4 * vocab_count].cast("I")
+        # Word to difficulty score of the words of appended lines, whether or not the vocabulary has them.
+        self._appended_words = {}
+        self._words = None
+        self._word_difficulty = None
+
+    @property
+    def words(self):
+        """The distinct words of the corpus, decoded from the vocabulary on first use."""
+        if self._words is None:
+            self._words = set(self.vocab)
+            self._words.update(self._appended_words)
+        return self._words
+
+    @property
+    def word_difficulty(self):
+        """Word to difficulty score, decoded from the vocabulary on first use."""
+        if self._word_difficulty is None:
+            self._word_difficulty = dict(zip(self.vocab, self._vocab_difficulty))
+            self._word_difficulty.update(self._appended_words)
+        return self._word_difficulty
+
+    def append(self, lines, tokens):
+        """Adds lines appended to the text file since it was compiled, and their tokens, in memory only."""
+        self.lines.extend(lines)
+        if self.tokens is not None:
+            self.tokens.extend(tokens)
+        self.line_difficulty.extend(pipeline.difficulty(line) for line in lines)
+        appended = {}
+        for line_tokens in tokens:
+            for word in line_tokens:
+                if word not in appended and word not in self._appended_words:
+                    appended[word] = pipeline.difficulty(word)
+        self._appended_words.update(appended)
+        if self._words is not None:
+            self._words.update(appended)
+        if self._word_difficulty is not None:
+            self._word_difficulty.update(appended)
+
+
+def load_compiled_corpus(file_path):
+    """Returns the CompiledCorpus next to a .txt corpus whatever the state of the text file, or None."""
+    compiled_path = compiled_path_for(file_path)
+    if not os.path.exists(compiled_path):
+        return None
+    try:
+        return CompiledCorpus(compiled_path)
+    except (OSError, ValueError):
+        import logHandler
+        logHandler.log.warning(f"Ignoring unreadable compiled corpus {compiled_path}", exc_info=True)
+        return None
+
+
+def open_compiled_corpus(file_path):
+    """Returns the CompiledCorpus for a .txt corpus if an up-to-date one exists, else None.
+
+    The compiled file wins when the text file is missing, or when the text
+    file has the recorded size and either is not newer than the compiled
+    file or has the recorded hash. Installing an add-on does not keep file
+    times, so the hash is what recognizes the bundled corpora.
+    """
+    corpus = load_compiled_corpus(file_path)
+    if corpus is None:
+        return None
+    try:
+        source_stat = os.stat(file_path)
+    except OSError:
+        return corpus
+    if source_stat.st_size != corpus.source_size:
+        return None
+    if source_stat.st_mtime_ns <= os.stat(corpus.path).st_mtime_ns:
+        return corpus
+    if corpus.source_sha1:
+        with open(file_path, "rb") as f:
+            if hashlib.sha1(f.read()).hexdigest() == corpus.source_sha1:
+                return corpus
+    return None
@@ -0,0 +1,209 @@
+# thaiTypeTest/addon/globalPlugins/thaiTypeTest/corpus.py
+
+import hashlib
+import json
+import os
+
+from . import pipeline
+from .compiled import load_compiled_corpus
+from .tokenizer import NEWMM_ENGINE
+
+CACHE_FILE_NAME = "corpus_cache.json"
+# Bump whenever the layout of a cache entry, the tokenization rules or the build pipeline change.
+CACHE_VERSION = 4
+
+
+def split_dataset_lines(text):
+    """Splits corpus text into usable lines, skipping blanks and # comments."""
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    lines = []
+    for line in text.split("\n"):
+        line = line.strip()
+        if line and not line.startswith("#"):
+            lines.append(line)
+    return lines
+
+
+def prepare_lines(text, existing=()):
+    """Splits corpus text into normalized lines without duplicates or near-duplicates of each other or of existing."""
+    return pipeline.dedupe_lines(split_dataset_lines(text), existing)
+
+
+class Corpus(object):
+    """The lines of one corpus file together with their tokenization and difficulty index."""
+    def __init__(self, lines, tokens, words, line_difficulty, word_difficulty, band_limits):
+        self.lines = lines
+        self.tokens = tokens
+        self.words = words
+        self.line_difficulty = line_difficulty
+        self.word_difficulty = word_difficulty
+        self.band_limits = band_limits
+
+
+class CorpusCache(object):
+    """An on-disk cache of tokenized corpus files.
+
+    Entries are keyed by file path and validated by size and mtime first,
+    then by a content hash, so only files that really changed are tokenized.
+    Entries made by a different tokenizer engine are never reused. A file
+    with no usable entry starts from its compiled corpus when the text
+    begins with what was compiled, so only the lines added since then
+    (e.g. imported songs) are tokenized.
+    """
+    def __init__(self, cache_path, tokenize, engine):
+        self.cache_path = cache_path
+        self.tokenize = tokenize
+        self.engine = engine
+        self.entries = {}
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if isinstance(data, dict) and data.get("version") == CACHE_VERSION:
+            self.entries = data.get("files", {})
+
+    def save(self):
+        if not self.dirty:
+            return
+        # Drop entries of corpora that no longer exist.
+        self.entries = {path: entry for path, entry in self.entries.items() if os.path.exists(path)}
+        tmp_path = self.cache_path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": CACHE_VERSION, "files": self.entries}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_path)
+            self.dirty = False
+        except OSError:
+            import logHandler
+            logHandler.log.warning(f"Failed to write corpus cache {self.cache_path}", exc_info=True)
+
+    def get(self, file_path):
+        """Returns the Corpus for file_path, tokenizing it only if it changed.
+
+        Raises FileNotFoundError if the corpus file does not exist.
+        """
+        key = os.path.abspath(file_path)
+        st = os.stat(key)
+        entry = self.entries.get(key)
+        if entry and entry.get("engine") != self.engine:
+            entry = None
+        if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+            return self._corpus_from_entry(entry)
+
+        with open(key, "rb") as f:
+            raw = f.read()
+        digest = hashlib.sha1(raw).hexdigest()
+        if not entry:
+            entry = self._entry_from_compiled(key, raw)
+            if entry:
+                self.entries[key] = entry
+        if entry and entry["sha1"] == digest:
+            # Touched but not modified; remember the new stat so the next check is cheap.
+            entry["size"] = st.st_size
+            entry["mtime_ns"] = st.st_mtime_ns
+            self.dirty = True
+            return self._corpus_from_entry(entry)
+
+        if entry and self._is_append(entry, raw):
+            # Text was only appended (e.g. an imported song); process just the new tail.
+            # The difficulty bands keep their limits, so the old lines stay in their bands.
+            new_lines = prepare_lines(raw[entry["size"]:].decode("utf-8"), entry["lines"])
+            new_tokens = [self.tokenize(line) for line in new_lines]
+            word_difficulty = entry["word_difficulty"]
+            for line_tokens in new_tokens:
+                for word in line_tokens:
+                    if word not in word_difficulty:
+                        word_difficulty[word] = pipeline.difficulty(word)
+            entry["lines"].extend(new_lines)
+            entry["tokens"].extend(new_tokens)
+            entry["difficulty"].extend(pipeline.difficulty(line) for line in new_lines)
+            entry.update(size=st.st_size, mtime_ns=st.st_mtime_ns, sha1=digest)
+            self.dirty = True
+            return self._corpus_from_entry(entry)
+
+        lines = prepare_lines(raw.decode("utf-8"))
+        tokens = [self.tokenize(line) for line in lines]
+        words = {word for line_tokens in tokens for word in line_tokens}
+        difficulty = [pipeline.difficulty(line) for line in lines]
+        self.entries[key] = entry = {
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "sha1": digest,
+            "lines": lines,
+            "tokens": tokens,
+            "difficulty": difficulty,
+            "band_limits": list(pipeline.tercile_limits(difficulty)),
+            "word_difficulty": {word: pipeline.difficulty(word) for word in sorted(words)},
+            "engine": self.engine,
+        }
+        self.dirty = True
+        return self._corpus_from_entry(entry)
+
+    def _entry_from_compiled(self, key, raw):
+        """Returns a cache entry for the compiled part of raw, or None if the compiled corpus does not fit."""
+        compiled = load_compiled_corpus(key)
+        if compiled is None or compiled.tokens is None or compiled.engine != self.engine or not compiled.source_sha1:
+            return None
+        size = compiled.source_size
+        if len(raw) < size or hashlib.sha1(raw[:size]).hexdigest() != compiled.source_sha1:
+            return None
+        return {
+            "size": size,
+            "mtime_ns": 0,
+            "sha1": compiled.source_sha1,
+            "lines": list(compiled.lines),
+            "tokens": [compiled.tokens[index] for index in range(len(compiled.tokens))],
+            "difficulty": list(compiled.line_difficulty),
+            "band_limits": list(compiled.band_limits),
+            "word_difficulty": dict(compiled.word_difficulty),
+            "engine": compiled.engine,
+        }
+
+    def _is_append(self, entry, raw):
+        """Returns True if raw is the cached content with whole lines appended to it."""
+        old_size = entry["size"]
+        if len(raw) <= old_size:
+            return False
+        at_line_boundary = raw[old_size - 1:old_size] == b"\n" or raw[old_size:old_size + 1] in (b"\n", b"\r")
+        return at_line_boundary and hashlib.sha1(raw[:old_size]).hexdigest() == entry["sha1"]
+
+    def _corpus_from_entry(self, entry):
+        word_difficulty = entry["word_difficulty"]
+        return Corpus(
+            entry["lines"],
+            entry["tokens"],
+            set(word_difficulty),
+            entry["difficulty"],
+            word_difficulty,
+            tuple(entry["band_limits"])
+        )
+
+
+def vocabulary(file_paths, cache_path):
+    """Returns the words of the given corpora without tokenizing anything.
+
+    Words come from each file's compiled corpus, or from its newmm corpus
+    cache entry if it has no compiled corpus with a vocabulary. Entries made
+    by maximal matching are not used, since their words came from an
+    earlier dictionary rather than from the text.
+    """
+    words = set()
+    uncompiled = []
+    for file_path in file_paths:
+        compiled = load_compiled_corpus(file_path)
+        if compiled is not None and len(compiled.vocab):
+            words.update(compiled.vocab)
+        else:
+            uncompiled.append(os.path.abspath(file_path))
+    if uncompiled:
+        cache = CorpusCache(cache_path, None, None)
+        for key in uncompiled:
+            entry = cache.entries.get(key)
+            if entry and entry.get("engine") == NEWMM_ENGINE:
+                words.update(entry["word_difficulty"])
+    return words
@@ -0,0 +1,160 @@
+# thaiTypeTest/addon/globalPlugins/thaiTypeTest/extractors.py
+"""Per-site lyrics extractors.
+
+Each supported site has an extractor class registered with @register. The
+class names the strings its URLs contain and the container that holds the
+lyrics, given as the (name, attrs) of a SoupStrainer. Only that container
+is built into a tree, and the rest of the page is skipped. Supporting a new
+site means adding a class here.
+"""
+
+import abc
+import re
+
+EXTRACTORS = []
+
+
+def register(cls):
+    """Class decorator that adds an extractor to the registry."""
+    EXTRACTORS.append(cls())
+    return cls
+
+
+def extractor_for(url):
+    """Returns the extractor for url, or None if no site matches."""
+    for extractor in EXTRACTORS:
+        if extractor.matches(url):
+            return extractor
+    return None
+
+
+def supported_sites():
+    return tuple(site for extractor in EXTRACTORS for site in extractor.sites)
+
+
+def has_class(name):
+    """An attrs value matching elements with the CSS class name among their classes.
+
+    While straining, BeautifulSoup sees the class attribute as one unsplit string.
+    """
+    return re.compile(r"(?:^|\s)" + re.escape(name) + r"(?:\s|$)")
+
+
+def decode_page(content):
+    """Decodes a downloaded page once, the same way BeautifulSoup would, so each parse can skip detection."""
+    if isinstance(content, str):
+        return content
+    from bs4.dammit import UnicodeDammit
+    return UnicodeDammit(content, is_html=True).unicode_markup
+
+
+class LyricsExtractor(abc.ABC):
+    """Finds the lyrics of one site's pages.
+
+    Subclasses set sites and implement extract, parsing only the containers
+    that can hold the lyrics with parse.
+    """
+    # Strings that a URL of the site contains.
+    sites = ()
+
+    def matches(self, url):
+        return any(site in url for site in self.sites)
+
+    def parse(self, text, container):
+        """Parses only the elements of text that match container, with everything inside them."""
+        from bs4 import BeautifulSoup, SoupStrainer
+        name, attrs = container
+        return BeautifulSoup(text, "html.parser", parse_only=SoupStrainer(name, attrs))
+
+    @abc.abstractmethod
+    def extract(self, text):
+        """Returns the raw lyrics text of a decoded page, or None."""
+
+
+# An opening div tag, and the attributes that mark it as one of Kapook's lyrics separators.
+_DIV_TAG = re.compile(r"<div\b[^>]*>", re.IGNORECASE)
+_CENTER_ALIGN = re.compile(r"""\balign\s*=\s*["']?center["'\s/>]""", re.IGNORECASE)
+_SEPARATOR_STYLE = re.compile(r"""\bstyle\s*=\s*["'][^"']*font-size:16px""", re.IGNORECASE)
+
+
+@register
+class KapookExtractor(LyricsExtractor):
+    sites = ("kapook.com",)
+    table_container = ("table", {})
+    lyric_container = (None, {"class": has_class("lyric")})
+
+    def extract(self, text):
+        # Method 1: the lyrics sit between two styled separator divs (modern layouts).
+        raw_text = self.extract_between_separators(text)
+        # Method 2 (fallback for old table-based layouts): the row after the "lyrics" header cell.
+        if not raw_text:
+            header_cell = self.parse(text, self.table_container).select_one("td.lyrics")
+            if header_cell:
+                header_row = header_cell.find_parent("tr")
+                if header_row:
+                    lyrics_row = header_row.find_next_sibling("tr")
+                    if lyrics_row:
+                        lyrics_cell = lyrics_row.select_one("td")
+                        if lyrics_cell:
+                            raw_text = lyrics_cell.get_text(separator='\n').strip()
+        # Method 3 (final fallback).
+        if not raw_text:
+            lyrics_div = self.parse(text, self.lyric_container).select_one(".lyric p, .lyric")
+            if lyrics_div:
+                raw_text = lyrics_div.get_text(separator='\n').strip()
+        return raw_text
+
+    def extract_between_separators(self, text):
+        """Parses only the markup from the first separator div to the second one."""
+        separators = [
+            match for match in _DIV_TAG.finditer(text)
+            if _CENTER_ALIGN.search(match.group()) and _SEPARATOR_STYLE.search(match.group())
+        ]
+        if len(separators) < 2:
+            return None
+        from bs4 import BeautifulSoup
+        region = BeautifulSoup(text[separators[0].start():separators[1].start()], "html.parser")
+        start_node = region.find("div")
+        lyrics_parts = []
+        for sibling in start_node.find_next_siblings():
+            part = sibling.get_text(separator='\n').strip()
+            if part:
+                lyrics_parts.append(part)
+        return "\n".join(lyrics_parts) or None
+
+
+@register
+class SiamzoneExtractor(LyricsExtractor):
+    sites = ("siamzone.com",)
+    # (tag name, attrs) of the element holding the lyrics.
+    container = ("div", {"class": has_class("is-size-5-desktop")})
+
+    def extract(self, text):
+        lyrics_div = self.parse(text, self.container).select_one("div.has-text-centered-mobile.is-size-5-desktop")
+        if not lyrics_div:
+            return None
+        lyrics_parts = []
+        for element in lyrics_div.children:
+            if isinstance(element, str):
+                text_content = element.strip()
+            else:
+                text_content = element.get_text(separator='\n').strip()
+            # Everything from the karaoke link on is not part of the lyrics.
+            if "คาราโอเกะ" in text_content.lower() or "karaoke" in text_content.lower():
+                break
+            if text_content:
+                lyrics_parts.append(text_content)
+        return "\n".join(lyrics_parts).strip()
+
+
+@register
+class MeemodelExtractor(LyricsExtractor):
+    sites = ("เพลง.meemodel.com", "xn--72c9bva0i.meemodel.com")
+    # (tag name, attrs) of the element holding the lyrics.
+    container = ("div", {"id": "lyric-lyric"})
+
+    def extract(self, text):
+        lyrics_div = self.parse(text, self.container).select_one("div#lyric-lyric")
+        if lyrics_div:
+            return lyrics_div.get_text(separator='\n').strip()
+        return None
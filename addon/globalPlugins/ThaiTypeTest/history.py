@@ -0,0 +1,237 @@
+# thaiTypeTest/addon/globalPlugins/thaiTypeTest/history.py
+"""An append-only SQLite history of test sessions.
+
+Sessions are queued by the dialog and written by one worker thread, which
+puts everything queued at the time into a single transaction, so ending a
+test never waits for the disk. Sessions are indexed by date, by mode and
+by profile (the trainee's name), and the trend queries read only the
+newest rows through those indexes.
+"""
+
+import json
+import os
+import queue
+import threading
+
+HISTORY_FILE_NAME = "thaiTypeTest_history.sqlite3"
+# Bump and extend SCHEMA when the tables change; user_version records what a file has.
+SCHEMA_VERSION = 1
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    started_at REAL NOT NULL,
+    profile TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    duration_seconds REAL NOT NULL,
+    elapsed_seconds REAL NOT NULL,
+    gross_wpm REAL NOT NULL,
+    net_wpm REAL NOT NULL,
+    cpm REAL NOT NULL,
+    accuracy REAL NOT NULL,
+    correct_words INTEGER NOT NULL,
+    incorrect_words INTEGER NOT NULL,
+    seed INTEGER,
+    error_counts TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_by_date ON sessions (started_at);
+CREATE INDEX IF NOT EXISTS sessions_by_mode ON sessions (mode, started_at);
+CREATE INDEX IF NOT EXISTS sessions_by_profile ON sessions (profile, started_at);
+CREATE TABLE IF NOT EXISTS mistakes (
+    session_id INTEGER NOT NULL REFERENCES sessions (id),
+    reference TEXT NOT NULL,
+    typed TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS mistakes_by_session ON mistakes (session_id);
+CREATE TABLE IF NOT EXISTS item_timings (
+    session_id INTEGER NOT NULL REFERENCES sessions (id),
+    item INTEGER NOT NULL,
+    first_key_seconds REAL,
+    duration_seconds REAL NOT NULL,
+    keys INTEGER NOT NULL,
+    words INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS item_timings_by_session ON item_timings (session_id);
+"""
+SESSION_COLUMNS = (
+    "started_at", "profile", "mode", "duration_seconds", "elapsed_seconds", "gross_wpm", "net_wpm",
+    "cpm", "accuracy", "correct_words", "incorrect_words", "seed",
+)
+
+_STOP = object()
+
+
+def default_history_path():
+    """Returns where the history lives: in NVDA's user configuration, so it survives add-on updates."""
+    import globalVars
+    return os.path.join(globalVars.appArgs.configPath, HISTORY_FILE_NAME)
+
+
+class HistoryStore(object):
+    """Queues sessions for a background writer and answers queries on the caller's thread.
+
+    Queries share one read connection, opened by the first query that finds
+    the file, so WAL and the schema are only set up once per connection.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.queue = queue.Queue()
+        self.writer = None
+        self.lock = threading.Lock()
+        self.reader = None
+        self.reader_lock = threading.Lock()
+
+    def connect(self, check_same_thread=True):
+        import sqlite3
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=5, check_same_thread=check_same_thread)
+        connection.row_factory = sqlite3.Row
+        # WAL lets the history view read while the writer appends.
+        connection.execute("PRAGMA journal_mode=WAL")
+        if connection.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            with connection:
+                connection.executescript(SCHEMA)
+                connection.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        return connection
+
+    def record(self, session):
+        """Queues a session dict for writing; returns immediately.
+
+        The dict has the SESSION_COLUMNS, plus error_counts (kind to count),
+        mistakes ((reference, typed) pairs) and item_timings
+        ((item, first key seconds, duration seconds, keys, words) tuples).
+        """
+        with self.lock:
+            if self.writer is None or not self.writer.is_alive():
+                self.writer = threading.Thread(target=self._write_loop, name="ThaiTypeTestHistory", daemon=True)
+                self.writer.start()
+        self.queue.put(session)
+
+    def flush(self):
+        """Blocks until every queued session has been written."""
+        self.queue.join()
+
+    def close(self, timeout=5):
+        with self.reader_lock:
+            if self.reader is not None:
+                self.reader.close()
+                self.reader = None
+        with self.lock:
+            writer = self.writer
+            self.writer = None
+        if writer is not None and writer.is_alive():
+            self.queue.put(_STOP)
+            writer.join(timeout)
+
+    def _write_loop(self):
+        import sqlite3
+        connection = None
+        while True:
+            batch = [self.queue.get()]
+            # Everything queued in the meantime goes into the same transaction.
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            sessions = [session for session in batch if session is not _STOP]
+            try:
+                if sessions:
+                    if connection is None:
+                        connection = self.connect()
+                    with connection:
+                        for session in sessions:
+                            self._insert(connection, session)
+            except (OSError, sqlite3.Error):
+                import logHandler
+                logHandler.log.error(f"Failed to write {len(sessions)} sessions to {self.path}", exc_info=True)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+            if len(sessions) != len(batch):
+                if connection is not None:
+                    connection.close()
+                return
+
+    def _insert(self, connection, session):
+        columns = ", ".join(SESSION_COLUMNS)
+        placeholders = ", ".join("?" for _ in SESSION_COLUMNS)
+        cursor = connection.execute(
+            f"INSERT INTO sessions ({columns}, error_counts) VALUES ({placeholders}, ?)",
+            [session[column] for column in SESSION_COLUMNS] + [json.dumps(session.get("error_counts", {}))]
+        )
+        session_id = cursor.lastrowid
+        connection.executemany(
+            "INSERT INTO mistakes (session_id, reference, typed) VALUES (?, ?, ?)",
+            [(session_id, reference, typed) for reference, typed in session.get("mistakes", ())]
+        )
+        connection.executemany(
+            "INSERT INTO item_timings (session_id, item, first_key_seconds, duration_seconds, keys, words) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [(session_id,) + tuple(timing) for timing in session.get("item_timings", ())]
+        )
+
+    def _query(self, sql, parameters=()):
+        with self.reader_lock:
+            if self.reader is None:
+                if not os.path.exists(self.path):
+                    return []
+                # Queries may come from any thread, one at a time under reader_lock.
+                self.reader = self.connect(check_same_thread=False)
+            return self.reader.execute(sql, parameters).fetchall()
+
+    def recent_sessions(self, limit, profile=None, mode=None):
+        """Returns the newest sessions, newest first, optionally for one profile and/or mode."""
+        conditions = []
+        parameters = []
+        if profile is not None:
+            conditions.append("profile = ?")
+            parameters.append(profile)
+        if mode is not None:
+            conditions.append("mode = ?")
+            parameters.append(mode)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return self._query(
+            f"SELECT id, started_at, profile, mode, elapsed_seconds, gross_wpm, net_wpm, cpm, accuracy "
+            f"FROM sessions {where} ORDER BY started_at DESC LIMIT ?",
+            parameters + [limit]
+        )
+
+    def latest_profile(self):
+        """Returns the profile of the newest session, or None if there is none."""
+        rows = self._query("SELECT profile FROM sessions ORDER BY started_at DESC LIMIT 1")
+        return rows[0]["profile"] if rows else None
+
+    def profiles(self):
+        return [row["profile"] for row in self._query("SELECT DISTINCT profile FROM sessions ORDER BY profile")]
+
+
+def trend(sessions, key):
+    """Returns the mean of key and its least-squares change per session, oldest to newest."""
+    values = [session[key] for session in reversed(sessions)]
+    if not values:
+        return None, None
+    mean = sum(values) / len(values)
+    if len(values) < 2:
+        return mean, None
+    mean_x = (len(values) - 1) / 2
+    numerator = sum((x - mean_x) * (value - mean) for x, value in enumerate(values))
+    denominator = sum((x - mean_x) ** 2 for x in range(len(values)))
+    return mean, numerator / denominator
+
+
+_default_store = None
+
+
+def default_store():
+    """Returns the history store shared by all dialogs."""
+    global _default_store
+    if _default_store is None:
+        _default_store = HistoryStore(default_history_path())
+    return _default_store
+
+
+def close_default_store():
+    global _default_store
+    if _default_store is not None:
+        _default_store.close()
+        _default_store = None
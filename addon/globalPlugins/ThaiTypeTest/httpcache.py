@@ -0,0 +1,180 @@
+# thaiTypeTest/addon/globalPlugins/thaiTypeTest/httpcache.py
+"""An on-disk cache of downloaded pages with conditional revalidation.
+
+Each cached page is a body file plus a small JSON file with its ETag,
+Last-Modified and expiry. While the server's Cache-Control max-age has
+not run out, the page is served without any request. After that, it is
+revalidated with If-None-Match / If-Modified-Since, and a 304 answer
+reuses the body from disk instead of downloading it again. The cache lives
+in NVDA's configuration directory and keeps the MAX_ENTRIES most recently
+fetched or revalidated pages.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+CACHE_DIR_NAME = "thaiTypeTest_http_cache"
+MAX_ENTRIES = 200
+_MAX_AGE = re.compile(r"\bmax-age\s*=\s*(\d+)")
+
+
+def default_cache_dir():
+    import globalVars
+    return os.path.join(globalVars.appArgs.configPath, CACHE_DIR_NAME)
+
+
+def _expiry(cache_control, now):
+    """Returns until when a response may be served without revalidation (now if not at all)."""
+    cache_control = cache_control.lower()
+    if "no-cache" in cache_control or "must-revalidate" in cache_control:
+        return now
+    match = _MAX_AGE.search(cache_control)
+    return now + int(match.group(1)) if match else now
+
+
+class HttpCache(object):
+    """Pages keyed by URL, each stored as <key>.json and <key>.body."""
+    def __init__(self, directory):
+        self.directory = directory
+        self.lock = threading.Lock()
+        # Counts of how each get was answered, for reporting.
+        self.stats = {"fresh": 0, "revalidated": 0, "downloaded": 0}
+
+    def _paths(self, url):
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, key + ".json"), os.path.join(self.directory, key + ".body")
+
+    def _load(self, url):
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get("url") != url or not os.path.exists(body_path):
+            return None
+        return meta
+
+    def _read_body(self, url):
+        with open(self._paths(url)[1], "rb") as f:
+            return f.read()
+
+    def _store(self, url, response, now):
+        headers = response.headers
+        cache_control = headers.get("Cache-Control", "")
+        if "no-store" in cache_control.lower():
+            return
+        meta = {
+            "url": url,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "expires": _expiry(cache_control, now),
+        }
+        if not meta["etag"] and not meta["last_modified"] and meta["expires"] <= now:
+            # Nothing to revalidate with and not fresh for any time: storing it would never save a download.
+            return
+        meta_path, body_path = self._paths(url)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # The body goes first, so a metadata file always has its body.
+            with open(body_path + ".tmp", "wb") as f:
+                f.write(response.content)
+            os.replace(body_path + ".tmp", body_path)
+            with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(meta_path + ".tmp", meta_path)
+        except OSError:
+            import logHandler
+            logHandler.log.warning(f"Failed to cache {url}", exc_info=True)
+
+    def _touch(self, url, meta, cache_control, now):
+        """Records a 304: the page stays cached with a new expiry."""
+        meta["expires"] = _expiry(cache_control, now)
+        meta_path = self._paths(url)[0]
+        try:
+            with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(meta_path + ".tmp", meta_path)
+        except OSError:
+            pass
+
+    def _count(self, outcome):
+        with self.lock:
+            self.stats[outcome] += 1
+
+    def get(self, session, url, timeout):
+        """Returns the body of url, from the cache when it is still valid.
+
+        Raises whatever session.get or raise_for_status raises when a download
+        is needed and fails, and requests.HTTPError for a 304 answer when
+        there is no cached page to reuse.
+        """
+        now = time.time()
+        meta = self._load(url)
+        if meta is not None and meta.get("expires", 0) > now:
+            try:
+                body = self._read_body(url)
+            except OSError:
+                meta = None
+            else:
+                self._count("fresh")
+                return body
+        headers = {}
+        if meta is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+        response = session.get(url, timeout=timeout, headers=headers)
+        if response.status_code == 304 and meta is not None:
+            try:
+                body = self._read_body(url)
+            except OSError:
+                # The body vanished after the check; fetch it unconditionally.
+                response = session.get(url, timeout=timeout)
+            else:
+                self._touch(url, meta, response.headers.get("Cache-Control", ""), now)
+                self._count("revalidated")
+                return body
+        if response.status_code == 304:
+            # Nothing on disk to reuse, and storing the empty body would cache a blank page.
+            import requests
+            raise requests.HTTPError(f"{url} answered 304 Not Modified with no cached page", response=response)
+        response.raise_for_status()
+        self._store(url, response, now)
+        self._count("downloaded")
+        return response.content
+
+    def prune(self, max_entries=MAX_ENTRIES):
+        """Removes the pages fetched or revalidated longest ago beyond max_entries."""
+        try:
+            names = [name for name in os.listdir(self.directory) if name.endswith(".json")]
+        except OSError:
+            return
+        if len(names) <= max_entries:
+            return
+        paths = [os.path.join(self.directory, name) for name in names]
+        paths.sort(key=lambda path: os.path.getmtime(path), reverse=True)
+        for meta_path in paths[max_entries:]:
+            for path in (meta_path, meta_path[:-len(".json")] + ".body"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def default_cache():
+    """Returns the page cache shared by all imports."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = HttpCache(default_cache_dir())
+        return _default_cache
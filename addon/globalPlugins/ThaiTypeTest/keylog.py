@@ -0,0 +1,179 @@
+# thaiTypeTest/addon/globalPlugins/thaiTypeTest/keylog.py
+"""Keystroke timing captured into a fixed-size ring buffer.
+
+Each event is one slot in four preallocated arrays (timestamp, kind, item
+index, value), so recording a key stores four numbers and never grows a
+list; when the buffer is full the oldest events are overwritten. The
+analysis at the end of a test and the CSV export read the arrays back.
+"""
+
+import array
+import time
+
+# Event kinds.
+KEY_EVENT = 0
+TEXT_EVENT = 1
+ITEM_SHOWN = 2
+ITEM_SUBMITTED = 3
+KIND_NAMES = {
+    KEY_EVENT: "key",
+    TEXT_EVENT: "text",
+    ITEM_SHOWN: "shown",
+    ITEM_SUBMITTED: "submitted",
+}
+# About ten minutes of fast typing, with a text event per key; about 600 KB.
+DEFAULT_CAPACITY = 32768
+# Upper bounds in milliseconds of the inter-key interval histogram; the last bin is open.
+INTERVAL_BINS_MS = (100, 200, 300, 500, 1000, 2000)
+
+
+class KeystrokeLog(object):
+    """A ring buffer of (time ns, kind, item index, value) events."""
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.times = array.array("q", [0]) * capacity
+        self.kinds = array.array("b", [0]) * capacity
+        self.items = array.array("i", [0]) * capacity
+        self.values = array.array("i", [0]) * capacity
+        self.count = 0
+
+    def clear(self):
+        self.count = 0
+
+    def record(self, kind, item, value=0):
+        position = self.count % self.capacity
+        self.times[position] = time.perf_counter_ns()
+        self.kinds[position] = kind
+        self.items[position] = item
+        self.values[position] = value
+        self.count += 1
+
+    @property
+    def dropped(self):
+        """The number of oldest events that were overwritten."""
+        return max(0, self.count - self.capacity)
+
+    def events(self):
+        """Yields the retained events, oldest first."""
+        for n in range(self.dropped, self.count):
+            position = n % self.capacity
+            yield self.times[position], self.kinds[position], self.items[position], self.values[position]
+
+
+class ItemTiming(object):
+    """The timing of one test item, from being spoken to being submitted with Enter."""
+    def __init__(self, item, shown_ns):
+        self.item = item
+        self.shown_ns = shown_ns
+        self.first_key_ns = None
+        self.submitted_ns = None
+        self.words = 0
+        self.key_count = 0
+        self.intervals_ns = []
+
+    @property
+    def first_key_seconds(self):
+        if self.first_key_ns is None:
+            return None
+        return (self.first_key_ns - self.shown_ns) / 1e9
+
+    @property
+    def duration_seconds(self):
+        if self.submitted_ns is None:
+            return None
+        return (self.submitted_ns - self.shown_ns) / 1e9
+
+    @property
+    def wpm(self):
+        duration = self.duration_seconds
+        if not duration:
+            return None
+        return self.words / duration * 60
+
+
+def item_timings(events):
+    """Groups events into an ItemTiming per item that was both spoken and submitted."""
+    timings = {}
+    last_key_ns = {}
+    for time_ns, kind, item, value in events:
+        if kind == ITEM_SHOWN:
+            # Repeating the prompt (Enter on an empty line) does not restart the item.
+            if item not in timings:
+                timings[item] = ItemTiming(item, time_ns)
+            continue
+        timing = timings.get(item)
+        if timing is None or timing.submitted_ns is not None:
+            continue
+        if kind == KEY_EVENT:
+            if timing.first_key_ns is None:
+                timing.first_key_ns = time_ns
+            else:
+                timing.intervals_ns.append(time_ns - last_key_ns[item])
+            last_key_ns[item] = time_ns
+            timing.key_count += 1
+        elif kind == ITEM_SUBMITTED:
+            timing.submitted_ns = time_ns
+            timing.words = value
+    return [timing for item, timing in sorted(timings.items()) if timing.submitted_ns is not None]
+
+
+def interval_histogram(timings):
+    """Returns (upper bound in ms or None for the open bin, count) pairs over all inter-key intervals."""
+    counts = [0] * (len(INTERVAL_BINS_MS) + 1)
+    for timing in timings:
+        for interval_ns in timing.intervals_ns:
+            interval_ms = interval_ns / 1e6
+            for index, bound in enumerate(INTERVAL_BINS_MS):
+                if interval_ms < bound:
+                    break
+            else:
+                index = len(INTERVAL_BINS_MS)
+            counts[index] += 1
+    bounds = list(INTERVAL_BINS_MS) + [None]
+    return list(zip(bounds, counts))
+
+
+def timing_summary(timings):
+    """Returns the mean time to first key and the median, slowest and fastest per-item WPM."""
+    import statistics
+    first_keys = [timing.first_key_seconds for timing in timings if timing.first_key_seconds is not None]
+    wpms = [timing.wpm for timing in timings if timing.wpm is not None]
+    return {
+        "first_key_mean": statistics.fmean(first_keys) if first_keys else None,
+        "wpm_median": statistics.median(wpms) if wpms else None,
+        "wpm_min": min(wpms) if wpms else None,
+        "wpm_max": max(wpms) if wpms else None,
+    }
+
+
+def write_events_csv(path, log):
+    """Writes the raw events, with times in milliseconds from the first retained event."""
+    import csv
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["time_ms", "event", "item", "value"])
+        start_ns = None
+        for time_ns, kind, item, value in log.events():
+            if start_ns is None:
+                start_ns = time_ns
+            writer.writerow([f"{(time_ns - start_ns) / 1e6:.3f}", KIND_NAMES.get(kind, kind), item, value])
+
+
+def write_items_csv(path, timings, items):
+    """Writes one row per item: its text, time to first key, duration, keys and WPM."""
+    import csv
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["item", "text", "first_key_s", "duration_s", "keys", "words", "wpm"])
+        for timing in timings:
+            first_key = timing.first_key_seconds
+            wpm = timing.wpm
+            writer.writerow([
+                timing.item,
+                items.get(timing.item, ""),
+                "" if first_key is None else f"{first_key:.3f}",
+                f"{timing.duration_seconds:.3f}",
+                timing.key_count,
+                timing.words,
+                "" if wpm is None else f"{wpm:.1f}",
+            ])
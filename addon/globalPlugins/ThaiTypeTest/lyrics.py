@@ -0,0 +1,211 @@
+# thaiTypeTest/addon/globalPlugins/thaiTypeTest/lyrics.py
+
+import hashlib
+import re
+import threading
+from urllib.parse import urlsplit, urlunsplit
+
+from . import pipeline
+from .extractors import decode_page, extractor_for, supported_sites
+from .httpcache import default_cache
+from .watcher import file_stamp
+
+# Host names of the lyrics sites fetch_lyrics knows how to parse; each has an extractor in extractors.py.
+SUPPORTED_SITES = supported_sites()
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36'
+REQUEST_TIMEOUT = 10
+# Upper bound on concurrent downloads during a batch import.
+MAX_FETCH_WORKERS = 4
+# Comment lines that head each imported song in lyrics_th.txt.
+CREDIT_PREFIX = "#credit:"
+CONTENT_PREFIX = "#content:"
+
+_session = None
+_session_lock = threading.Lock()
+# ImportIndex of each lyrics file by path, with the file stamp it matches.
+_import_indexes = {}
+_import_indexes_lock = threading.Lock()
+
+
+def clean_text(text):
+    """Cleans text by removing blank lines, special characters, and BOM."""
+    text = text.split("\n")
+    text = [line.strip() for line in text]
+    text = [line for line in text if line]
+    text = "\n".join(text)
+    text = text.replace(u'\ufeff', '') # Remove BOM
+    # Use Python's 're' module to remove special characters
+    return re.sub(r"[{}[\]()\*#<>]", "", text)
+
+def is_supported_url(url):
+    """Returns True if url points to one of the supported lyrics sites."""
+    return extractor_for(url) is not None
+
+def extract_urls(text):
+    """Returns the supported lyrics URLs in text, in order and without duplicates.
+
+    URLs that differ only in what normalize_url removes count as duplicates; the first is kept.
+    """
+    urls = []
+    seen = set()
+    for word in text.split():
+        if word.startswith(("http://", "https://")) and is_supported_url(word):
+            key = normalize_url(word)
+            if key not in seen:
+                seen.add(key)
+                urls.append(word)
+    return urls
+
+def normalize_url(url):
+    """Returns url with the scheme and host lowercased and no fragment or trailing slash."""
+    parts = urlsplit(url.strip())
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/"), parts.query, ""))
+
+def song_hash(lines):
+    """Hashes a song's lines ignoring normalization and spacing differences."""
+    normalized = (pipeline.normalize_line(line).replace(" ", "") for line in lines)
+    return hashlib.sha1("\n".join(line for line in normalized if line).encode("utf-8")).hexdigest()
+
+
+class ImportIndex(object):
+    """The credit URLs and song hashes already in a lyrics file.
+
+    Built from the file itself, so songs removed by hand can be imported
+    again. A song's hash is taken from its #content: line, written when it
+    was imported, or else computed from its lines.
+    """
+    def __init__(self):
+        self.urls = set()
+        self.hashes = set()
+
+    @classmethod
+    def from_text(cls, text):
+        index = cls()
+        song_lines = []
+        for line in text.splitlines():
+            line = line.strip()
+            if line.startswith(CREDIT_PREFIX):
+                if song_lines:
+                    index.hashes.add(song_hash(song_lines))
+                song_lines = []
+                index.urls.add(normalize_url(line[len(CREDIT_PREFIX):]))
+            elif line.startswith(CONTENT_PREFIX):
+                index.hashes.add(line[len(CONTENT_PREFIX):].strip())
+            elif line and not line.startswith("#"):
+                song_lines.append(line)
+        if song_lines:
+            index.hashes.add(song_hash(song_lines))
+        return index
+
+    @classmethod
+    def from_file(cls, file_path):
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                return cls.from_text(f.read())
+        except FileNotFoundError:
+            return cls()
+
+    def has_url(self, url):
+        return normalize_url(url) in self.urls
+
+    def has_song(self, content_hash):
+        return content_hash in self.hashes
+
+    def add(self, url, content_hash):
+        self.urls.add(normalize_url(url))
+        self.hashes.add(content_hash)
+
+
+def import_index(file_path):
+    """Returns the shared ImportIndex of a lyrics file, read again only if the file changed since.
+
+    Only check songs against it; record_import adds them once they are written.
+    """
+    stamp = file_stamp(file_path)
+    with _import_indexes_lock:
+        cached = _import_indexes.get(file_path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+    index = ImportIndex.from_file(file_path)
+    with _import_indexes_lock:
+        _import_indexes[file_path] = (stamp, index)
+    return index
+
+
+def record_import(file_path, songs):
+    """Adds the (url, content hash) of songs just appended to a lyrics file to its shared index."""
+    with _import_indexes_lock:
+        cached = _import_indexes.get(file_path)
+        if cached is None:
+            return
+        index = cached[1]
+        for url, content_hash in songs:
+            index.add(url, content_hash)
+        # The index now matches the file with the songs appended, so it is not read again for them.
+        _import_indexes[file_path] = (file_stamp(file_path), index)
+
+def get_session():
+    """Returns the shared keep-alive session, retrying transient failures with backoff."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+            retry = Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=("GET",)
+            )
+            adapter = HTTPAdapter(max_retries=retry, pool_connections=MAX_FETCH_WORKERS, pool_maxsize=MAX_FETCH_WORKERS)
+            session = requests.Session()
+            session.headers["User-Agent"] = USER_AGENT
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+def parse_lyrics(url, content):
+    """Extracts and cleans the lyrics from a downloaded page of a supported site."""
+    extractor = extractor_for(url)
+    if extractor is None:
+        return None
+    raw_text = extractor.extract(decode_page(content))
+    if raw_text:
+        return clean_text(raw_text)
+    return None
+
+def fetch_lyrics(url, session=None, cache=None):
+    """Fetches and parses lyrics from one of the supported sites, through the page cache."""
+    try:
+        session = session or get_session()
+        cache = cache or default_cache()
+        return parse_lyrics(url, cache.get(session, url, REQUEST_TIMEOUT))
+    except Exception as e:
+        import logHandler
+        logHandler.log.error(f"Failed to fetch lyrics from {url}", exc_info=True)
+        return None
+
+def fetch_lyrics_batch(urls, on_result=None, max_workers=MAX_FETCH_WORKERS):
+    """Fetches several URLs concurrently with a bounded pool of workers.
+
+    on_result(url, lyrics, done_count, total) is called from the worker
+    thread as each URL finishes. Returns (url, lyrics) pairs in input order;
+    lyrics is None for URLs that failed.
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    results = {}
+    if not urls:
+        return []
+    session = get_session()
+    cache = default_cache()
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(urls)), thread_name_prefix="ThaiTypeTestFetch") as executor:
+        futures = {executor.submit(fetch_lyrics, url, session, cache): url for url in urls}
+        for done_count, future in enumerate(as_completed(futures), 1):
+            url = futures[future]
+            results[url] = future.result()
+            if on_result:
+                on_result(url, results[url], done_count, len(urls))
+    cache.prune()
+    return [(url, results[url]) for url in urls]
@@ -0,0 +1,181 @@
+# thaiTypeTest/addon/globalPlugins/thaiTypeTest/pipeline.py
+"""The corpus build pipeline: normalization, deduplication and difficulty.
+
+Lines are normalized (NFC, no zero-width characters, single spaces, the
+decomposed sara am joined), then exact duplicates are dropped, ignoring
+spacing, and so are near-duplicates: lines whose character 3-gram sets
+have a Jaccard similarity of NEAR_DUPLICATE_JACCARD or more. Candidate
+pairs come from a one-permutation MinHash signature split into LSH
+bands, so each line is compared with a handful of others rather than
+with the whole corpus.
+
+Each line and word also gets a difficulty score from its length, its
+rare characters and its stacked marks. The scores are stored with the
+corpus, so a difficulty band is a cheap filter at test time.
+"""
+
+import unicodedata
+
+from .scoring import THAI_COMBINING_MARKS
+
+_ZERO_WIDTH = dict.fromkeys(map(ord, "\u200b\u200c\u200d\u2060\ufeff"))
+SHINGLE_SIZE = 3
+# Signature slots and how they are grouped into LSH bands.
+SIGNATURE_SLOTS = 16
+LSH_BANDS = 8
+NEAR_DUPLICATE_JACCARD = 0.8
+# Shorter lines are only checked for exact duplicates; a few characters say too little.
+MIN_NEAR_DUPLICATE_CHARS = 12
+
+# Characters that are uncommon in everyday text and mostly sit on the Shift layer of the Kedmanee layout.
+RARE_CHARS = frozenset("ฃฅฆฌญฎฏฐฑฒณธฉฮษศฤฦฬฯ๊๋็์ํฺ๎" + "".join(chr(c) for c in range(0x0e50, 0x0e5a)))
+RARE_CHAR_WEIGHT = 4
+STACKED_MARK_WEIGHT = 2
+# Difficulty bands.
+EASY = 0
+MEDIUM = 1
+HARD = 2
+# Word scores below the first limit are easy, below the second medium, the rest hard.
+WORD_BAND_LIMITS = (5, 9)
+
+
+def normalize_line(line):
+    line = unicodedata.normalize("NFC", line).translate(_ZERO_WIDTH)
+    # Nikhahit followed by sara aa is how some keyboards and pages spell sara am.
+    line = line.replace("\u0e4d\u0e32", "\u0e33")
+    return " ".join(line.split())
+
+
+def shingles(text):
+    if len(text) <= SHINGLE_SIZE:
+        return {text}
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def signature(shingle_set):
+    """A one-permutation MinHash: each shingle's hash goes to one slot, which keeps its minimum.
+
+    It uses the built-in string hash, which is salted per process, so signatures must not be stored.
+    """
+    slots = [None] * SIGNATURE_SLOTS
+    for shingle in shingle_set:
+        value = hash(shingle) & 0xffffffffffffffff
+        slot = value % SIGNATURE_SLOTS
+        if slots[slot] is None or value < slots[slot]:
+            slots[slot] = value
+    return slots
+
+
+def jaccard(first, second):
+    if not first and not second:
+        return 1.0
+    return len(first & second) / len(first | second)
+
+
+class Deduplicator(object):
+    """Remembers the lines added so far and tells whether a new one repeats any of them."""
+    def __init__(self):
+        self.exact = set()
+        self.shingle_sets = []
+        self.buckets = {}
+
+    def contains(self, line):
+        """Returns True if a normalized line repeats a line added before, without adding it."""
+        return self._match(line)[0]
+
+    def add(self, line):
+        """Adds a normalized line; returns False if it repeats a line added before."""
+        repeats, key, shingle_set, band_keys = self._match(line)
+        if repeats:
+            return False
+        self.exact.add(key)
+        if shingle_set is None:
+            return True
+        line_id = len(self.shingle_sets)
+        self.shingle_sets.append(shingle_set)
+        for band_key in band_keys:
+            self.buckets.setdefault(band_key, []).append(line_id)
+        return True
+
+    def _match(self, line):
+        """Returns whether line repeats an added line, with its exact key, shingles and LSH band keys.
+
+        The shingles and band keys are None for a line too short to be compared for near-duplicates.
+        """
+        key = line.replace(" ", "")
+        if key in self.exact:
+            return True, key, None, None
+        if len(key) < MIN_NEAR_DUPLICATE_CHARS:
+            return False, key, None, None
+        shingle_set = shingles(key)
+        slots = signature(shingle_set)
+        rows = SIGNATURE_SLOTS // LSH_BANDS
+        band_keys = [(band, tuple(slots[band * rows:(band + 1) * rows])) for band in range(LSH_BANDS)]
+        candidates = set()
+        for band_key in band_keys:
+            candidates.update(self.buckets.get(band_key, ()))
+        for candidate in candidates:
+            other = self.shingle_sets[candidate]
+            # The similarity can be no higher than the ratio of the set sizes.
+            if min(len(shingle_set), len(other)) < NEAR_DUPLICATE_JACCARD * max(len(shingle_set), len(other)):
+                continue
+            if jaccard(shingle_set, other) >= NEAR_DUPLICATE_JACCARD:
+                return True, key, shingle_set, band_keys
+        return False, key, shingle_set, band_keys
+
+
+def dedupe_lines(lines, existing=()):
+    """Returns the normalized lines that repeat neither an earlier line nor one of existing."""
+    deduplicator = Deduplicator()
+    for line in existing:
+        deduplicator.add(normalize_line(line))
+    kept = []
+    for line in lines:
+        line = normalize_line(line)
+        if line and deduplicator.add(line):
+            kept.append(line)
+    return kept
+
+
+def difficulty(text):
+    """Scores text by length plus weighted rare characters and stacked marks (e.g. ี่ or ั้)."""
+    rare = 0
+    stacked = 0
+    previous_is_mark = False
+    for char in text:
+        if char in RARE_CHARS:
+            rare += 1
+        is_mark = char in THAI_COMBINING_MARKS
+        if is_mark and previous_is_mark:
+            stacked += 1
+        previous_is_mark = is_mark
+    return len(text) + RARE_CHAR_WEIGHT * rare + STACKED_MARK_WEIGHT * stacked
+
+
+def tercile_limits(scores):
+    """Returns the two limits splitting scores into thirds."""
+    if not scores:
+        return (0, 0)
+    ordered = sorted(scores)
+    return (ordered[len(ordered) // 3], ordered[2 * len(ordered) // 3])
+
+
+def band_of(score, limits):
+    if score < limits[0]:
+        return EASY
+    if score < limits[1]:
+        return MEDIUM
+    return HARD
+
+
+class IndexedView(object):
+    """A read-only view of the items of a sequence at the given positions."""
+    def __init__(self, sequence, indices):
+        self.sequence = sequence
+        self.indices = indices
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, index):
+        return self.sequence[self.indices[index]]
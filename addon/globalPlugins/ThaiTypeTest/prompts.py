@@ -0,0 +1,123 @@
+# thaiTypeTest/addon/globalPlugins/thaiTypeTest/prompts.py
+"""Spoken prompts: splitting long items into chunks, and speech timing.
+
+A long verse spoken in one utterance keeps the trainee waiting until the
+synthesizer has finished it, and some synthesizers render the whole
+utterance before the first sound. In chunked mode an item is split into
+chunks of at most CHUNK_CHARS characters, preferably at a space between
+phrases, otherwise between two of the item's tokenized words. The
+chunks of upcoming items are computed ahead from the tokens the dialog
+already has.
+
+SpeechTimings records, per prompt, how long speech took from being
+handed the prompt to its first audio and to the end of the part spoken,
+so chunked and whole-line delivery can be compared in the NVDA log.
+"""
+
+import math
+import re
+import time
+
+# The longest chunk spoken at a time, in characters, unless one word is longer.
+CHUNK_CHARS = 20
+# Ending a chunk inside a phrase costs as much as a chunk off the even length by that length divided by this.
+PHRASE_PENALTY_DIVISOR = 3
+
+_SPACES = re.compile(r"(\s+)")
+
+
+def chunk_prompt(line, tokens=None, max_chars=CHUNK_CHARS):
+    """Returns the chunks line is spoken in, in order; a short line is one chunk.
+
+    tokens are the line's words with the spaces between them, as the
+    tokenizer returns them. Without them, or if they do not make up the
+    line, the line is only split at spaces. Of the ways to split the line
+    into chunks of at most max_chars, the one chosen has chunks closest to
+    an even length, with a penalty for each chunk ending inside a phrase,
+    so a line a little over max_chars becomes two halves rather than a
+    full chunk and a scrap.
+    """
+    if len(line) <= max_chars:
+        return [line]
+    if not tokens or "".join(tokens) != line:
+        tokens = [part for part in _SPACES.split(line) if part]
+    # The start and end of each word in line, and whether a space comes before it.
+    words = []
+    offset = 0
+    space_before = False
+    for token in tokens:
+        if token.isspace():
+            space_before = True
+        else:
+            words.append((offset, offset + len(token), space_before))
+            space_before = False
+        offset += len(token)
+    width = len(line) / math.ceil(len(line) / max_chars)
+    phrase_penalty = (width / PHRASE_PENALTY_DIVISOR) ** 2
+    # best[j] is the cost of the best split of the first j words and where its last chunk starts.
+    best = [(0.0, 0)] + [(math.inf, 0)] * len(words)
+    for end in range(1, len(words) + 1):
+        penalty = 0.0 if end == len(words) or words[end][2] else phrase_penalty
+        for start in range(end - 1, -1, -1):
+            length = words[end - 1][1] - words[start][0]
+            # A word longer than max_chars is a chunk of its own.
+            if length > max_chars and start < end - 1:
+                break
+            cost = best[start][0] + (length - width) ** 2 + penalty
+            if cost < best[end][0]:
+                best[end] = (cost, start)
+    chunks = []
+    end = len(words)
+    while end > 0:
+        start = best[end][1]
+        chunks.append(line[words[start][0]:words[end - 1][1]])
+        end = start
+    chunks.reverse()
+    return chunks
+
+
+class SpeechTimings(object):
+    """Times from handing each prompt to speech to its first audio and to the end of its spoken part."""
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.first_audio = []
+        self.spoken = []
+
+    def clear(self):
+        self.first_audio = []
+        self.spoken = []
+
+    def callbacks(self, item, chars, chunked):
+        """Starts timing a prompt handed to speech now; returns the callbacks for its start and its end.
+
+        Speech that is cancelled before it reaches a callback leaves that time unrecorded.
+        """
+        handed_at = self.clock()
+
+        def on_first_audio():
+            seconds = self.clock() - handed_at
+            self.first_audio.append(seconds)
+            import logHandler
+            logHandler.log.debug(
+                f"Thai Type Test: item {item + 1} ({chars} characters, {'chunked' if chunked else 'whole line'}): "
+                f"first audio after {seconds * 1000:.0f} ms"
+            )
+
+        def on_spoken():
+            self.spoken.append(self.clock() - handed_at)
+
+        return on_first_audio, on_spoken
+
+    def summary(self, chunked):
+        """Returns the log line summing up the test's prompts, or "" if none was timed."""
+        import statistics
+        if not self.first_audio:
+            return ""
+        line = (
+            f"Thai Type Test: time to first audio over {len(self.first_audio)} prompts "
+            f"({'chunked' if chunked else 'whole line'}): median {statistics.median(self.first_audio) * 1000:.0f} ms, "
+            f"max {max(self.first_audio) * 1000:.0f} ms"
+        )
+        if self.spoken:
+            line += f"; first part spoken after median {statistics.median(self.spoken) * 1000:.0f} ms"
+        return line
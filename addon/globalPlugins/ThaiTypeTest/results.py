@@ -0,0 +1,147 @@
+# thaiTypeTest/addon/globalPlugins/thaiTypeTest/results.py
+"""The rows of the results view, one per mistake of a test.
+
+The view is a virtual list control that asks for the text of a cell only
+when the row is shown, so a ten-minute test with thousands of mistakes
+costs no more to show than one with ten. ResultsModel holds the rows and
+the current filter and sort order as a list of row positions. Each row's
+character diff is computed the first time the row is shown.
+"""
+
+from . import scoring
+
+# Error kinds in the order they are listed, with their names.
+ERROR_KIND_NAMES = (
+    (scoring.SUBSTITUTION, "พิมพ์ผิดคำ"),
+    (scoring.OMISSION, "ตกหล่น"),
+    (scoring.INSERTION, "พิมพ์เกิน"),
+    (scoring.MARK_ERROR, "วรรณยุกต์หรือสระผิดตำแหน่ง"),
+)
+KIND_ORDER = {kind: order for order, (kind, name) in enumerate(ERROR_KIND_NAMES)}
+KIND_NAMES = dict(ERROR_KIND_NAMES)
+
+# Column keys and headings, in display order.
+ITEM_COLUMN = "item"
+KIND_COLUMN = "kind"
+REFERENCE_COLUMN = "reference"
+TYPED_COLUMN = "typed"
+DIFF_COLUMN = "diff"
+LINE_COLUMN = "line"
+COLUMNS = (
+    (ITEM_COLUMN, "ข้อที่"),
+    (KIND_COLUMN, "ประเภท"),
+    (REFERENCE_COLUMN, "ต้นฉบับ"),
+    (TYPED_COLUMN, "ที่พิมพ์"),
+    (DIFF_COLUMN, "ความต่างรายตัวอักษร"),
+    (LINE_COLUMN, "ข้อความที่พิมพ์ทั้งข้อ"),
+)
+
+
+def format_cluster_diff(reference, typed):
+    """Shows how typed differs from reference, grapheme cluster by cluster.
+
+    Matching clusters are shown as they are; [ก→ข] is a replaced stretch,
+    [-ก] one that was left out and [+ก] one that was added.
+    """
+    reference_clusters, typed_clusters, opcodes = scoring.cluster_diff(reference, typed)
+    parts = []
+    for tag, i1, i2, j1, j2 in opcodes:
+        expected = "".join(reference_clusters[i1:i2])
+        actual = "".join(typed_clusters[j1:j2])
+        if tag == "equal":
+            parts.append(expected)
+        elif tag == "replace":
+            parts.append(f"[{expected}→{actual}]")
+        elif tag == "delete":
+            parts.append(f"[-{expected}]")
+        else:
+            parts.append(f"[+{actual}]")
+    return "".join(parts)
+
+
+class ErrorRow(object):
+    """One mismatching stretch of a test, with the whole item it was found in."""
+    __slots__ = ("item", "kind", "reference", "typed", "line_typed", "_diff")
+
+    def __init__(self, item, kind, reference, typed, line_typed):
+        self.item = item
+        self.kind = kind
+        self.reference = reference
+        self.typed = typed
+        self.line_typed = line_typed
+        self._diff = None
+
+    @property
+    def diff(self):
+        if self._diff is None:
+            self._diff = format_cluster_diff(self.reference, self.typed)
+        return self._diff
+
+    def cell(self, column):
+        if column == ITEM_COLUMN:
+            return str(self.item + 1)
+        if column == KIND_COLUMN:
+            return KIND_NAMES.get(self.kind, self.kind)
+        if column == REFERENCE_COLUMN:
+            return self.reference
+        if column == TYPED_COLUMN:
+            return self.typed
+        if column == DIFF_COLUMN:
+            return self.diff
+        return self.line_typed
+
+
+_SORT_KEYS = {
+    ITEM_COLUMN: lambda row: row.item,
+    KIND_COLUMN: lambda row: (KIND_ORDER.get(row.kind, len(KIND_ORDER)), row.item),
+    REFERENCE_COLUMN: lambda row: row.reference,
+    TYPED_COLUMN: lambda row: row.typed,
+    DIFF_COLUMN: lambda row: row.diff,
+    LINE_COLUMN: lambda row: row.line_typed,
+}
+
+
+class ResultsModel(object):
+    """The error rows of a test as shown: filtered by kind and sorted by a column."""
+    def __init__(self, session_score=None):
+        self.rows = []
+        self.kind = None
+        self.sort_column = ITEM_COLUMN
+        self.descending = False
+        self.shown = []
+        if session_score is not None:
+            self.set_rows(session_score)
+
+    def set_rows(self, session_score):
+        self.rows = [
+            ErrorRow(item, error.kind, error.reference, error.typed, typed)
+            for item, reference, typed, error in session_score.errors
+        ]
+        self.refresh()
+
+    def set_filter(self, kind):
+        """Shows only the rows of one error kind, or every row for None."""
+        self.kind = kind
+        self.refresh()
+
+    def sort_by(self, column, descending=False):
+        self.sort_column = column
+        self.descending = descending
+        self.refresh()
+
+    def refresh(self):
+        rows = self.rows
+        shown = [index for index, row in enumerate(rows) if self.kind is None or row.kind == self.kind]
+        if self.sort_column != ITEM_COLUMN or self.descending:
+            key = _SORT_KEYS[self.sort_column]
+            shown.sort(key=lambda index: key(rows[index]), reverse=self.descending)
+        self.shown = shown
+
+    def __len__(self):
+        return len(self.shown)
+
+    def row(self, index):
+        return self.rows[self.shown[index]]
+
+    def cell(self, index, column_index):
+        return self.row(index).cell(COLUMNS[column_index][0])
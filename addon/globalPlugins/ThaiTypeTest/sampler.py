@@ -0,0 +1,95 @@
+# thaiTypeTest/addon/globalPlugins/thaiTypeTest/sampler.py
+"""Lazy, seeded random orderings of datasets.
+
+Instead of copying a dataset and shuffling it before every test, a test
+walks a pseudo-random permutation of the dataset's indices. The
+permutation is a small Feistel network over the next power-of-four range,
+with cycle-walking to stay below the dataset size, so it needs O(1)
+memory and O(1) time per item whatever the dataset size, and the same
+seed always gives the same order. Small datasets, where a Feistel network
+over a few bits mixes poorly, get a plain seeded shuffle of a bounded
+index list instead.
+"""
+
+import random
+
+FEISTEL_ROUNDS = 6
+# Datasets up to this size are shuffled as an index list; the memory stays bounded.
+SMALL_DATASET_SIZE = 4096
+_MASK64 = (1 << 64) - 1
+
+
+def new_seed():
+    """Returns a fresh seed for a test order."""
+    return random.randrange(1 << 32)
+
+
+def _mix(value):
+    """A 64-bit integer finalizer (splitmix64) used as the Feistel round function."""
+    value = (value + 0x9e3779b97f4a7c15) & _MASK64
+    value = ((value ^ (value >> 30)) * 0xbf58476d1ce4e5b9) & _MASK64
+    value = ((value ^ (value >> 27)) * 0x94d049bb133111eb) & _MASK64
+    return value ^ (value >> 31)
+
+
+class PermutationSampler(object):
+    """A bijection of range(size) onto itself chosen by seed."""
+    def __init__(self, size, seed):
+        self.size = size
+        self.seed = seed
+        rng = random.Random(seed)
+        self.small_order = None
+        if size <= SMALL_DATASET_SIZE:
+            self.small_order = list(range(size))
+            rng.shuffle(self.small_order)
+            return
+        half_bits = 1
+        while (1 << (2 * half_bits)) < size:
+            half_bits += 1
+        self.half_bits = half_bits
+        self.half_mask = (1 << half_bits) - 1
+        self.round_keys = [rng.getrandbits(64) for _ in range(FEISTEL_ROUNDS)]
+
+    def _encrypt(self, value):
+        left = value >> self.half_bits
+        right = value & self.half_mask
+        for key in self.round_keys:
+            left, right = right, left ^ (_mix(right ^ key) & self.half_mask)
+        return (left << self.half_bits) | right
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("sampler index out of range")
+        if self.small_order is not None:
+            return self.small_order[index]
+        # Cycle-walk: the permutation covers a range up to four times larger than the dataset.
+        value = self._encrypt(index)
+        while value >= self.size:
+            value = self._encrypt(value)
+        return value
+
+
+class SampledDataset(object):
+    """A read-only view of a dataset in the order given by a PermutationSampler."""
+    def __init__(self, dataset, seed):
+        self.dataset = dataset
+        self.sampler = PermutationSampler(len(dataset), seed)
+
+    @property
+    def seed(self):
+        return self.sampler.seed
+
+    def source_index(self, index):
+        """Returns the position in the underlying dataset of the index-th item of the test."""
+        return self.sampler[index]
+
+    def __len__(self):
+        return len(self.sampler)
+
+    def __getitem__(self, index):
+        return self.dataset[self.sampler[index]]
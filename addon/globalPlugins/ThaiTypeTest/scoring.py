@@ -0,0 +1,359 @@
+# thaiTypeTest/addon/globalPlugins/thaiTypeTest/scoring.py
+"""Scoring of typed text against a reference.
+
+The diff is Myers' O(ND) algorithm, so its cost grows with the number of
+mistakes rather than the length of the line, and the result is a true
+shortest edit script (unlike difflib's autojunk heuristic). Identical
+lines and common ends are matched without a search; the rest is diffed
+by the plain forward pass, or by the linear-space recursion when it is
+longer than SHORT_DIFF_LENGTH. It works on word tokens and on Thai
+grapheme clusters alike.
+
+Nothing here depends on wx or NVDA: score_item and SessionScore are what
+the dialog scores a test with, and transcripts.py scores recorded tests
+with the same code outside NVDA.
+"""
+
+import string
+
+from .timing import per_minute
+
+# Punctuation that is not counted when scoring sentences.
+PUNCTUATION_TO_IGNORE = string.punctuation + "ๆฯ“”"
+
+# Error kinds reported for each non-matching stretch of a line.
+SUBSTITUTION = "substitution"
+INSERTION = "insertion"
+OMISSION = "omission"
+# Same consonants and vowels and the same tone marks and above/below vowels, but in the wrong places.
+MARK_ERROR = "mark"
+
+# Thai characters that combine with the preceding consonant:
+# mai han-akat, the above/below vowels, phinthu, and maitaikhu to yamakkan (tone marks included).
+THAI_COMBINING_MARKS = frozenset(
+    "ั" + "".join(chr(c) for c in range(0x0e34, 0x0e3b)) + "".join(chr(c) for c in range(0x0e47, 0x0e4f))
+)
+# Stretches left after matching common ends, with at most this many elements on both sides
+# together, are diffed by the plain forward pass instead of the linear-space recursion.
+SHORT_DIFF_LENGTH = 1024
+
+
+def grapheme_clusters(text):
+    """Splits text into clusters of a base character followed by its combining marks."""
+    clusters = []
+    for char in text:
+        if clusters and char in THAI_COMBINING_MARKS:
+            clusters[-1] += char
+        else:
+            clusters.append(char)
+    return clusters
+
+
+def _middle_snake(a, alo, ahi, b, blo, bhi):
+    """Finds the middle snake of a shortest edit script between a[alo:ahi] and b[blo:bhi].
+
+    Returns the snake as absolute (x_start, y_start, x_end, y_end).
+    """
+    n = ahi - alo
+    m = bhi - blo
+    delta = n - m
+    odd = delta % 2 != 0
+    max_d = (n + m + 1) // 2
+    offset = max_d + 1
+    forward = [0] * (2 * offset + 1)
+    backward = [0] * (2 * offset + 1)
+    for d in range(max_d + 1):
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and forward[offset + k - 1] < forward[offset + k + 1]):
+                x = forward[offset + k + 1]
+            else:
+                x = forward[offset + k - 1] + 1
+            y = x - k
+            x_start, y_start = x, y
+            while x < n and y < m and a[alo + x] == b[blo + y]:
+                x += 1
+                y += 1
+            forward[offset + k] = x
+            reverse_k = delta - k
+            if odd and -(d - 1) <= reverse_k <= d - 1 and x + backward[offset + reverse_k] >= n:
+                return alo + x_start, blo + y_start, alo + x, blo + y
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and backward[offset + k - 1] < backward[offset + k + 1]):
+                x = backward[offset + k + 1]
+            else:
+                x = backward[offset + k - 1] + 1
+            y = x - k
+            x_start, y_start = x, y
+            while x < n and y < m and a[ahi - 1 - x] == b[bhi - 1 - y]:
+                x += 1
+                y += 1
+            backward[offset + k] = x
+            forward_k = delta - k
+            if not odd and -d <= forward_k <= d and x + forward[offset + forward_k] >= n:
+                return ahi - x, bhi - y, ahi - x_start, bhi - y_start
+    raise AssertionError("no middle snake found")
+
+
+def _greedy_runs(a, alo, ahi, b, blo, bhi, runs):
+    """Appends the matching runs (x, y, length) of a shortest edit script between a[alo:ahi] and b[blo:bhi].
+
+    The plain forward pass of Myers' algorithm, keeping each round's
+    furthest points for the walk back. It needs memory quadratic in the
+    number of edits, so it is only used up to SHORT_DIFF_LENGTH, where it
+    beats the linear-space recursion.
+    """
+    a = a[alo:ahi]
+    b = b[blo:bhi]
+    n = len(a)
+    m = len(b)
+    # trace[d][(k + d) // 2] is the furthest x reached on diagonal k = x - y with d edits.
+    trace = []
+    previous = [0]
+    d = index = 0
+    while True:
+        current = [0] * (d + 1)
+        for index in range(d + 1):
+            if d == 0:
+                x = 0
+            elif index == 0 or (index != d and previous[index - 1] < previous[index]):
+                x = previous[index]
+            else:
+                x = previous[index - 1] + 1
+            y = x - 2 * index + d
+            while x < n and y < m and a[x] == b[y]:
+                x += 1
+                y += 1
+            current[index] = x
+            if x >= n and y >= m:
+                break
+        else:
+            trace.append(current)
+            previous = current
+            d += 1
+            continue
+        trace.append(current)
+        break
+    found = []
+    while d > 0:
+        x = trace[d][index]
+        k = 2 * index - d
+        previous = trace[d - 1]
+        if index == 0 or (index != d and previous[index - 1] < previous[index]):
+            # Reached from diagonal k + 1 by a step down.
+            start_x = previous[index]
+        else:
+            index -= 1
+            start_x = previous[index] + 1
+        if x > start_x:
+            found.append((alo + start_x, blo + start_x - k, x - start_x))
+        d -= 1
+    if trace[0][0]:
+        found.append((alo, blo, trace[0][0]))
+    runs.extend(reversed(found))
+
+
+def _collect_runs(a, alo, ahi, b, blo, bhi, runs):
+    # Common prefixes and suffixes are matched directly; they keep the recursion shallow.
+    start = alo
+    while alo < ahi and blo < bhi and a[alo] == b[blo]:
+        alo += 1
+        blo += 1
+    if alo > start:
+        runs.append((start, blo - (alo - start), alo - start))
+    end = ahi
+    while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+        ahi -= 1
+        bhi -= 1
+    if alo < ahi and blo < bhi:
+        if (ahi - alo) + (bhi - blo) <= SHORT_DIFF_LENGTH:
+            _greedy_runs(a, alo, ahi, b, blo, bhi, runs)
+        else:
+            x, y, u, v = _middle_snake(a, alo, ahi, b, blo, bhi)
+            _collect_runs(a, alo, x, b, blo, y, runs)
+            if u > x:
+                runs.append((x, y, u - x))
+            _collect_runs(a, u, ahi, b, v, bhi, runs)
+    if end > ahi:
+        runs.append((ahi, bhi, end - ahi))
+
+
+def diff_opcodes(a, b):
+    """Returns difflib-style opcodes (tag, i1, i2, j1, j2) for a shortest edit script from a to b."""
+    if a == b:
+        return [("equal", 0, len(a), 0, len(b))] if a else []
+    runs = []
+    _collect_runs(a, 0, len(a), b, 0, len(b), runs)
+    # An empty run at the ends closes the last stretch.
+    runs.append((len(a), len(b), 0))
+    opcodes = []
+    i = j = 0
+    for x, y, length in runs:
+        if x > i and y > j:
+            opcodes.append(("replace", i, x, j, y))
+        elif x > i:
+            opcodes.append(("delete", i, x, j, j))
+        elif y > j:
+            opcodes.append(("insert", i, i, j, y))
+        if length:
+            if opcodes and opcodes[-1][0] == "equal" and opcodes[-1][2] == x:
+                opcodes[-1] = ("equal", opcodes[-1][1], x + length, opcodes[-1][3], y + length)
+            else:
+                opcodes.append(("equal", x, x + length, y, y + length))
+        i, j = x + length, y + length
+    return opcodes
+
+
+def strip_marks(text):
+    """Removes Thai tone marks and above/below vowels from text."""
+    return "".join(char for char in text if char not in THAI_COMBINING_MARKS)
+
+
+def _is_sub_multiset(smaller, larger):
+    """Returns whether every character of sorted smaller occurs in sorted larger, counting repeats."""
+    position = 0
+    for char in smaller:
+        while position < len(larger) and larger[position] < char:
+            position += 1
+        if position == len(larger) or larger[position] != char:
+            return False
+        position += 1
+    return True
+
+
+def classify_error(reference, typed):
+    """Returns the error kind for a reference fragment typed as typed."""
+    if not typed:
+        return OMISSION
+    if not reference:
+        return INSERTION
+    if strip_marks(reference) == strip_marks(typed):
+        # Only the marks differ: moved, left out, added or exchanged for others.
+        reference_marks = sorted(char for char in reference if char in THAI_COMBINING_MARKS)
+        typed_marks = sorted(char for char in typed if char in THAI_COMBINING_MARKS)
+        if reference_marks == typed_marks:
+            return MARK_ERROR
+        if _is_sub_multiset(typed_marks, reference_marks):
+            return OMISSION
+        if _is_sub_multiset(reference_marks, typed_marks):
+            return INSERTION
+    return SUBSTITUTION
+
+
+class ItemError(object):
+    """One non-matching stretch of a scored line; reference_words are the reference words it covers."""
+    def __init__(self, kind, reference, typed, reference_words=()):
+        self.kind = kind
+        self.reference = reference
+        self.typed = typed
+        self.reference_words = reference_words
+
+    def __repr__(self):
+        return f"ItemError({self.kind!r}, {self.reference!r}, {self.typed!r})"
+
+
+class ItemScore(object):
+    """The outcome of scoring one typed line or word."""
+    def __init__(self, correct, incorrect, errors):
+        self.correct = correct
+        self.incorrect = incorrect
+        self.errors = errors
+
+
+def score_words(reference_words, typed_words):
+    """Scores typed words against reference words.
+
+    Each mismatching stretch counts as many incorrect words as the longer
+    of its two sides, as the dialog has always counted them.
+    """
+    correct = incorrect = 0
+    errors = []
+    for tag, i1, i2, j1, j2 in diff_opcodes(reference_words, typed_words):
+        if tag == "equal":
+            correct += i2 - i1
+            continue
+        incorrect += max(i2 - i1, j2 - j1)
+        reference = "".join(reference_words[i1:i2])
+        typed = "".join(typed_words[j1:j2])
+        errors.append(ItemError(classify_error(reference, typed), reference, typed, reference_words[i1:i2]))
+    return ItemScore(correct, incorrect, errors)
+
+
+def score_word(reference, typed):
+    """Scores a single typed word, which is either right or wrong as a whole."""
+    if typed == reference:
+        return ItemScore(1, 0, [])
+    return ItemScore(0, 1, [ItemError(classify_error(reference, typed), reference, typed, [reference])])
+
+
+def filter_scored_words(tokens):
+    """Drops the tokens that sentence scoring ignores: punctuation and whitespace."""
+    return [word for word in tokens if word not in PUNCTUATION_TO_IGNORE and not word.isspace()]
+
+
+def score_item(reference, typed, is_sentence, reference_words=None, tokenize=None):
+    """Scores one submitted item; returns its ItemScore and the reference words it was scored against.
+
+    A sentence is compared word by word after tokenizing both sides;
+    reference_words, if given, are the reference's already filtered words.
+    A word item is right or wrong as a whole. typed should already be
+    stripped, as the dialog strips it.
+    """
+    if not is_sentence:
+        return score_word(reference, typed), [reference]
+    if tokenize is None:
+        from .tokenizer import word_tokenize as tokenize
+    if reference_words is None:
+        reference_words = filter_scored_words(tokenize(reference))
+    return score_words(reference_words, filter_scored_words(tokenize(typed))), reference_words
+
+
+class SessionScore(object):
+    """The running totals of one test and the speeds and accuracy reported from them."""
+    def __init__(self):
+        self.items = 0
+        self.correct_words = 0
+        self.incorrect_words = 0
+        self.typed_chars = 0
+        # (reference, typed) of every item with a mistake, in order.
+        self.incorrect_pairs = []
+        # (item number, reference, typed, ItemError) of every mismatching stretch, in order.
+        self.errors = []
+        # Error kind to the number of mismatching stretches of that kind.
+        self.error_counts = {}
+
+    def add(self, reference, typed, item_score):
+        item = self.items
+        self.items += 1
+        self.correct_words += item_score.correct
+        self.incorrect_words += item_score.incorrect
+        self.typed_chars += len(typed)
+        if item_score.incorrect > 0:
+            self.incorrect_pairs.append((reference, typed))
+            for error in item_score.errors:
+                self.errors.append((item, reference, typed, error))
+                self.error_counts[error.kind] = self.error_counts.get(error.kind, 0) + 1
+
+    @property
+    def words_typed(self):
+        return self.correct_words + self.incorrect_words
+
+    def accuracy(self):
+        """Returns the percentage of typed words that were correct, or 0 if none were typed."""
+        words_typed = self.words_typed
+        return (self.correct_words / words_typed) * 100 if words_typed > 0 else 0
+
+    def gross_wpm(self, elapsed_seconds):
+        return per_minute(self.words_typed, elapsed_seconds)
+
+    def net_wpm(self, elapsed_seconds):
+        return per_minute(self.correct_words, elapsed_seconds)
+
+    def cpm(self, elapsed_seconds):
+        return per_minute(self.typed_chars, elapsed_seconds)
+
+
+def cluster_diff(reference, typed):
+    """Returns opcodes between the grapheme clusters of two strings, with the clusters."""
+    reference_clusters = grapheme_clusters(reference)
+    typed_clusters = grapheme_clusters(typed)
+    return reference_clusters, typed_clusters, diff_opcodes(reference_clusters, typed_clusters)
@@ -0,0 +1,264 @@
+# thaiTypeTest/addon/globalPlugins/thaiTypeTest/store.py
+"""The corpora and word banks shared by every test dialog.
+
+The store lives as long as NVDA runs, so closing the dialog no longer
+throws away the loaded corpora and word banks. A reopened dialog takes the
+corpora that have not changed on disk since they were loaded, and the word
+banks built from them, instead of reading and sorting everything again.
+Each word is held as one string object, however many token lists, word
+banks and difficulty tables contain it. Modes see the store's lists through
+read-only views, not copies. Each corpus that lyrics are imported into
+also keeps a near-duplicate index of its lines, built once and extended
+as lines are merged, so an import costs the same however long the corpus.
+
+The store is emptied once no dialog has used it for IDLE_EVICT_SECONDS.
+Words are pooled in a dict of the store's own rather than with sys.intern,
+so emptying the store really releases them.
+"""
+
+import bisect
+import threading
+import time
+
+from . import pipeline
+from .corpus import Corpus
+from .watcher import file_stamp
+
+# How long the store keeps its data after the last dialog closed.
+IDLE_EVICT_SECONDS = 600
+
+
+class ReadOnlyView(object):
+    """A read-only view of a list or other sequence owned by the store."""
+    def __init__(self, sequence):
+        self.sequence = sequence
+
+    def __len__(self):
+        return len(self.sequence)
+
+    def __getitem__(self, index):
+        return self.sequence[index]
+
+    def __iter__(self):
+        return iter(self.sequence)
+
+
+class _Entry(object):
+    """A stored corpus with the state of its file when it was read.
+
+    words is None until the words of a compiled corpus are first needed.
+    """
+    def __init__(self, stamp, engine, corpus, words):
+        self.stamp = stamp
+        self.engine = engine
+        self.corpus = corpus
+        self.words = words
+
+
+class CorpusStore(object):
+    """Loaded corpora by file name, the word banks built from them and a pool of their words."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.users = 0
+        self.last_used = time.monotonic()
+        self.clear()
+
+    def clear(self):
+        """Forgets every corpus, word bank and pooled word."""
+        with self.lock:
+            self._clear()
+
+    def _clear(self):
+        self.entries = {}
+        # Sorted word banks and their word sets, keyed by the tuple of their source files.
+        self.word_banks = {}
+        self.word_difficulty = {}
+        self.strings = {}
+        # Near-duplicate indexes of corpus lines by file name, with the file stamp they match.
+        self.deduplicators = {}
+
+    def acquire(self):
+        """Registers an open dialog; the store is not evicted while it is open."""
+        with self.lock:
+            self.users += 1
+            self.last_used = time.monotonic()
+
+    def release(self):
+        with self.lock:
+            self.users -= 1
+            self.last_used = time.monotonic()
+
+    def evict_if_idle(self, now=None):
+        """Empties the store if no dialog has used it for IDLE_EVICT_SECONDS; returns True if it did."""
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            if self.users > 0 or now - self.last_used < IDLE_EVICT_SECONDS or not self.entries:
+                return False
+            # Cleared under the same lock, so a dialog acquiring the store meanwhile keeps its corpora.
+            self._clear()
+        return True
+
+    def _pool(self, text):
+        return self.strings.setdefault(text, text)
+
+    def lookup(self, file_name, file_path, engine):
+        """Returns the stored corpus of file_name (None for a missing file).
+
+        Raises KeyError if it is not stored, was tokenized by another engine
+        or the file changed since it was read.
+        """
+        with self.lock:
+            entry = self.entries.get(file_name)
+        if entry is None or entry.engine != engine or entry.stamp != file_stamp(file_path):
+            raise KeyError(file_name)
+        return entry.corpus
+
+    def put(self, file_name, stamp, engine, corpus):
+        """Stores a corpus read when its file had stamp, pooling its words; returns it.
+
+        The words of a compiled corpus are left in its vocabulary until a
+        word bank needs them, so a corpus only used for sentences never has
+        them decoded. Word banks built from an older version of the file are dropped.
+        """
+        with self.lock:
+            words = set()
+            if isinstance(corpus, Corpus):
+                pool = self._pool
+                word_difficulty = {pool(word): score for word, score in corpus.word_difficulty.items()}
+                words = set(word_difficulty)
+                corpus.tokens = [[pool(word) for word in line_tokens] for line_tokens in corpus.tokens]
+                corpus.word_difficulty = word_difficulty
+                corpus.words = words
+                self.word_difficulty.update(word_difficulty)
+            elif corpus is not None:
+                words = None
+            self.entries[file_name] = _Entry(stamp, engine, corpus, words)
+            for key in [key for key in self.word_banks if file_name in key]:
+                del self.word_banks[key]
+            # An index merged up to this state of the file still holds exactly its lines.
+            if file_name in self.deduplicators and self.deduplicators[file_name][0] != stamp:
+                del self.deduplicators[file_name]
+        return corpus
+
+    def discard(self, file_name):
+        with self.lock:
+            self.entries.pop(file_name, None)
+            self.deduplicators.pop(file_name, None)
+            for key in [key for key in self.word_banks if file_name in key]:
+                del self.word_banks[key]
+
+    def word_bank(self, source_files):
+        """Returns a read-only view of the sorted words of source_files, or None until all of them are stored.
+
+        The first call for a set of files decodes and sorts their words,
+        which takes a while for large compiled corpora, so make it on a worker thread.
+        """
+        key = tuple(source_files)
+        with self.lock:
+            if key not in self.word_banks:
+                if not all(file_name in self.entries for file_name in key):
+                    return None
+                words = set()
+                for file_name in key:
+                    words.update(self._entry_words(self.entries[file_name]))
+                # Sorted so that a test order seed replays the same words.
+                self.word_banks[key] = (words, sorted(words))
+            return ReadOnlyView(self.word_banks[key][1])
+
+    def _entry_words(self, entry):
+        """Returns the pooled words of a stored corpus, decoding a compiled one's on first use. Call with the lock held."""
+        if entry.words is None:
+            pool = self._pool
+            word_difficulty = {pool(word): score for word, score in entry.corpus.word_difficulty.items()}
+            self.word_difficulty.update(word_difficulty)
+            entry.words = set(word_difficulty)
+        return entry.words
+
+    def deduplicator(self, file_name):
+        """Returns the near-duplicate index of a stored corpus's lines, or None if it is not stored.
+
+        The index is built from the lines on first use, outside the lock, so
+        call this on a worker thread. Only check lines against it; merge adds them.
+        """
+        with self.lock:
+            entry = self.entries.get(file_name)
+            if entry is None:
+                return None
+            if file_name in self.deduplicators:
+                return self.deduplicators[file_name][1]
+            stamp, corpus = entry.stamp, entry.corpus
+        deduplicator = pipeline.Deduplicator()
+        for line in corpus.lines if corpus is not None else ():
+            deduplicator.add(line)
+        with self.lock:
+            entry = self.entries.get(file_name)
+            if entry is not None and entry.stamp == stamp:
+                self.deduplicators.setdefault(file_name, (stamp, deduplicator))
+        return deduplicator
+
+    def merge(self, file_name, stamp, lines, tokens):
+        """Adds lines appended to a stored corpus file to it and to the word banks built from it.
+
+        Returns the words that are new to the corpus (for a compiled corpus
+        whose words no word bank has needed yet, all the words of the lines),
+        or None if the corpus is not stored. A compiled corpus keeps the lines
+        in memory after its mapped ones. The near-duplicate index takes the
+        lines either way, and is kept when the file is reloaded as it is now.
+        """
+        with self.lock:
+            if file_name in self.deduplicators:
+                deduplicator = self.deduplicators[file_name][1]
+                for line in lines:
+                    deduplicator.add(line)
+                self.deduplicators[file_name] = (stamp, deduplicator)
+            entry = self.entries.get(file_name)
+            if entry is None or entry.corpus is None:
+                return None
+            corpus = entry.corpus
+            pool = self._pool
+            tokens = [[pool(word) for word in line_tokens] for line_tokens in tokens]
+            if isinstance(corpus, Corpus):
+                corpus.lines.extend(lines)
+                corpus.tokens.extend(tokens)
+                corpus.line_difficulty.extend(pipeline.difficulty(line) for line in lines)
+            else:
+                corpus.append(lines, tokens)
+            entry.stamp = stamp
+            new_words = {word for line_tokens in tokens for word in line_tokens}
+            if entry.words is None:
+                # No word bank has this corpus's words yet; the appended ones are decoded with the rest.
+                return new_words
+            new_words.difference_update(entry.words)
+            entry.words.update(new_words)
+            for word in new_words:
+                self.word_difficulty[word] = pipeline.difficulty(word)
+                if isinstance(corpus, Corpus):
+                    corpus.word_difficulty[word] = self.word_difficulty[word]
+            for key, (word_set, word_bank) in self.word_banks.items():
+                if file_name not in key:
+                    continue
+                # Kept sorted as a reload would sort it, so a seed replays the same words after a restart.
+                for word in new_words:
+                    if word not in word_set:
+                        word_set.add(word)
+                        bisect.insort(word_bank, word)
+        return new_words
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def default_store():
+    """Returns the corpus store shared by all dialogs."""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = CorpusStore()
+        return _default_store
+
+
+def evict_idle():
+    """Empties the shared store if it has been idle long enough; called some time after a dialog closes."""
+    if _default_store is not None:
+        _default_store.evict_if_idle()
@@ -0,0 +1,80 @@
+# thaiTypeTest/addon/globalPlugins/thaiTypeTest/timing.py
+"""Test timing on a monotonic clock.
+
+A TestClock keeps the start and stop times of a test from
+time.perf_counter, so speeds are computed from the time that really
+passed rather than from the nominal test length or a count of timer
+ticks. The countdown beeps are deadlines measured from the start; the
+dialog's timer only has to wake up at the next one.
+"""
+
+import time
+
+# Seconds before the end of the test and the pitch of each countdown beep.
+COUNTDOWN_BEEPS = ((4, 440), (3, 550), (2, 660), (1, 770))
+COUNTDOWN_BEEP_MS = 70
+MINUTE_BEEP_PITCH = 440
+MINUTE_BEEP_MS = 50
+# A beep whose deadline passed longer ago than this (the main loop was busy) is dropped, not played late.
+MAX_BEEP_LATENESS = 0.5
+
+
+def beep_schedule(duration):
+    """Returns (seconds from start, pitch, length in ms) for every beep of a test, in order."""
+    schedule = [(minute * 60, MINUTE_BEEP_PITCH, MINUTE_BEEP_MS) for minute in range(1, int(duration // 60) + 1)]
+    schedule.extend(
+        (duration - before, pitch, COUNTDOWN_BEEP_MS) for before, pitch in COUNTDOWN_BEEPS if duration - before > 0
+    )
+    # The end of the test has its own, longer beep.
+    return sorted(beep for beep in schedule if beep[0] < duration)
+
+
+def per_minute(count, seconds):
+    """Returns a rate per minute, or 0 if no time passed."""
+    return count * 60 / seconds if seconds > 0 else 0
+
+
+class TestClock(object):
+    """The start, stop and deadlines of one timed test."""
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.started_at = None
+        self.stopped_at = None
+        self.duration = 0
+        self.pending_beeps = []
+
+    def start(self, duration):
+        """Starts a test lasting duration seconds."""
+        self.started_at = self.clock()
+        self.stopped_at = None
+        self.duration = duration
+        self.pending_beeps = beep_schedule(duration)
+
+    def stop(self):
+        if self.started_at is not None and self.stopped_at is None:
+            self.stopped_at = self.clock()
+
+    def elapsed(self):
+        """Seconds from the start to the stop, or to now while the test runs."""
+        if self.started_at is None:
+            return 0.0
+        end = self.stopped_at if self.stopped_at is not None else self.clock()
+        return end - self.started_at
+
+    def is_over(self):
+        return self.elapsed() >= self.duration
+
+    def due_beeps(self):
+        """Returns (pitch, length in ms) of the beeps whose deadline has passed, and forgets them."""
+        elapsed = self.elapsed()
+        due = []
+        while self.pending_beeps and self.pending_beeps[0][0] <= elapsed:
+            offset, pitch, length = self.pending_beeps.pop(0)
+            if elapsed - offset <= MAX_BEEP_LATENESS:
+                due.append((pitch, length))
+        return due
+
+    def seconds_to_next_deadline(self):
+        """Seconds until the next beep or the end of the test, whichever comes first."""
+        deadline = self.pending_beeps[0][0] if self.pending_beeps else self.duration
+        return max(0.0, deadline - self.elapsed())
@@ -0,0 +1,151 @@
+# thaiTypeTest/addon/globalPlugins/thaiTypeTest/tokenizer.py
+"""Word tokenization with switchable engines and a bounded memo.
+
+"newmm" is PyThaiNLP's dictionary-based tokenizer. "maximal" is a
+maximal-matching tokenizer over a trie built from the add-on's own word
+banks; it needs no PyThaiNLP dictionary at all, which makes it the cheap
+choice when newmm's dictionary load is too expensive.
+"""
+
+import functools
+import threading
+
+NEWMM_ENGINE = "newmm"
+MAXIMAL_ENGINE = "maximal"
+ENGINES = (NEWMM_ENGINE, MAXIMAL_ENGINE)
+DEFAULT_ENGINE = NEWMM_ENGINE
+# Number of distinct lines whose tokens are remembered per tokenizer.
+MEMO_SIZE = 4096
+
+_TRIE_END = ""
+
+
+def _is_thai(char):
+    return "\u0e00" <= char <= "\u0e7f"
+
+
+def _char_class(char):
+    if char.isspace():
+        return "space"
+    if char.isalnum() and not _is_thai(char):
+        return "alnum"
+    return "other"
+
+
+class TrieTokenizer(object):
+    """Maximal matching over a dictionary trie: fewest unknown characters, then fewest words."""
+    def __init__(self, words):
+        self.trie = {}
+        for word in words:
+            if word and not word.isspace():
+                self.add_word(word)
+
+    def add_word(self, word):
+        node = self.trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[_TRIE_END] = True
+
+    def _prefix_lengths(self, text, start):
+        node = self.trie
+        lengths = []
+        for position in range(start, len(text)):
+            node = node.get(text[position])
+            if node is None:
+                break
+            if _TRIE_END in node:
+                lengths.append(position - start + 1)
+        return lengths
+
+    def tokenize(self, text):
+        n = len(text)
+        # best[i] is (unknown characters, tokens, end of first token, first token unknown) for text[i:].
+        best = [None] * (n + 1)
+        best[n] = (0, 0, n, False)
+        for i in range(n - 1, -1, -1):
+            char_class = _char_class(text[i])
+            if char_class != "other":
+                # Spaces and runs of Latin letters or digits stay together, as in newmm.
+                end = i + 1
+                while end < n and _char_class(text[end]) == char_class:
+                    end += 1
+                best[i] = (best[end][0], best[end][1] + 1, end, False)
+                continue
+            candidate = (best[i + 1][0] + 1, best[i + 1][1] + 1, i + 1, True)
+            for length in self._prefix_lengths(text, i):
+                unknown, count = best[i + length][:2]
+                if (unknown, count + 1) < candidate[:2]:
+                    candidate = (unknown, count + 1, i + length, False)
+            best[i] = candidate
+        tokens = []
+        pending_unknown = ""
+        i = 0
+        while i < n:
+            end, is_unknown = best[i][2:]
+            if is_unknown:
+                # Glue consecutive unknown characters into one token.
+                pending_unknown += text[i:end]
+            else:
+                if pending_unknown:
+                    tokens.append(pending_unknown)
+                    pending_unknown = ""
+                tokens.append(text[i:end])
+            i = end
+        if pending_unknown:
+            tokens.append(pending_unknown)
+        return tokens
+
+
+class Tokenizer(object):
+    """Tokenizes text with the selected engine, memoizing recent lines."""
+    def __init__(self, engine=DEFAULT_ENGINE, memo_size=MEMO_SIZE):
+        self.memo_size = memo_size
+        self.trie_tokenizer = None
+        self.lock = threading.Lock()
+        self.set_engine(engine)
+
+    def set_engine(self, engine):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown tokenizer engine: {engine}")
+        with self.lock:
+            self.engine = engine
+            self._memo = functools.lru_cache(maxsize=self.memo_size)(self._tokenize_uncached)
+
+    def set_dictionary(self, words):
+        """Builds the maximal-matching trie from the given word bank.
+
+        Without any words there is nothing to match, so the trie is left
+        unset and tokenizing stays with newmm.
+        """
+        trie_tokenizer = TrieTokenizer(words)
+        if not trie_tokenizer.trie:
+            trie_tokenizer = None
+        with self.lock:
+            self.trie_tokenizer = trie_tokenizer
+            self._memo = functools.lru_cache(maxsize=self.memo_size)(self._tokenize_uncached)
+
+    def active_engine(self):
+        """Returns the engine actually in use; maximal falls back to newmm until it has a dictionary."""
+        if self.engine == MAXIMAL_ENGINE and self.trie_tokenizer is None:
+            return NEWMM_ENGINE
+        return self.engine
+
+    def _tokenize_uncached(self, text):
+        if self.active_engine() == MAXIMAL_ENGINE:
+            return tuple(self.trie_tokenizer.tokenize(text))
+        from pythainlp.tokenize import word_tokenize as pythainlp_word_tokenize
+        return tuple(pythainlp_word_tokenize(text, engine=NEWMM_ENGINE))
+
+    def tokenize(self, text):
+        return list(self._memo(text))
+
+    def memo_info(self):
+        return self._memo.cache_info()
+
+
+default_tokenizer = Tokenizer()
+
+
+def word_tokenize(text):
+    """Tokenizes text with the add-on's shared tokenizer."""
+    return default_tokenizer.tokenize(text)
@@ -0,0 +1,87 @@
+# thaiTypeTest/addon/globalPlugins/thaiTypeTest/transcripts.py
+"""Scoring of recorded tests outside the dialog.
+
+A transcript is one test: for each item, the reference line, the line the
+trainee typed and the seconds spent on it. It is a UTF-8 CSV file with a
+reference,typed,seconds header, or a JSON lines file (.jsonl) with those
+keys. Items are scored with scoring.score_item and totalled with
+scoring.SessionScore, the code the dialog uses, so a transcript gets the
+same Gross/Net WPM, CPM and accuracy as the test it records. Its elapsed
+time is the sum of the seconds. As in the dialog, an item typed as
+nothing is not scored, though its seconds still count.
+
+tools/grade_transcripts.py grades many files at once.
+"""
+
+import json
+import os
+
+from . import scoring
+
+TRANSCRIPT_FIELDS = ("reference", "typed", "seconds")
+# The columns of one graded transcript, in the order they are written.
+RESULT_FIELDS = (
+    "file", "items", "correct_words", "incorrect_words", "elapsed_seconds",
+    "gross_wpm", "net_wpm", "cpm", "accuracy", "error_counts", "error",
+)
+
+
+def read_transcript(file_path):
+    """Returns the (reference, typed, seconds) rows of a transcript file.
+
+    Raises ValueError if a row lacks a field or its seconds are not a number.
+    """
+    import csv
+    with open(file_path, "r", encoding="utf-8-sig", newline="") as f:
+        if os.path.splitext(file_path)[1].lower() == ".jsonl":
+            records = [json.loads(line) for line in f if line.strip()]
+        else:
+            records = list(csv.DictReader(f))
+    rows = []
+    for number, record in enumerate(records, 1):
+        try:
+            rows.append((record["reference"], record["typed"] or "", float(record["seconds"])))
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"{file_path}: item {number} needs {', '.join(TRANSCRIPT_FIELDS)}")
+    return rows
+
+
+def score_transcript(rows, is_sentence=True, tokenize=None):
+    """Scores the (reference, typed, seconds) rows of one test; returns its SessionScore and elapsed seconds."""
+    session_score = scoring.SessionScore()
+    elapsed_seconds = 0.0
+    for reference, typed, seconds in rows:
+        elapsed_seconds += seconds
+        typed = typed.strip()
+        if not typed:
+            continue
+        item_score = scoring.score_item(reference.strip(), typed, is_sentence, tokenize=tokenize)[0]
+        session_score.add(reference.strip(), typed, item_score)
+    return session_score, elapsed_seconds
+
+
+def grade_file(file_path, is_sentence=True):
+    """Returns the RESULT_FIELDS of one transcript file as a dict.
+
+    A file that cannot be read or parsed gets its message in "error" instead of scores.
+    """
+    result = dict.fromkeys(RESULT_FIELDS)
+    result["file"] = file_path
+    try:
+        rows = read_transcript(file_path)
+    except (OSError, ValueError) as e:
+        result["error"] = str(e)
+        return result
+    session_score, elapsed_seconds = score_transcript(rows, is_sentence)
+    result.update(
+        items=len(rows),
+        correct_words=session_score.correct_words,
+        incorrect_words=session_score.incorrect_words,
+        elapsed_seconds=elapsed_seconds,
+        gross_wpm=session_score.gross_wpm(elapsed_seconds),
+        net_wpm=session_score.net_wpm(elapsed_seconds),
+        cpm=session_score.cpm(elapsed_seconds),
+        accuracy=session_score.accuracy(),
+        error_counts=session_score.error_counts,
+    )
+    return result
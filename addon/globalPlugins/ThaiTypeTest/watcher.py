@@ -0,0 +1,71 @@
+# thaiTypeTest/addon/globalPlugins/thaiTypeTest/watcher.py
+"""The user corpus directory and cheap polling of corpus files for changes.
+
+Every .txt file in the user corpus directory, which lives in NVDA's
+configuration directory so add-on updates leave it alone, becomes a test
+mode. The dialog polls its corpus files with one os.stat each and reloads
+only the files whose size or modification time changed.
+"""
+
+import os
+
+USER_CORPUS_DIR_NAME = "thaiTypeTest_corpora"
+# How often the dialog polls the corpus files.
+POLL_INTERVAL_MS = 2000
+
+
+def user_corpus_dir():
+    import globalVars
+    return os.path.join(globalVars.appArgs.configPath, USER_CORPUS_DIR_NAME)
+
+
+def list_user_corpora(directory):
+    """Returns the paths of the .txt files in directory, sorted by name; none if it does not exist."""
+    try:
+        with os.scandir(directory) as entries:
+            return sorted(
+                entry.path for entry in entries
+                if entry.name.lower().endswith(".txt") and entry.is_file()
+            )
+    except OSError:
+        return []
+
+
+def file_stamp(path):
+    """Returns the (size, mtime) of path, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_size, st.st_mtime_ns)
+
+
+class CorpusWatcher(object):
+    """Remembers the size and mtime of watched files and reports which ones changed."""
+    def __init__(self):
+        self.stamps = {}
+
+    def reset(self, paths):
+        """Takes the current state of paths (a dict of key to file path) as unchanged."""
+        self.stamps = {key: file_stamp(path) for key, path in paths.items()}
+
+    def update(self, paths):
+        """Takes the current state of some files as unchanged, e.g. after writing them."""
+        for key, path in paths.items():
+            self.stamps[key] = file_stamp(path)
+
+    def poll(self, paths):
+        """Returns the keys of paths that are new or changed, and the known keys no longer in paths.
+
+        A file that disappeared counts as changed if its key is still in paths.
+        """
+        changed = []
+        for key, path in paths.items():
+            stamp = file_stamp(path)
+            if key not in self.stamps or self.stamps[key] != stamp:
+                self.stamps[key] = stamp
+                changed.append(key)
+        removed = [key for key in self.stamps if key not in paths]
+        for key in removed:
+            del self.stamps[key]
+        return changed, removed
@@ -1,6 +1,8 @@
 # -*- coding: UTF-8 -*-
 # buildVars.py - variables used by SCons when building the addon.
 
+import os
+
 # Add-on information variables
 addon_info = {
     "addon_name": "ThaiTypeTest",
@@ -40,6 +42,11 @@ pythonSources = [
 i18nSources = []
 docFiles = ["readme.html"]
 
-# Files to be excluded from the build
+# Files to be excluded from the build, as paths inside the bundle
 tests = []
-excludedFiles = []
\ No newline at end of file
+# The corpus cache is written into lib when the add-on runs from the source tree.
+_libDir = os.path.join("globalPlugins", "ThaiTypeTest", "lib")
+excludedFiles = [
+    os.path.join(_libDir, "corpus_cache.json"),
+    os.path.join(_libDir, "corpus_cache.json.tmp"),
+]
\ No newline at end of file
@@ -0,0 +1,153 @@
+# thaiTypeTest/tools/bench_scoring.py
+"""Micro-benchmark of sentence scoring: difflib (the old path) versus scoring.score_words.
+
+Every line of the bundled corpora is scored against a copy with random
+typing mistakes (dropped, doubled and swapped characters, wrong tone
+marks, skipped words). Both paths get the same newmm tokens, so only the
+diff step is timed: "counts" is the diff and the correct/incorrect word
+counting alone, as the old loop did, and "score_words" adds the ItemError
+classification the dialog reports. A last case joins LONG_LINE_LINES
+literature lines into one line with mistakes spread over it. It also
+reports how often the two agree on the correct/incorrect word counts.
+
+    python tools/bench_scoring.py [--repeat 5] [--seed 1]
+"""
+
+import argparse
+import difflib
+import os
+import random
+import time
+
+import nvda_stubs
+
+CORPORA = ("sentence_th.txt", "lyrics_th.txt", "literature_th.txt")
+# How many literature lines the long-line case joins, and how often it is scored per repeat.
+LONG_LINE_LINES = 40
+LONG_LINE_PAIRS = 20
+TONE_MARKS = "่้๊๋"
+
+
+def add_mistakes(line, rng):
+    chars = list(line)
+    for _ in range(rng.randint(0, 3)):
+        if not chars:
+            break
+        position = rng.randrange(len(chars))
+        mistake = rng.choice(("drop", "double", "swap", "tone", "skip_word"))
+        if mistake == "drop":
+            del chars[position]
+        elif mistake == "double":
+            chars.insert(position, chars[position])
+        elif mistake == "swap" and position + 1 < len(chars):
+            chars[position], chars[position + 1] = chars[position + 1], chars[position]
+        elif mistake == "tone":
+            if chars[position] in TONE_MARKS:
+                chars[position] = rng.choice(TONE_MARKS)
+            else:
+                chars.insert(position + 1, rng.choice(TONE_MARKS))
+        elif mistake == "skip_word" and " " in line:
+            words = "".join(chars).split(" ")
+            del words[rng.randrange(len(words))]
+            chars = list(" ".join(words))
+    return "".join(chars)
+
+
+def difflib_counts(reference_words, typed_words):
+    """The scoring loop on_enter_press used before the scoring module."""
+    matcher = difflib.SequenceMatcher(None, reference_words, typed_words)
+    correct, incorrect = 0, 0
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            correct += (i2 - i1)
+        else:
+            incorrect += max(i2 - i1, j2 - j1)
+    return correct, incorrect
+
+
+def myers_counts(reference_words, typed_words):
+    """The old counting loop over scoring.diff_opcodes, without classifying errors."""
+    from ThaiTypeTest import scoring
+    correct, incorrect = 0, 0
+    for tag, i1, i2, j1, j2 in scoring.diff_opcodes(reference_words, typed_words):
+        if tag == 'equal':
+            correct += (i2 - i1)
+        else:
+            incorrect += max(i2 - i1, j2 - j1)
+    return correct, incorrect
+
+
+def best_time(score, pairs, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for reference_words, typed_words in pairs:
+            score(reference_words, typed_words)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def report(name, pairs, repeat):
+    from ThaiTypeTest import scoring
+    timings = {
+        "difflib": best_time(difflib_counts, pairs, repeat),
+        "myers": best_time(myers_counts, pairs, repeat),
+        "score_words": best_time(scoring.score_words, pairs, repeat),
+    }
+    agree = correct_gain = 0
+    for reference_words, typed_words in pairs:
+        old = difflib_counts(reference_words, typed_words)
+        new = myers_counts(reference_words, typed_words)
+        if old == new:
+            agree += 1
+        correct_gain += new[0] - old[0]
+    words = sum(len(reference_words) for reference_words, _ in pairs) / len(pairs)
+    print(
+        f"{name}: {len(pairs)} lines of {words:.0f} words on average, counts: "
+        f"difflib {timings['difflib'] / len(pairs) * 1e6:.1f} us/line, "
+        f"myers {timings['myers'] / len(pairs) * 1e6:.1f} us/line; "
+        f"score_words {timings['score_words'] / len(pairs) * 1e6:.1f} us/line; "
+        f"counts agree on {agree / len(pairs):.1%} of lines "
+        f"(myers finds {correct_gain} more matching words in total)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    nvda_stubs.install()
+    import ThaiTypeTest
+    from ThaiTypeTest.corpus import split_dataset_lines
+
+    rng = random.Random(args.seed)
+    lib_dir = os.path.join(os.path.dirname(ThaiTypeTest.__file__), "lib")
+    tokenize = ThaiTypeTest.word_tokenize
+    for file_name in CORPORA:
+        with open(os.path.join(lib_dir, file_name), "r", encoding="utf-8") as f:
+            lines = split_dataset_lines(f.read())
+        pairs = []
+        for line in lines:
+            reference_words = ThaiTypeTest.filter_scored_words(tokenize(line))
+            typed_words = ThaiTypeTest.filter_scored_words(tokenize(add_mistakes(line, rng)))
+            pairs.append((reference_words, typed_words))
+        report(file_name, pairs, args.repeat)
+
+    pairs = []
+    for _ in range(LONG_LINE_PAIRS):
+        start = rng.randrange(len(lines) - LONG_LINE_LINES)
+        chosen = lines[start:start + LONG_LINE_LINES]
+        reference_words = ThaiTypeTest.filter_scored_words(
+            [word for line in chosen for word in tokenize(line) + [" "]]
+        )
+        typed_words = ThaiTypeTest.filter_scored_words(
+            [word for line in chosen for word in tokenize(add_mistakes(line, rng)) + [" "]]
+        )
+        pairs.append((reference_words, typed_words))
+    report(f"long line ({LONG_LINE_LINES} literature lines)", pairs, args.repeat)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# thaiTypeTest/tools/bench_tokenizer.py
+"""Throughput of each tokenizer engine and its agreement with newmm.
+
+For sentence_th.txt and literature_th.txt this reports lines per second
+for newmm, for newmm answered from the memo (a second pass over the same
+lines), and for the maximal-matching engine built from the add-on's word
+banks. Agreement is measured against newmm as the share of identical
+lines and the F1 score of word boundaries.
+
+    python tools/bench_tokenizer.py
+"""
+
+import os
+import time
+
+import nvda_stubs
+
+CORPORA = ("sentence_th.txt", "literature_th.txt")
+WORD_BANK_CORPORA = ("sentence_th.txt", "lyrics_th.txt", "literature_th.txt")
+
+
+def boundaries(tokens):
+    cuts = set()
+    position = 0
+    for token in tokens:
+        position += len(token)
+        cuts.add(position)
+    return cuts
+
+
+def boundary_f1(expected, actual):
+    expected_cuts = boundaries(expected)
+    actual_cuts = boundaries(actual)
+    hits = len(expected_cuts & actual_cuts)
+    if not hits:
+        return 0.0
+    precision = hits / len(actual_cuts)
+    recall = hits / len(expected_cuts)
+    return 2 * precision * recall / (precision + recall)
+
+
+def timed(tokenize, lines):
+    started = time.perf_counter()
+    results = [tokenize(line) for line in lines]
+    return results, time.perf_counter() - started
+
+
+def main():
+    nvda_stubs.install()
+    import ThaiTypeTest
+    from ThaiTypeTest.corpus import split_dataset_lines
+    from ThaiTypeTest.tokenizer import MAXIMAL_ENGINE, NEWMM_ENGINE, Tokenizer
+
+    lib_dir = os.path.join(os.path.dirname(ThaiTypeTest.__file__), "lib")
+    corpora = {}
+    for file_name in WORD_BANK_CORPORA:
+        with open(os.path.join(lib_dir, file_name), "r", encoding="utf-8") as f:
+            corpora[file_name] = split_dataset_lines(f.read())
+
+    newmm = Tokenizer(NEWMM_ENGINE)
+    started = time.perf_counter()
+    newmm.tokenize("ทดสอบ")
+    print(f"newmm first call (dictionary load): {time.perf_counter() - started:.2f} s")
+
+    reference = {}
+    words = set()
+    for file_name, lines in corpora.items():
+        reference[file_name] = [newmm.tokenize(line) for line in lines]
+        for tokens in reference[file_name]:
+            words.update(tokens)
+
+    maximal = Tokenizer(MAXIMAL_ENGINE)
+    started = time.perf_counter()
+    maximal.set_dictionary(words)
+    print(f"maximal trie build from {len(words)} word-bank entries: {time.perf_counter() - started:.3f} s")
+
+    for file_name in CORPORA:
+        lines = corpora[file_name]
+        print(f"{file_name} ({len(lines)} lines)")
+        cold = Tokenizer(NEWMM_ENGINE)
+        for name, tokenizer in (("newmm", cold), ("newmm (memo)", cold), ("maximal", maximal)):
+            results, elapsed = timed(tokenizer.tokenize, lines)
+            same = sum(1 for expected, actual in zip(reference[file_name], results) if expected == actual)
+            f1 = sum(boundary_f1(expected, actual) for expected, actual in zip(reference[file_name], results)) / len(lines)
+            print(
+                f"  {name:<13} {len(lines) / elapsed:>10.0f} lines/s  "
+                f"identical to newmm {same / len(lines):6.1%}  boundary F1 {f1:.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
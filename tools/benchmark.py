@@ -0,0 +1,340 @@
+# thaiTypeTest/tools/benchmark.py
+"""Headless benchmarks of the add-on's hot paths.
+
+The add-on is imported on plain CPython with the stubs from nvda_stubs,
+and the dialog methods run on a TestDialog that was never shown, so the
+timings cover exactly the code NVDA runs:
+
+    load_all_data.cold    loading every corpus with no cache (tokenizes everything)
+    load_all_data.warm    loading every corpus again from the cache
+    load_all_data.reopen  loading every corpus again for a new dialog, from the shared corpus store
+    clean_text            cleaning the bundled lyrics file as one text
+    on_enter_press.<mode> one Enter press, per mode, with typing mistakes
+    on_typing_char        recording one keystroke into the keystroke log
+    parse_lyrics.<page>   extracting lyrics from each saved page in tools/fixtures/lyrics
+
+The corpora are copied to a temporary directory first, so the add-on's own
+cache is left alone. Results are written as JSON; --compare prints how the
+medians moved against an earlier results file.
+
+    python tools/benchmark.py [--repeat 5] [--enters 200] [--output bench_results.json]
+    python tools/benchmark.py --compare old_results.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import nvda_stubs
+from bench_scoring import add_mistakes
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "lyrics")
+# A median this much slower than the baseline is reported as a regression.
+REGRESSION_RATIO = 1.10
+
+
+class FakeChoice(nvda_stubs.Anything):
+    def __init__(self, selection, index=0):
+        self.selection = selection
+        self.index = index
+
+    def GetStringSelection(self):
+        return self.selection
+
+    def GetSelection(self):
+        return self.index
+
+
+class FakeKeyEvent(nvda_stubs.Anything):
+    def __init__(self, key):
+        self.key = key
+
+    def GetKeyCode(self):
+        return self.key
+
+    def GetUnicodeKey(self):
+        return self.key
+
+
+class FakeTextCtrl(nvda_stubs.Anything):
+    def __init__(self):
+        self.value = ""
+
+    def GetValue(self):
+        return self.value
+
+    def Clear(self):
+        self.value = ""
+
+
+def make_dialog(ThaiTypeTest, corpus_store=None):
+    """Returns a TestDialog whose widgets are stubs, without running its __init__.
+
+    Unless a corpus store is given, the dialog gets an empty one of its own.
+    """
+    dialog = ThaiTypeTest.TestDialog.__new__(ThaiTypeTest.TestDialog)
+    dialog.MODES = ThaiTypeTest.default_modes()
+    dialog.corpus_store = corpus_store or ThaiTypeTest.store.CorpusStore()
+    dialog.corpora = {}
+    dialog.word_difficulty = dialog.corpus_store.word_difficulty
+    dialog.user_corpus_dir = ThaiTypeTest.watcher.user_corpus_dir()
+    dialog.corpus_watcher = ThaiTypeTest.watcher.CorpusWatcher()
+    dialog.test_seed = None
+    dialog.replay_seed = None
+    dialog.isLoading = True
+    dialog.announce_when_loaded = False
+    dialog.load_generation = 1
+    dialog.isRunning = False
+    dialog.current_item_index = 0
+    dialog.modeChoice = FakeChoice(next(iter(dialog.MODES)))
+    dialog.difficultyChoice = FakeChoice(ThaiTypeTest.DIFFICULTY_CHOICES[0])
+    dialog.typingTextCtrl = FakeTextCtrl()
+    dialog.keylog = ThaiTypeTest.keylog.KeystrokeLog()
+    dialog.test_clock = ThaiTypeTest.TestClock()
+    # In-memory statistics, so the benchmark never touches the trainee's saved ones.
+    dialog.weakness = ThaiTypeTest.adaptive.WeaknessStats()
+    dialog.is_adaptive_test = False
+    dialog.item_timings = []
+    dialog.prompt_chunks = None
+    dialog.chunk_index = 0
+    dialog.speech_timings = ThaiTypeTest.prompts.SpeechTimings()
+    return dialog
+
+
+def summarize(samples, unit):
+    ordered = sorted(samples)
+    return {
+        "unit": unit,
+        "count": len(ordered),
+        "min_ms": ordered[0] * 1000,
+        "median_ms": statistics.median(ordered) * 1000,
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def reset_tokenizer_memo(tokenizer):
+    tokenizer.set_engine(tokenizer.engine)
+
+
+def load_data(ThaiTypeTest, file_names, corpus_store=None):
+    dialog = make_dialog(ThaiTypeTest, corpus_store)
+    started = time.perf_counter()
+    dialog.load_all_data(dialog.load_generation, file_names)
+    return time.perf_counter() - started, dialog
+
+
+def bench_load(ThaiTypeTest, repeat):
+    """Times load_all_data on a private copy of the corpora, with and without the cache and the store."""
+    file_names = [mode_info["file"] for mode_info in ThaiTypeTest.default_modes().values() if "file" in mode_info]
+    cache_path = os.path.join(ThaiTypeTest.lib_path, ThaiTypeTest.CACHE_FILE_NAME)
+    cold, warm, reopen = [], [], []
+    dialog = None
+    for _ in range(repeat):
+        if os.path.exists(cache_path):
+            os.remove(cache_path)
+        reset_tokenizer_memo(ThaiTypeTest.default_tokenizer)
+        elapsed, dialog = load_data(ThaiTypeTest, file_names)
+        cold.append(elapsed)
+        elapsed, dialog = load_data(ThaiTypeTest, file_names)
+        warm.append(elapsed)
+        elapsed = load_data(ThaiTypeTest, file_names, dialog.corpus_store)[0]
+        reopen.append(elapsed)
+    return {
+        "load_all_data.cold": summarize(cold, "load"),
+        "load_all_data.warm": summarize(warm, "load"),
+        "load_all_data.reopen": summarize(reopen, "load"),
+    }, dialog
+
+
+def bench_clean_text(ThaiTypeTest, repeat):
+    from ThaiTypeTest.lyrics import clean_text
+    with open(os.path.join(ThaiTypeTest.lib_path, "lyrics_th.txt"), "r", encoding="utf-8") as f:
+        text = f.read()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        clean_text(text)
+        samples.append(time.perf_counter() - started)
+    result = summarize(samples, "call")
+    result["input_chars"] = len(text)
+    return {"clean_text": result}
+
+
+def bench_enter_press(ThaiTypeTest, loaded_dialog, repeat, enters, seed):
+    """Times on_enter_press for every mode on the datasets load_all_data produced, sentences also chunked."""
+    results = {}
+    rng = random.Random(seed)
+    for mode_name, mode_info in loaded_dialog.MODES.items():
+        dataset = mode_info.get("dataset")
+        if not dataset:
+            continue
+        # Sentences are timed again with their spoken chunks prepared ahead.
+        for chunked in ((False, True) if mode_info.get("is_sentence") else (False,)):
+            samples = []
+            for run in range(repeat):
+                dialog = make_dialog(ThaiTypeTest)
+                dialog.MODES = loaded_dialog.MODES
+                dialog.modeChoice = FakeChoice(mode_name)
+                dialog.isRunning = True
+                dialog.current_item_index = 0
+                dialog.session_score = ThaiTypeTest.scoring.SessionScore()
+                dialog.enter_latencies = []
+                dialog.enter_pressed_at = None
+                if mode_info.get("adaptive"):
+                    dialog.is_adaptive_test = True
+                    dialog.current_dataset = ThaiTypeTest.adaptive.AdaptiveDataset(dataset, dialog.weakness, seed + run)
+                else:
+                    dialog.current_dataset = ThaiTypeTest.SampledDataset(dataset, seed + run)
+                tokens = mode_info.get("tokens")
+                dialog.current_tokens = tokens if mode_info.get("is_sentence") and tokens else None
+                dialog.reference_words = {}
+                dialog.prompt_chunks = {} if chunked else None
+                dialog.prefetch_reference_words()
+                count = min(enters, len(dialog.current_dataset) - 1)
+                typed_items = [add_mistakes(dialog.current_dataset[i], rng) for i in range(count)]
+                # Typed text is new every time in a real test, so nothing may come from the memo.
+                reset_tokenizer_memo(ThaiTypeTest.default_tokenizer)
+                for typed_item in typed_items:
+                    dialog.typingTextCtrl.value = typed_item
+                    started = time.perf_counter()
+                    dialog.on_enter_press(None)
+                    samples.append(time.perf_counter() - started)
+                nvda_stubs.spoken.clear()
+            results[f"on_enter_press.{mode_name}{'.chunked' if chunked else ''}"] = summarize(samples, "enter")
+    return results
+
+
+def bench_typing_char(ThaiTypeTest, repeat, keys):
+    """Times on_typing_char, which runs before NVDA echoes each key."""
+    dialog = make_dialog(ThaiTypeTest)
+    dialog.isRunning = True
+    events = [FakeKeyEvent(ord(char)) for char in "สวัสดีครับ"]
+    samples = []
+    for _ in range(repeat):
+        dialog.keylog.clear()
+        for n in range(keys):
+            event = events[n % len(events)]
+            started = time.perf_counter()
+            dialog.on_typing_char(event)
+            samples.append(time.perf_counter() - started)
+    return {"on_typing_char": summarize(samples, "key")}
+
+
+def bench_parse_lyrics(repeat):
+    from ThaiTypeTest.lyrics import parse_lyrics
+    with open(os.path.join(FIXTURES_DIR, "manifest.json"), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    results = {}
+    # Import BeautifulSoup first; keep that out of the first page's timing.
+    import bs4
+    for fixture, info in manifest.items():
+        with open(os.path.join(FIXTURES_DIR, fixture), "rb") as f:
+            content = f.read()
+        url = f"https://{info['site']}/{fixture}"
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            lyrics = parse_lyrics(url, content)
+            samples.append(time.perf_counter() - started)
+        with open(os.path.join(FIXTURES_DIR, os.path.splitext(fixture)[0] + ".expected.txt"), "r", encoding="utf-8") as f:
+            expected = f.read().rstrip("\n")
+        if lyrics != expected:
+            print(f"warning: {fixture} no longer parses to its expected lyrics", file=sys.stderr)
+        result = summarize(samples, "page")
+        result["input_bytes"] = len(content)
+        results[f"parse_lyrics.{os.path.splitext(fixture)[0]}"] = result
+    return results
+
+
+def environment_info(ThaiTypeTest):
+    with open(os.path.join(nvda_stubs.ROOT_DIR, "buildVars.py"), "r", encoding="utf-8") as f:
+        match = re.search(r'"addon_version":\s*"([^"]*)"', f.read())
+    try:
+        revision = subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            cwd=nvda_stubs.ROOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    try:
+        from importlib.metadata import version
+        pythainlp_version = version("pythainlp")
+    except Exception:
+        pythainlp_version = None
+    return {
+        "addon_version": match.group(1) if match else None,
+        "revision": revision,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pythainlp": pythainlp_version,
+        "tokenizer_engine": ThaiTypeTest.default_tokenizer.active_engine(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    regressions = 0
+    for name, result in results.items():
+        old = baseline.get(name)
+        if not old:
+            print(f"{name}: new")
+            continue
+        ratio = result["median_ms"] / old["median_ms"] if old["median_ms"] else float("inf")
+        flag = ""
+        if ratio > REGRESSION_RATIO:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{name}: {old['median_ms']:.3f} -> {result['median_ms']:.3f} ms ({ratio:.2f}x){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--enters", type=int, default=200, help="Enter presses per mode and run")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", metavar="BASELINE", help="an earlier results file to compare with")
+    args = parser.parse_args()
+
+    nvda_stubs.install()
+    import ThaiTypeTest
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="thaitypetest-bench-") as lib_copy:
+        for file_name in os.listdir(ThaiTypeTest.lib_path):
+            if file_name.endswith(".txt"):
+                shutil.copy2(os.path.join(ThaiTypeTest.lib_path, file_name), lib_copy)
+        ThaiTypeTest.lib_path = lib_copy
+        load_results, loaded_dialog = bench_load(ThaiTypeTest, args.repeat)
+        results.update(load_results)
+        results.update(bench_clean_text(ThaiTypeTest, args.repeat))
+        results.update(bench_enter_press(ThaiTypeTest, loaded_dialog, args.repeat, args.enters, args.seed))
+    results.update(bench_typing_char(ThaiTypeTest, args.repeat, args.enters * 20))
+    results.update(bench_parse_lyrics(args.repeat))
+
+    for name, result in results.items():
+        print(f"{name}: median {result['median_ms']:.3f} ms, p95 {result['p95_ms']:.3f} ms per {result['unit']} ({result['count']} samples)")
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"environment": environment_info(ThaiTypeTest), "results": results}, f, ensure_ascii=False, indent=2)
+    print(f"Results written to {args.output}")
+    if args.compare:
+        regressions = compare(results, args.compare)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# thaiTypeTest/tools/check_extractors.py
+"""Checks the lyrics extractors against the saved pages and times them.
+
+Every page in tools/fixtures/lyrics must still extract to its
+<page>.expected.txt. Each page is then parsed two ways: the targeted parse
+of its site's extractor, and the full BeautifulSoup tree that parse_lyrics
+used to build before picking one element out of it. Both are timed, and
+their peak memory is measured with tracemalloc.
+
+The saved pages are trimmed to a few KB. --pad surrounds the lyrics with
+that many KB of menus and related-song lists, which is closer to a live
+page; the expected text must not change.
+
+    python tools/check_extractors.py
+    python tools/check_extractors.py --pad 150 --repeat 20
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+import nvda_stubs
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "lyrics")
+PADDING_ITEM = '<li><a href="/music/{0}" title="เพลงที่เกี่ยวข้อง {0}">เพลงที่เกี่ยวข้อง {0}</a> <span class="views">{0} views</span></li>\n'
+
+
+def pad_page(content, kilobytes):
+    """Puts kilobytes of navigation markup after <body> and again before </body>."""
+    if not kilobytes:
+        return content
+    text = content.decode("utf-8")
+    items = []
+    size = 0
+    while size < kilobytes * 1024 // 2:
+        items.append(PADDING_ITEM.format(len(items)))
+        size += len(items[-1].encode("utf-8"))
+    block = '<div class="related"><ul>\n' + "".join(items) + "</ul></div>\n"
+    body_end = text.index(">", text.index("<body")) + 1
+    text = text[:body_end] + block + text[body_end:]
+    closing = text.rindex("</body>")
+    text = text[:closing] + block + text[closing:]
+    return text.encode("utf-8")
+
+
+def measure(function, repeat):
+    """Returns the median seconds and the peak traced bytes of function()."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(samples), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pad", type=int, default=0, metavar="KB", help="KB of markup to add around the lyrics")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    nvda_stubs.install()
+    from bs4 import BeautifulSoup
+    from ThaiTypeTest.lyrics import parse_lyrics
+
+    with open(os.path.join(FIXTURES_DIR, "manifest.json"), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    failures = 0
+    for fixture, info in manifest.items():
+        with open(os.path.join(FIXTURES_DIR, fixture), "rb") as f:
+            content = pad_page(f.read(), args.pad)
+        with open(os.path.join(FIXTURES_DIR, os.path.splitext(fixture)[0] + ".expected.txt"), "r", encoding="utf-8") as f:
+            expected = f.read().rstrip("\n")
+        url = f"https://{info['site']}/{fixture}"
+        if parse_lyrics(url, content) != expected:
+            failures += 1
+            print(f"MISMATCH {fixture}")
+            continue
+        targeted_seconds, targeted_peak = measure(lambda: parse_lyrics(url, content), args.repeat)
+        full_seconds, full_peak = measure(lambda: BeautifulSoup(content, "html.parser"), args.repeat)
+        print(
+            f"{fixture} ({len(content) / 1024:.1f} KiB): targeted {targeted_seconds * 1000:.2f} ms / {targeted_peak / 1024:.0f} KiB, "
+            f"full tree {full_seconds * 1000:.2f} ms / {full_peak / 1024:.0f} KiB"
+        )
+    print(f"{len(manifest) - failures}/{len(manifest)} fixtures extracted unchanged")
+    return failures == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
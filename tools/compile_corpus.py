@@ -0,0 +1,126 @@
+# thaiTypeTest/tools/compile_corpus.py
+"""Compiles .txt corpora into memory-mapped .ttc files.
+
+Each compiled file is written next to its source, which is where the
+add-on looks for it. Lines go through the same normalization and
+deduplication as at load time (pipeline.py), and are tokenized with the add-on's tokenizer
+unless --no-tokens is given (word modes then get no words from it).
+Several files are compiled in parallel, one process each (--jobs), and
+the time each spent tokenizing is reported. The add-on build runs this on
+the bundled corpora, so an installed add-on only tokenizes the lines
+added to them later.
+
+    python tools/compile_corpus.py path/to/news_th.txt [...]
+    python tools/compile_corpus.py --jobs 3 addon/globalPlugins/ThaiTypeTest/lib/*.txt
+    python tools/compile_corpus.py --measure path/to/news_th.txt
+
+--measure compares opening the compiled file with reading the text file
+into a list, and the memory each keeps alive.
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import nvda_stubs
+
+
+def compile_file(file_path, with_tokens=True):
+    """Compiles one file; returns its compiled path, line count and seconds spent tokenizing."""
+    from ThaiTypeTest.compiled import compiled_path_for, write_compiled_corpus
+    from ThaiTypeTest.corpus import prepare_lines
+    from ThaiTypeTest.tokenizer import default_tokenizer, word_tokenize
+
+    with open(file_path, "rb") as f:
+        raw = f.read()
+    lines = prepare_lines(raw.decode("utf-8"))
+    if with_tokens:
+        # Load the tokenizer's dictionary first, so the time below is of tokenizing alone.
+        word_tokenize("ทดสอบ")
+    started = time.perf_counter()
+    tokens = [word_tokenize(line) for line in lines] if with_tokens else None
+    tokenize_seconds = time.perf_counter() - started
+    dest_path = compiled_path_for(file_path)
+    write_compiled_corpus(
+        dest_path,
+        lines,
+        tokens,
+        engine=default_tokenizer.active_engine() if tokens is not None else "",
+        source_size=len(raw),
+        source_sha1=hashlib.sha1(raw).hexdigest()
+    )
+    return dest_path, len(lines), tokenize_seconds
+
+
+def compile_files(file_paths, with_tokens=True, jobs=None):
+    """Compiles file_paths, in parallel processes when there is more than one, and prints a line per file."""
+    started = time.perf_counter()
+    jobs = min(jobs or os.cpu_count() or 1, len(file_paths))
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=nvda_stubs.install) as executor:
+            results = list(executor.map(compile_file, file_paths, [with_tokens] * len(file_paths)))
+    else:
+        results = [compile_file(file_path, with_tokens) for file_path in file_paths]
+    for dest_path, line_count, tokenize_seconds in results:
+        print(f"{dest_path}: {line_count} lines, {os.path.getsize(dest_path)} bytes, tokenized in {tokenize_seconds:.2f} s")
+    total_seconds = sum(result[2] for result in results)
+    print(f"{len(results)} files in {time.perf_counter() - started:.2f} s with {jobs} processes ({total_seconds:.2f} s of tokenizing)")
+
+
+def measure(file_path, samples=1000):
+    from ThaiTypeTest.compiled import CompiledCorpus, compiled_path_for
+    from ThaiTypeTest.corpus import split_dataset_lines
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    with open(file_path, "r", encoding="utf-8") as f:
+        lines = split_dataset_lines(f.read())
+    text_seconds = time.perf_counter() - started
+    text_bytes = tracemalloc.get_traced_memory()[0]
+    del lines
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    corpus = CompiledCorpus(compiled_path_for(file_path))
+    open_seconds = time.perf_counter() - started
+    compiled_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    rng = random.Random(0)
+    indexes = [rng.randrange(len(corpus.lines)) for _ in range(samples)]
+    started = time.perf_counter()
+    for index in indexes:
+        corpus.lines[index]
+        if corpus.tokens is not None:
+            corpus.tokens[index]
+    access_us = (time.perf_counter() - started) / samples * 1e6
+    print(
+        f"{os.path.basename(file_path)}: read into list {text_seconds * 1000:.1f} ms / {text_bytes / 1024:.0f} KiB, "
+        f"open compiled {open_seconds * 1000:.2f} ms / {compiled_bytes / 1024:.1f} KiB, "
+        f"random line+tokens {access_us:.1f} us"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--no-tokens", action="store_true", help="store lines only")
+    parser.add_argument("--jobs", type=int, default=None, help="processes to compile with (default: one per CPU)")
+    parser.add_argument("--measure", action="store_true", help="measure an already compiled file instead of compiling")
+    args = parser.parse_args()
+
+    nvda_stubs.install()
+    if args.measure:
+        for file_path in args.files:
+            measure(file_path)
+    else:
+        compile_files(args.files, not args.no_tokens, args.jobs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# thaiTypeTest/tools/grade_transcripts.py
+"""Grades recorded typing tests after class, without NVDA.
+
+Every transcript file (see addon/globalPlugins/ThaiTypeTest/transcripts.py
+for the format) is scored exactly as the dialog scores a test: the same
+Gross/Net WPM, CPM and accuracy. Files are graded in parallel processes,
+and one result row per file is written as soon as it is ready, as CSV or
+JSON lines. Directories are searched for .csv and .jsonl files. The
+number of transcript lines graded per second is printed at the end.
+
+    python tools/grade_transcripts.py tools/fixtures/transcripts
+    python tools/grade_transcripts.py class1/ --output grades.csv
+    python tools/grade_transcripts.py class1/*.csv --format jsonl --jobs 4
+    python tools/grade_transcripts.py word_tests/ --words
+
+Sentences are tokenized with the add-on's default engine (newmm).
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import nvda_stubs
+
+TRANSCRIPT_SUFFIXES = (".csv", ".jsonl")
+
+
+def find_transcripts(paths):
+    """Returns the given files plus the transcripts in the given directories, sorted within each directory."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if name.lower().endswith(TRANSCRIPT_SUFFIXES)
+            ))
+        else:
+            files.append(path)
+    return files
+
+
+def grade(file_path, is_sentence):
+    from ThaiTypeTest.transcripts import grade_file
+    return grade_file(file_path, is_sentence)
+
+
+def warm_up():
+    """Installs the stubs and loads the tokenizer's dictionary in a worker process."""
+    nvda_stubs.install()
+    from ThaiTypeTest.tokenizer import word_tokenize
+    word_tokenize("ทดสอบ")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="transcript files or directories of them")
+    parser.add_argument("--format", choices=("csv", "jsonl"), default="csv")
+    parser.add_argument("--output", help="file to write the results to (default: standard output)")
+    parser.add_argument("--jobs", type=int, default=None, help="processes to grade with (default: one per CPU)")
+    parser.add_argument("--words", action="store_true", help="grade as a word mode: each item is right or wrong as a whole")
+    args = parser.parse_args()
+
+    warm_up()
+    from ThaiTypeTest.transcripts import RESULT_FIELDS
+
+    files = find_transcripts(args.paths)
+    if not files:
+        parser.error("no transcript files found")
+    jobs = min(args.jobs or os.cpu_count() or 1, len(files))
+    out = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    writer = csv.DictWriter(out, RESULT_FIELDS) if args.format == "csv" else None
+    if writer:
+        writer.writeheader()
+    started = time.perf_counter()
+    lines = failed = 0
+    executor = ProcessPoolExecutor(max_workers=jobs, initializer=warm_up) if jobs > 1 else None
+    try:
+        is_sentence = [not args.words] * len(files)
+        # Results come back in input order and are written one by one, so nothing is held until the end.
+        results = executor.map(grade, files, is_sentence, chunksize=4) if executor else map(grade, files, is_sentence)
+        for result in results:
+            if result["error"]:
+                failed += 1
+            else:
+                lines += result["items"]
+            if writer:
+                writer.writerow(dict(result, error_counts=json.dumps(result["error_counts"]) if result["error_counts"] else ""))
+            else:
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+    finally:
+        if executor:
+            executor.shutdown()
+        if out is not sys.stdout:
+            out.close()
+    seconds = time.perf_counter() - started
+    print(
+        f"Graded {len(files) - failed} of {len(files)} files, {lines} lines in {seconds:.2f} s "
+        f"with {jobs} processes: {lines / seconds if seconds > 0 else 0:.0f} lines/s",
+        file=sys.stderr
+    )
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,162 @@
+# thaiTypeTest/tools/lyrics_standin.py
+"""A local HTTP stand-in for the lyrics sites, serving saved pages.
+
+Pages in tools/fixtures/lyrics are served as
+http://127.0.0.1:<port>/<site>/<fixture>, e.g. /kapook.com/kapook.html, so
+the site name fetch_lyrics matches on is part of the URL.
+
+    python tools/lyrics_standin.py              # serve until Ctrl+C
+    python tools/lyrics_standin.py --check      # batch-import every fixture and verify it
+
+--delay slows every response down and --flaky answers the first request
+for each page with 503, which exercises the session's retries. Pages carry
+an ETag and Last-Modified and are answered with 304 when they match, so
+--check imports everything twice and expects the second pass to download
+no page bodies.
+"""
+
+import argparse
+import email.utils
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import nvda_stubs
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "lyrics")
+
+
+def load_manifest():
+    with open(os.path.join(FIXTURES_DIR, "manifest.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    delay = 0.0
+    flaky = False
+    seen_paths = set()
+    lock = threading.Lock()
+    # Responses sent, by status code.
+    status_counts = {}
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        if self.flaky:
+            with self.lock:
+                first_request = self.path not in self.seen_paths
+                self.seen_paths.add(self.path)
+            if first_request:
+                self.send_error(503)
+                return
+        fixture = os.path.basename(self.path)
+        fixture_path = os.path.join(FIXTURES_DIR, fixture)
+        if not fixture.endswith(".html") or not os.path.isfile(fixture_path):
+            self.send_error(404)
+            return
+        with open(fixture_path, "rb") as f:
+            body = f.read()
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        last_modified = email.utils.formatdate(os.path.getmtime(fixture_path), usegmt=True)
+        if self.headers.get("If-None-Match") == etag:
+            self.count(304)
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.count(200)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", last_modified)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def count(self, status):
+        with self.lock:
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+
+    def log_message(self, format, *args):
+        sys.stderr.write("standin: " + format % args + "\n")
+
+
+def start_server(port=0, delay=0.0, flaky=False):
+    """Starts the stand-in on a background thread and returns the server."""
+    StandInHandler.delay = delay
+    StandInHandler.flaky = flaky
+    server = ThreadingHTTPServer(("127.0.0.1", port), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def fixture_urls(server):
+    host, port = server.server_address[:2]
+    return {
+        fixture: f"http://{host}:{port}/{info['site']}/{fixture}"
+        for fixture, info in load_manifest().items()
+    }
+
+
+def check(server):
+    """Imports every fixture twice through fetch_lyrics_batch and compares with the manifest.
+
+    The second pass must be answered from the page cache, with no page body downloaded again.
+    """
+    nvda_stubs.install()
+    from ThaiTypeTest.lyrics import fetch_lyrics_batch
+
+    manifest = load_manifest()
+    urls = fixture_urls(server)
+    url_to_fixture = {url: fixture for fixture, url in urls.items()}
+
+    def on_result(url, lyrics, done_count, total):
+        status = "ok" if lyrics else "failed"
+        print(f"[{done_count}/{total}] {url_to_fixture[url]}: {status}")
+
+    failures = 0
+    for run in ("first import", "repeat import"):
+        started = time.perf_counter()
+        results = fetch_lyrics_batch(list(urls.values()), on_result)
+        elapsed = time.perf_counter() - started
+        for url, lyrics in results:
+            expected = manifest[url_to_fixture[url]]
+            lines = lyrics.split("\n") if lyrics else []
+            if not lines or lines[0] != expected["first_line"] or len(lines) != expected["line_count"]:
+                failures += 1
+                print(f"MISMATCH {url_to_fixture[url]}: {lines[:1]} ({len(lines)} lines)")
+        print(f"{run}: {len(results)} fixtures in {elapsed:.2f} s, responses so far {StandInHandler.status_counts}")
+    downloads = StandInHandler.status_counts.get(200, 0)
+    if downloads != len(urls):
+        failures += 1
+        print(f"CACHE MISS: {downloads} page bodies sent for {len(urls)} pages")
+    print(f"{2 * len(urls) - failures}/{2 * len(urls)} imports correct")
+    return failures == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds to wait before each response")
+    parser.add_argument("--flaky", action="store_true", help="fail the first request for each page with 503")
+    parser.add_argument("--check", action="store_true", help="run a batch import against the stand-in and exit")
+    args = parser.parse_args()
+
+    server = start_server(0 if args.check else args.port, args.delay, args.flaky)
+    if args.check:
+        ok = check(server)
+        server.shutdown()
+        sys.exit(0 if ok else 1)
+    for fixture, url in fixture_urls(server).items():
+        print(url)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# thaiTypeTest/tools/measure_import_time.py
+"""Measures what importing the add-on costs when NVDA loads global plugins.
+
+Runs ``python -X importtime`` in a fresh interpreter with the NVDA stubs
+installed, then prints the cumulative cost of the ThaiTypeTest package and
+the heaviest modules it pulled in.
+
+To compare two versions, point --plugins-dir at another checkout, e.g.:
+
+    git worktree add ../before <old-commit>
+    python tools/measure_import_time.py --plugins-dir ../before/addon/globalPlugins
+    python tools/measure_import_time.py
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+import nvda_stubs
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def measure(plugins_dir):
+    code = (
+        "import sys; sys.path.insert(0, {tools!r}); import nvda_stubs; "
+        "nvda_stubs.install({plugins!r}); import ThaiTypeTest"
+    ).format(tools=TOOLS_DIR, plugins=os.path.abspath(plugins_dir))
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr)
+        raise SystemExit(result.returncode)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--plugins-dir", default=nvda_stubs.PLUGINS_DIR, help="globalPlugins folder to import ThaiTypeTest from")
+    parser.add_argument("--top", type=int, default=15, help="number of heaviest modules to list")
+    args = parser.parse_args()
+
+    rows = measure(args.plugins_dir)
+    package = [row for row in rows if row[2].strip() == "ThaiTypeTest"]
+    if package:
+        print(f"ThaiTypeTest cumulative import time: {package[0][0] / 1000:.1f} ms")
+    print(f"Modules imported: {len(rows)}")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for cumulative_us, self_us, name in sorted(rows, reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
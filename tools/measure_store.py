@@ -0,0 +1,69 @@
+# thaiTypeTest/tools/measure_store.py
+"""Measures what the shared corpus store saves when the dialog is reopened.
+
+Loads the bundled corpora from the corpus cache (the path an installed
+add-on takes once imported lyrics have made the compiled corpora stale),
+with the NVDA stubs and a private copy of the corpora, and prints:
+
+    first open      load time and memory kept by the loaded corpora and word banks
+    reopen          the same for a second dialog while the first one's data is stored;
+                    what it keeps is the dialog's own state, mostly the keystroke log
+    after eviction  memory still kept once the idle store has been emptied
+
+Memory is what tracemalloc counts as still allocated. The same steps are
+then run with word pooling turned off, which is how much the corpora kept
+before the store pooled their words.
+
+    python tools/measure_store.py
+"""
+
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+import nvda_stubs
+from benchmark import load_data
+
+
+def measure(ThaiTypeTest, file_names, corpus_store):
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    first_seconds, first_dialog = load_data(ThaiTypeTest, file_names, corpus_store)
+    first_bytes = tracemalloc.get_traced_memory()[0] - baseline
+    reopen_seconds, reopen_dialog = load_data(ThaiTypeTest, file_names, corpus_store)
+    reopen_bytes = tracemalloc.get_traced_memory()[0] - baseline - first_bytes
+    del first_dialog, reopen_dialog
+    corpus_store.evict_if_idle(time.monotonic() + ThaiTypeTest.store.IDLE_EVICT_SECONDS)
+    evicted_bytes = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    print(f"  first open:     {first_seconds * 1000:8.2f} ms, {first_bytes / 1024:8.0f} KiB")
+    print(f"  reopen:         {reopen_seconds * 1000:8.2f} ms, {reopen_bytes / 1024:8.0f} KiB more")
+    print(f"  after eviction: {evicted_bytes / 1024:20.0f} KiB")
+
+
+def main():
+    nvda_stubs.install()
+    import ThaiTypeTest
+
+    class UnpooledStore(ThaiTypeTest.store.CorpusStore):
+        def _pool(self, text):
+            return text
+
+    file_names = [mode_info["file"] for mode_info in ThaiTypeTest.default_modes().values() if "file" in mode_info]
+    with tempfile.TemporaryDirectory(prefix="thaitypetest-store-") as lib_copy:
+        for file_name in os.listdir(ThaiTypeTest.lib_path):
+            if file_name.endswith(".txt"):
+                shutil.copy2(os.path.join(ThaiTypeTest.lib_path, file_name), lib_copy)
+        ThaiTypeTest.lib_path = lib_copy
+        # Fill the corpus cache first, so both runs load the same way.
+        load_data(ThaiTypeTest, file_names)
+        print("Pooled words:")
+        measure(ThaiTypeTest, file_names, ThaiTypeTest.store.CorpusStore())
+        print("Without pooling:")
+        measure(ThaiTypeTest, file_names, UnpooledStore())
+
+
+if __name__ == "__main__":
+    main()
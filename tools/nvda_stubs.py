@@ -0,0 +1,102 @@
+# thaiTypeTest/tools/nvda_stubs.py
+"""Minimal stand-ins for the NVDA and wxPython modules the add-on imports.
+
+They are only good enough to import the add-on on plain CPython and to call
+its methods on simple objects; nothing is drawn, spoken or beeped.
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import types
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLUGINS_DIR = os.path.join(ROOT_DIR, "addon", "globalPlugins")
+
+# Stands in for NVDA's user configuration directory.
+CONFIG_DIR = os.path.join(tempfile.gettempdir(), "thaiTypeTest-nvda-config")
+
+# Messages passed to speech.speakMessage and speech.speak, newest last.
+spoken = []
+
+
+class Anything(object):
+    """Accepts any constructor arguments, attribute access and call."""
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __call__(self, *args, **kwargs):
+        return Anything()
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return Anything()
+
+
+class StubModule(types.ModuleType):
+    """A module whose unknown CamelCase names are classes and UPPER_CASE names are ints."""
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        if name.isupper():
+            return 0
+        return Anything
+
+
+def _module(name, **attrs):
+    module = StubModule(name)
+    module.__dict__.update(attrs)
+    return module
+
+
+class _CallbackCommand(object):
+    def __init__(self, callback, name=None):
+        self.callback = callback
+
+    def run(self):
+        self.callback()
+
+
+def _speak(sequence, *args, **kwargs):
+    """Records the text of a speech sequence and runs its callbacks as if it had been spoken at once."""
+    for command in sequence:
+        if isinstance(command, str):
+            spoken.append(command)
+        elif isinstance(command, _CallbackCommand):
+            command.run()
+
+
+def _log():
+    """NVDA's logger: a standard logger with NVDA's extra debugWarning level, which logs as debug here."""
+    log = logging.getLogger("nvda")
+    log.debugWarning = log.debug
+    return log
+
+
+def _script(**kwargs):
+    def decorator(func):
+        return func
+    return decorator
+
+
+def install(plugins_dir=PLUGINS_DIR):
+    """Registers the stub modules and makes the add-on package importable."""
+    stubs = {
+        "wx": _module("wx", CallAfter=lambda func, *args, **kwargs: func(*args, **kwargs), CallLater=Anything),
+        "addonHandler": _module("addonHandler", initTranslation=lambda: None),
+        "config": _module("config", conf=Anything()),
+        "globalPluginHandler": _module("globalPluginHandler", GlobalPlugin=object),
+        "gui": _module("gui", messageBox=lambda *args, **kwargs: 0, mainFrame=Anything()),
+        "speech": _module("speech", speakMessage=spoken.append, speak=_speak),
+        "speech.commands": _module("speech.commands", CallbackCommand=_CallbackCommand),
+        "tones": _module("tones", beep=lambda *args, **kwargs: None),
+        "scriptHandler": _module("scriptHandler", script=_script),
+        "logHandler": _module("logHandler", log=_log()),
+        "globalVars": _module("globalVars", appArgs=types.SimpleNamespace(configPath=CONFIG_DIR)),
+    }
+    for name, module in stubs.items():
+        sys.modules.setdefault(name, module)
+    if plugins_dir not in sys.path:
+        sys.path.insert(0, plugins_dir)